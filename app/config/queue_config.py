@@ -24,6 +24,20 @@ ALGORITHM_WORKER_TIMEOUT = int(os.getenv('ALGORITHM_WORKER_TIMEOUT', 1000))
 
 algorithm_calculation_queue = Queue('algorithm_calculation', connection=redis_conn, default_timeout=ALGORITHM_WORKER_TIMEOUT)
 
+# найдорожчі коди запуску (ALGORITHM_PRIORITY_QUEUES=true); воркери беруть її раніше за algorithm_calculation
+algorithm_priority_queue = Queue('algorithm_calculation_high', connection=redis_conn, default_timeout=ALGORITHM_WORKER_TIMEOUT)
+
 result_processing_queue = Queue('result_processing', connection=redis_conn)
 
+# Пакети кодів: один job обробляє кілька кодів; розмір пакету — за очікуваною кількістю барів
+ALGORITHM_BATCH_ENABLED = os.getenv('ALGORITHM_BATCH_ENABLED', 'true').lower() == 'true'
+ALGORITHM_BATCH_TARGET_BARS = int(os.getenv('ALGORITHM_BATCH_TARGET_BARS', 30000))
+ALGORITHM_BATCH_MAX_CODES = int(os.getenv('ALGORITHM_BATCH_MAX_CODES', 25))
+# для кодів, яких ще немає в локальному сховищі
+ALGORITHM_BATCH_DEFAULT_BARS = int(os.getenv('ALGORITHM_BATCH_DEFAULT_BARS', 3000))
+
+OHLCV_PREFETCH_TIMEOUT = int(os.getenv('OHLCV_PREFETCH_TIMEOUT', 3600))
+
+ohlcv_prefetch_queue = Queue('ohlcv_prefetch', connection=redis_conn, default_timeout=OHLCV_PREFETCH_TIMEOUT)
+
 file_write_queue = Queue('file_write', connection=redis_conn)
@@ -3,6 +3,8 @@ from fastapi import APIRouter, HTTPException
 from app.models.algorithm_models import AlgorithmRequest, AlgorithmResponse
 from app.services.queue_service import QueueService
 from app.services.file_service import FileService
+from app.services.scheduling_service import SchedulingService, ALGORITHM_PRIORITY_QUEUES
+from app.config.queue_config import ALGORITHM_BATCH_ENABLED
 algorithm_router = APIRouter()
 
 @algorithm_router.get("/")
@@ -25,19 +27,29 @@ async def init_algo_testing():
 
         screener_stocks = [ '189' ] #! remove this after testing
 
-        for stock in screener_stocks:
-            task_id = QueueService.add_to_algorithm_queue(stock)
-            if task_id is None:
-                return {
-                    "message": "Failed to add stock to queue",
-                    "status": "error",
-                }
+        # LPT: найдорожчі коди (за часом минулого запуску або кількістю барів) — першими,
+        # щоб довгі історії не опинились у хвості черги
+        costs = SchedulingService.estimate_costs(screener_stocks)
+        screener_stocks = SchedulingService.lpt_order(screener_stocks, costs)
+        priority = SchedulingService.priority_codes(screener_stocks) if ALGORITHM_PRIORITY_QUEUES else set()
 
-        return {
+        # Весь запуск — одним конвеєром Redis: спершу всі історії завантажуються
+        # в локальне сховище, задачі алгоритмів відпускаються після цього.
+        # Пакети: кілька кодів на один job — менше накладних витрат на fork, імпорти та Redis
+        batches = QueueService.plan_algorithm_batches(screener_stocks) if ALGORITHM_BATCH_ENABLED else None
+        run = QueueService.enqueue_run(screener_stocks, batches=batches, costs=costs, priority=priority)
+
+        response = {
             "message": "Algorithm testing started successfully",
+            "run_id": run["run_id"],
             "stocks": screener_stocks,
+            "prefetch_task_id": run["prefetch_task_id"],
+            "estimated_cost_ms": round(sum(costs.values())),
             "status": "queued",
         }
+        if ALGORITHM_BATCH_ENABLED:
+            response["batch_task_ids"] = run["task_ids"]
+        return response
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to start algorithm testing: {str(e)}")
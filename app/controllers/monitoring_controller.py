@@ -1,7 +1,13 @@
 from fastapi import APIRouter, HTTPException
-from app.config.queue_config import algorithm_calculation_queue, result_processing_queue, redis_conn
+from app.config.queue_config import algorithm_calculation_queue, algorithm_priority_queue, result_processing_queue, ohlcv_prefetch_queue, redis_conn
+from app.services.profiling_service import ProfilingService
+from app.services.ohlcv_cache_service import OHLCVCacheService
+from app.services.queue_service import QueueService
+from app.services.verify_data_cache import default_cache as verify_data_cache
 from rq import Worker
-from typing import Dict, Any
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from typing import Dict, Any, Optional
 
 monitoring_router = APIRouter()
 
@@ -28,8 +34,24 @@ async def get_queues_info():
             "started_jobs": len(result_processing_queue.started_job_registry)
         }
         
+        prefetch_queue_info = {
+            "name": "ohlcv_prefetch",
+            "pending_jobs": len(ohlcv_prefetch_queue),
+            "failed_jobs": len(ohlcv_prefetch_queue.failed_job_registry),
+            "scheduled_jobs": len(ohlcv_prefetch_queue.scheduled_job_registry),
+            "started_jobs": len(ohlcv_prefetch_queue.started_job_registry)
+        }
+        
+        priority_queue_info = {
+            "name": "algorithm_calculation_high",
+            "pending_jobs": len(algorithm_priority_queue),
+            "failed_jobs": len(algorithm_priority_queue.failed_job_registry),
+            "scheduled_jobs": len(algorithm_priority_queue.scheduled_job_registry),
+            "started_jobs": len(algorithm_priority_queue.started_job_registry)
+        }
+        
         return {
-            "queues": [algorithm_queue_info, result_queue_info],
+            "queues": [prefetch_queue_info, priority_queue_info, algorithm_queue_info, result_queue_info],
             "redis_connection": {
                 "host": redis_conn.connection_pool.connection_kwargs.get('host', 'localhost'),
                 "port": redis_conn.connection_pool.connection_kwargs.get('port', 6379),
@@ -80,6 +102,10 @@ async def get_queue_jobs(queue_name: str, limit: int = 10):
             queue = algorithm_calculation_queue
         elif queue_name == "result_processing":
             queue = result_processing_queue
+        elif queue_name == "ohlcv_prefetch":
+            queue = ohlcv_prefetch_queue
+        elif queue_name == "algorithm_calculation_high":
+            queue = algorithm_priority_queue
         else:
             raise HTTPException(status_code=404, detail="Queue not found")
         
@@ -147,3 +173,99 @@ async def get_overall_stats():
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get overall stats: {str(e)}")
+
+@monitoring_router.get("/conditions")
+async def get_conditions_profile():
+    """
+    Повертає зведений час виконання умов купівлі/продажу та енергії з усіх воркерів
+    (збирається лише при CONDITION_PROFILING=true)
+    """
+    try:
+        conditions = ProfilingService.aggregate()
+        return {
+            "conditions": conditions,
+            "total_ms": sum(c["total_ms"] for c in conditions.values())
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get conditions profile: {str(e)}")
+
+@monitoring_router.delete("/conditions")
+async def reset_conditions_profile():
+    """
+    Очищає накопичену статистику часу виконання умов
+    """
+    try:
+        return {"deleted_keys": ProfilingService.reset()}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reset conditions profile: {str(e)}")
+
+@monitoring_router.get("/ohlcv-cache")
+async def get_ohlcv_cache_stats():
+    """
+    Повертає влучання/промахи кешу історій OHLCV (пам'ять воркера, Redis, сховище/БД)
+    """
+    try:
+        return {"ohlcv_cache": OHLCVCacheService.stats()}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get OHLCV cache stats: {str(e)}")
+
+@monitoring_router.delete("/ohlcv-cache")
+async def invalidate_ohlcv_cache(code: Optional[str] = None, reset_stats: bool = False):
+    """
+    Скидає кешовану історію коду (без code — всіх кодів); наступне читання піде в БД
+    """
+    try:
+        result = {"deleted_keys": OHLCVCacheService.invalidate(code)}
+        if reset_stats:
+            result["stats_reset"] = bool(OHLCVCacheService.reset_stats())
+        return result
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to invalidate OHLCV cache: {str(e)}")
+
+@monitoring_router.delete("/verify-data-cache")
+async def invalidate_verify_data_cache(code: Optional[str] = None):
+    """
+    Видаляє збережені відповіді verifyData коду (без code — всіх кодів); наступна обробка результату піде в API
+    """
+    try:
+        return {"deleted_codes": verify_data_cache().invalidate(code)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to invalidate verifyData cache: {str(e)}")
+
+@monitoring_router.get("/prefetch/{task_id}")
+async def get_prefetch_report(task_id: str):
+    """
+    Повертає статус задачі попереднього завантаження та її звіт (rows/s, затримка по кодах)
+    """
+    try:
+        job = Job.fetch(task_id, connection=redis_conn)
+        result = job.result if job.get_status() == "finished" else None
+        return {
+            "task_id": task_id,
+            "status": job.get_status(),
+            "report": result.get("report") if result else None,
+        }
+
+    except NoSuchJobError:
+        raise HTTPException(status_code=404, detail="Prefetch task not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get prefetch report: {str(e)}")
+
+@monitoring_router.get("/runs/{run_id}")
+async def get_run_status(run_id: str):
+    """
+    Повертає стан запуску за run id: статус попереднього завантаження і кількість задач алгоритмів за статусом
+    """
+    try:
+        run = QueueService.get_run_status(run_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get run status: {str(e)}")
+
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
@@ -0,0 +1,182 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.models.algorithm_models import UnifiedTradeSignal
+
+OPEN_POSITION = "Open position"
+EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_key(value: Optional[datetime]) -> Optional[int]:
+    """Дата як ціле число мікросекунд від епохи (настінний час, часовий пояс відкидається)."""
+    if value is None:
+        return None
+    return (value.replace(tzinfo=None) - EPOCH) // _MICROSECOND
+
+
+def from_key(key: Optional[int]) -> Optional[datetime]:
+    return None if key is None else EPOCH + timedelta(microseconds=key)
+
+
+def parse_api_date(value: str) -> int:
+    """Дата verifyData (``2020-01-02T00:00:00.000Z``) — так само, як ``fromisoformat`` з відкинутим поясом."""
+    return to_key(datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None))
+
+
+# форми, які numpy розбирає так само, як fromisoformat / strptime; інше — поштучно
+# (numpy, наприклад, розбирає пояси, "today"/"now" і рік 0000)
+_API_SHAPE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}([T ][0-9]{2}:[0-9]{2}:[0-9]{2}(\.[0-9]{1,6})?)?Z?')
+_CSV_SHAPES = {
+    '%Y-%m-%d': re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}'),
+    '%Y-%m-%d %H:%M:%S': re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}'),
+}
+
+
+def _numpy_keys(values: List[str]) -> Optional[List[int]]:
+    if any(value.startswith('0000') for value in values):
+        return None
+    try:
+        return np.array(values, dtype='datetime64[us]').astype(np.int64).tolist()
+    except ValueError:
+        return None
+
+
+def parse_api_dates(values: Sequence[Optional[str]]) -> List[Optional[int]]:
+    """
+    Колонка дат verifyData одним викликом numpy; порожні значення — None.
+
+    Якщо хоч одне значення має інший вигляд або numpy його не розбирає,
+    колонка розбирається поштучно через ``parse_api_date`` — з тими самими
+    результатами й винятками, що й раніше.
+    """
+    present = [value for value in values if value]
+    if present and all(_API_SHAPE.fullmatch(value) for value in present):
+        parsed = _numpy_keys([value[:-1] if value.endswith('Z') else value for value in present])
+        if parsed is not None:
+            found = iter(parsed)
+            return [next(found) if value else None for value in values]
+    return [parse_api_date(value) if value else None for value in values]
+
+
+def _parse_csv_date(value: str, formats: Tuple[str, ...]) -> Optional[int]:
+    for date_format in formats:
+        try:
+            return to_key(datetime.strptime(value, date_format))
+        except ValueError:
+            continue
+    return None
+
+
+def parse_csv_dates(values: Sequence[Optional[str]], formats: Tuple[str, ...]) -> List[Optional[int]]:
+    """
+    Колонка дат CSV алгоритму: перший із ``formats``, що підходить (як
+    ланцюжок ``strptime`` з try/except), порожнє чи нерозібране — None.
+    Одним викликом numpy, якщо всі значення мають одну з цих форм.
+    """
+    present = [value for value in values if value]
+    shapes = [_CSV_SHAPES[date_format] for date_format in formats if date_format in _CSV_SHAPES]
+    if present and len(shapes) == len(formats) and all(
+            any(shape.fullmatch(value) for shape in shapes) for value in present):
+        parsed = _numpy_keys(present)
+        if parsed is not None:
+            found = iter(parsed)
+            return [next(found) if value else None for value in values]
+    return [_parse_csv_date(value, formats) if value else None for value in values]
+
+
+class TradeSignal:
+    """
+    Угода з API або з CSV алгоритму: дати — цілі ключі (``to_key``),
+    ``stop`` None — відкрита позиція.
+
+    Замість моделі Pydantic на кожну угоду: дати розбираються колонками при
+    завантаженні, тут лише зберігаються. Атрибути ``buy_signal`` /
+    ``stop_signal`` / ``day_before_*`` та ``repr`` збігаються з
+    ``UnifiedTradeSignal``, тож рядки в результатах і логах не змінюються;
+    ``to_model()`` — модель Pydantic для API.
+    """
+
+    __slots__ = ("buy", "stop", "entry_price", "exit_price", "day_before_buy_key", "day_before_sell_key",
+                 "gain_lose", "source")
+
+    def __init__(self, buy: int, stop: Optional[int], entry_price: float, exit_price: Union[float, str],
+                 day_before_buy_key: Optional[int] = None, day_before_sell_key: Optional[int] = None,
+                 gain_lose: Optional[float] = None, source: str = ""):
+        self.buy = buy
+        self.stop = stop
+        self.entry_price = entry_price
+        self.exit_price = exit_price
+        self.day_before_buy_key = day_before_buy_key
+        self.day_before_sell_key = day_before_sell_key
+        self.gain_lose = gain_lose
+        self.source = source
+
+    @property
+    def buy_signal(self) -> datetime:
+        return from_key(self.buy)
+
+    @property
+    def stop_signal(self) -> Union[datetime, str]:
+        return OPEN_POSITION if self.stop is None else from_key(self.stop)
+
+    @property
+    def day_before_buy(self) -> Optional[datetime]:
+        return from_key(self.day_before_buy_key)
+
+    @property
+    def day_before_sell(self) -> Optional[datetime]:
+        return from_key(self.day_before_sell_key)
+
+    def to_model(self) -> UnifiedTradeSignal:
+        return UnifiedTradeSignal(
+            buy_signal=self.buy_signal,
+            stop_signal=self.stop_signal,
+            entry_price=self.entry_price,
+            exit_price=self.exit_price,
+            day_before_buy=self.day_before_buy,
+            day_before_sell=self.day_before_sell,
+            gain_lose=self.gain_lose,
+            source=self.source,
+        )
+
+    @classmethod
+    def from_model(cls, model: UnifiedTradeSignal) -> "TradeSignal":
+        stop = model.stop_signal
+        return cls(
+            buy=to_key(model.buy_signal),
+            stop=to_key(stop) if isinstance(stop, datetime) else None,
+            entry_price=model.entry_price,
+            exit_price=model.exit_price,
+            day_before_buy_key=to_key(model.day_before_buy),
+            day_before_sell_key=to_key(model.day_before_sell),
+            gain_lose=model.gain_lose,
+            source=model.source,
+        )
+
+    def __repr__(self) -> str:
+        return repr(self.to_model())
+
+
+class DateKeys:
+    """
+    Розбирає рядки дат verifyData в ключі, кожен різний рядок — один раз.
+
+    ``prev_tradeday`` і ``entry_date`` угод майже завжди збігаються з
+    ``tradeday`` якогось дня, розібраним колонкою, тож поштучний розбір
+    потрібен рідко.
+    """
+
+    def __init__(self, values: Sequence[Optional[str]], keys: Sequence[Optional[int]]):
+        self._keys: Dict[str, Optional[int]] = {value: key for value, key in zip(values, keys) if value}
+
+    def __call__(self, value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        key = self._keys.get(value)
+        if key is None:
+            key = self._keys[value] = parse_api_date(value)
+        return key
@@ -0,0 +1,32 @@
+from typing import Any, Dict, Optional
+
+from app.config.queue_config import redis_conn
+from app.workers.algo_func.ohlcv_cache import STAT_FIELDS, STATS_KEY, default_cache
+
+
+class OHLCVCacheService:
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        """Сумарні влучання/промахи кешу історій з усіх воркерів."""
+        stats = dict.fromkeys(STAT_FIELDS, 0)
+        for k, v in redis_conn.hgetall(STATS_KEY).items():
+            stats[k.decode() if isinstance(k, bytes) else k] = int(v)
+        requests = sum(stats[field] for field in STAT_FIELDS)
+        stats["requests"] = requests
+        stats["hit_rate"] = (
+            round((stats["memory_hits"] + stats["redis_hits"]) / requests, 4) if requests else None
+        )
+        return stats
+
+    @staticmethod
+    def reset_stats() -> int:
+        return redis_conn.delete(STATS_KEY)
+
+    @staticmethod
+    def invalidate(code: Optional[str] = None) -> int:
+        """
+        Скидає кешовану історію коду (або всіх кодів) у Redis і локальному сховищі;
+        повертає кількість видалених ключів Redis.
+        """
+        return default_cache().invalidate(code)
@@ -0,0 +1,71 @@
+import json
+import logging
+from typing import Any, Dict
+
+from app.config.queue_config import redis_conn
+from app.workers.algo_func.profiling import ConditionProfiler, histogram_percentile
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "condition_profile"
+NAMES_KEY = f"{KEY_PREFIX}:names"
+STOCK_SUMMARY_TTL = 7 * 24 * 3600
+
+
+class ProfilingService:
+
+    @staticmethod
+    def publish(stock_code: str, profiler: ConditionProfiler) -> None:
+        """
+        Додає заміри одного коду до спільних гістограм у Redis.
+
+        Лічильники інкрементуються атомарно, тож воркери не перезаписують
+        дані один одного; підсумок по коду зберігається окремо з TTL.
+        """
+        pipe = redis_conn.pipeline(transaction=False)
+        for name, buckets in profiler.histograms().items():
+            key = f"{KEY_PREFIX}:{name}"
+            samples = profiler.samples[name]
+            pipe.sadd(NAMES_KEY, name)
+            pipe.hincrby(key, "count", len(samples))
+            pipe.hincrby(key, "total_ns", sum(samples))
+            for bucket, count in buckets.items():
+                pipe.hincrby(key, f"b{bucket}", count)
+        pipe.set(
+            f"{KEY_PREFIX}:stock:{stock_code}",
+            json.dumps(profiler.summary()),
+            ex=STOCK_SUMMARY_TTL,
+        )
+        pipe.execute()
+
+    @staticmethod
+    def aggregate() -> Dict[str, Dict[str, Any]]:
+        """
+        Зведені count / total / p50 / p99 по кожній умові з усіх воркерів.
+
+        Перцентилі оцінюються з гістограми (точність ~19%).
+        """
+        names = sorted(n.decode() if isinstance(n, bytes) else n for n in redis_conn.smembers(NAMES_KEY))
+        pipe = redis_conn.pipeline(transaction=False)
+        for name in names:
+            pipe.hgetall(f"{KEY_PREFIX}:{name}")
+
+        result: Dict[str, Dict[str, Any]] = {}
+        for name, fields in zip(names, pipe.execute()):
+            fields = {
+                (k.decode() if isinstance(k, bytes) else k): int(v) for k, v in fields.items()
+            }
+            buckets = {int(k[1:]): v for k, v in fields.items() if k.startswith("b")}
+            result[name] = {
+                "count": fields.get("count", 0),
+                "total_ms": fields.get("total_ns", 0) / 1e6,
+                "p50_ms": histogram_percentile(buckets, 0.50) / 1e6,
+                "p99_ms": histogram_percentile(buckets, 0.99) / 1e6,
+            }
+        return result
+
+    @staticmethod
+    def reset() -> int:
+        """Видаляє накопичені гістограми; повертає кількість видалених ключів."""
+        keys = [f"{KEY_PREFIX}:{n.decode() if isinstance(n, bytes) else n}" for n in redis_conn.smembers(NAMES_KEY)]
+        return redis_conn.delete(*keys, NAMES_KEY) if keys else 0
@@ -1,10 +1,20 @@
 import os
 import uuid
 from datetime import datetime
-from typing import Dict, Any
-from app.config.queue_config import algorithm_calculation_queue, result_processing_queue
+from typing import Dict, Any, List, Optional
+from rq import Queue
+from rq.job import Dependency, Job, JobStatus
+from rq.registry import DeferredJobRegistry
+from app.config.queue_config import (
+    redis_conn, algorithm_calculation_queue, algorithm_priority_queue, result_processing_queue, ohlcv_prefetch_queue,
+    ALGORITHM_WORKER_TIMEOUT, ALGORITHM_BATCH_TARGET_BARS, ALGORITHM_BATCH_MAX_CODES, ALGORITHM_BATCH_DEFAULT_BARS,
+)
+from app.services.scheduling_service import SchedulingService
 from app.models.algorithm_models import AlgorithmRequest, QueueTask
 
+# скільки зберігається запис запуску (run id → задачі) для моніторингу
+ALGORITHM_RUN_TTL = int(os.getenv('ALGORITHM_RUN_TTL', 7 * 24 * 3600))
+
 class QueueService:
 
     @staticmethod
@@ -29,6 +39,188 @@ class QueueService:
         
         return task_id
     
+    @staticmethod
+    def expected_bars(stock_codes: List[str]) -> Dict[str, int]:
+        """
+        Очікувана кількість барів кожного коду: з локального сховища OHLCV,
+        для ще не завантажених — ALGORITHM_BATCH_DEFAULT_BARS
+        """
+        bars = SchedulingService.stored_bars(stock_codes)
+        return {code: bars.get(code, ALGORITHM_BATCH_DEFAULT_BARS) for code in stock_codes}
+
+    @staticmethod
+    def plan_algorithm_batches(stock_codes: List[str], expected_bars: Optional[Dict[str, int]] = None,
+                               target_bars: int = ALGORITHM_BATCH_TARGET_BARS,
+                               max_codes: int = ALGORITHM_BATCH_MAX_CODES) -> List[List[str]]:
+        """
+        Ділить коди на пакети приблизно по ``target_bars`` барів (не більше ``max_codes`` кодів):
+        короткі історії йдуть великими пакетами, довга може бути сама
+        """
+        if expected_bars is None:
+            expected_bars = QueueService.expected_bars(stock_codes)
+
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_bars = 0
+        for code in stock_codes:
+            bars = expected_bars.get(code, ALGORITHM_BATCH_DEFAULT_BARS)
+            if batch and (batch_bars + bars > target_bars or len(batch) >= max_codes):
+                batches.append(batch)
+                batch, batch_bars = [], 0
+            batch.append(code)
+            batch_bars += bars
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def run_key(run_id: str) -> str:
+        return f"algorithm_run:{run_id}"
+
+    @staticmethod
+    def enqueue_run(stock_codes: List[str], batches: Optional[List[List[str]]] = None,
+                    costs: Optional[Dict[str, float]] = None, priority: Optional[set] = None) -> Dict[str, Any]:
+        """
+        Реєструє весь запуск одним MULTI/EXEC: prefetch, задачі ``{run_id}-{n}``, запис ``algorithm_run:{run_id}``
+        """
+        costs = costs or {}
+        priority = priority or set()
+        run_id = uuid.uuid4().hex
+        created_at = datetime.now().isoformat()
+        prefetch_task_id = f"{run_id}-prefetch"
+
+        prefetch_job = ohlcv_prefetch_queue.create_job(
+            'app.workers.prefetch_worker.process_prefetch_task',
+            args=({
+                "task_id": prefetch_task_id,
+                "run_id": run_id,
+                "stocks": list(stock_codes),
+                "created_at": created_at,
+                "queue_name": "ohlcv_prefetch"
+            },),
+            job_id=prefetch_task_id,
+            meta={"run_id": run_id},
+        )
+
+        depends_on = Dependency(jobs=[prefetch_task_id], allow_failure=True)
+        # інакше Job.save питає INFO у Redis для кожної задачі окремо
+        server_version = algorithm_calculation_queue.get_redis_server_version()
+        units = batches if batches is not None else [[code] for code in stock_codes]
+        jobs = []
+        for n, codes in enumerate(units):
+            task_id = f"{run_id}-{n}"
+            cost_ms = sum(costs.get(code, 0.0) for code in codes) if costs else None
+            queue = algorithm_priority_queue if priority.intersection(codes) else algorithm_calculation_queue
+            task_data = {
+                "task_id": task_id,
+                "run_id": run_id,
+                "created_at": created_at,
+                "queue_name": "algorithm_calculation"
+            }
+            if batches is not None:
+                task_data["stocks"] = list(codes)
+                func = 'app.workers.algorithm_worker.process_algorithm_batch_task'
+                timeout = ALGORITHM_WORKER_TIMEOUT * len(codes)
+            else:
+                task_data["stock"] = codes[0]
+                func = 'app.workers.algorithm_worker.process_algorithm_task'
+                timeout = None
+
+            meta = {"run_id": run_id}
+            if cost_ms is not None:
+                meta["estimated_cost_ms"] = cost_ms
+            job = queue.create_job(
+                func, args=(task_data,), job_id=task_id, meta=meta, timeout=timeout,
+                depends_on=depends_on, status=JobStatus.DEFERRED,
+            )
+            job.redis_server_version = server_version
+            jobs.append(job)
+
+        run_key = QueueService.run_key(run_id)
+        # відкладені задачі реєструються залежними від prefetch у тій самій транзакції, де він стає в чергу;
+        # Queue.enqueue_many з RQ 1.15 не додає їх у множину залежних, і вони не стартують ніколи
+        with redis_conn.pipeline() as pipe:
+            for job in jobs:
+                job.save(pipeline=pipe)
+                job.register_dependency(pipeline=pipe)
+            ohlcv_prefetch_queue._enqueue_job(prefetch_job, pipeline=pipe)
+            pipe.hset(run_key, mapping={
+                "run_id": run_id,
+                "created_at": created_at,
+                "stocks": len(stock_codes),
+                "prefetch_task_id": prefetch_task_id,
+                "jobs": len(jobs),
+            })
+            if jobs:
+                pipe.rpush(f"{run_key}:jobs", *[job.id for job in jobs])
+            pipe.expire(run_key, ALGORITHM_RUN_TTL)
+            pipe.expire(f"{run_key}:jobs", ALGORITHM_RUN_TTL)
+            pipe.execute()
+
+        return {
+            "run_id": run_id,
+            "prefetch_task_id": prefetch_task_id,
+            "task_ids": [job.id for job in jobs],
+        }
+
+    @staticmethod
+    def get_run_status(run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Стан запуску: кількість задач алгоритмів за статусом RQ і статус
+        попереднього завантаження; None, якщо запуску немає (або минув ALGORITHM_RUN_TTL)
+        """
+        run_key = QueueService.run_key(run_id)
+        with redis_conn.pipeline() as pipe:
+            pipe.hgetall(run_key)
+            pipe.lrange(f"{run_key}:jobs", 0, -1)
+            run, job_ids = pipe.execute()
+        if not run:
+            return None
+        run = {key.decode(): value.decode() for key, value in run.items()}
+        job_ids = [job_id.decode() for job_id in job_ids]
+
+        with redis_conn.pipeline() as pipe:
+            pipe.hget(Job.key_for(run["prefetch_task_id"]), "status")
+            for job_id in job_ids:
+                pipe.hget(Job.key_for(job_id), "status")
+            statuses = [status.decode() if status else "expired" for status in pipe.execute()]
+
+        counts: Dict[str, int] = {}
+        for status in statuses[1:]:
+            counts[status] = counts.get(status, 0) + 1
+        return {
+            "run_id": run_id,
+            "created_at": run["created_at"],
+            "stocks": int(run["stocks"]),
+            "prefetch_task_id": run["prefetch_task_id"],
+            "prefetch_status": statuses[0],
+            "jobs": int(run["jobs"]),
+            "job_statuses": counts,
+        }
+
+    @staticmethod
+    def release_dependents_by_cost(job_id: str) -> int:
+        """
+        Ставить у черги задачі, що чекають на ``job_id``, від найдорожчої (meta ``estimated_cost_ms``)
+
+        RQ відпускає залежні задачі з множини Redis у довільному порядку, і
+        LPT-порядок запуску губиться. Викликається задачею попереднього
+        завантаження наприкінці; те, що додалось пізніше, RQ відпустить сам.
+        """
+        parent = Job.fetch(job_id, connection=redis_conn)
+        dependent_ids = [i.decode() if isinstance(i, bytes) else i for i in redis_conn.smembers(parent.dependents_key)]
+        dependents = [job for job in Job.fetch_many(dependent_ids, connection=redis_conn) if job is not None]
+        dependents.sort(key=lambda job: -(job.meta.get("estimated_cost_ms") or 0))
+
+        with redis_conn.pipeline() as pipe:
+            for job in dependents:
+                DeferredJobRegistry(job.origin, connection=redis_conn).remove(job, pipeline=pipe)
+                # enqueue_job знову відклав би задачу: батьківська ще виконується
+                Queue(job.origin, connection=redis_conn)._enqueue_job(job, pipeline=pipe)
+                pipe.srem(parent.dependents_key, job.id)
+            pipe.execute()
+        return len(dependents)
+
     @staticmethod
     def add_to_result_processing_queue(stock_code: str) -> str:
         """
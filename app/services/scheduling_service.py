@@ -0,0 +1,92 @@
+import logging
+import os
+from statistics import median
+from typing import Dict, List, Optional, Set
+
+from app.config.queue_config import redis_conn, ALGORITHM_BATCH_DEFAULT_BARS
+from app.workers.algo_func.ohlcv_store import default_store
+
+logger = logging.getLogger(__name__)
+
+RUNTIME_KEY = "algorithm_runtime_ms"
+# час прогону росте швидше за кількість барів: cost ≈ k · bars^exponent
+ALGORITHM_COST_EXPONENT = float(os.getenv("ALGORITHM_COST_EXPONENT", 1.3))
+# k, поки немає жодного коду з відомими і часом, і кількістю барів
+ALGORITHM_COST_DEFAULT_K = float(os.getenv("ALGORITHM_COST_DEFAULT_K", 0.005))
+ALGORITHM_PRIORITY_QUEUES = os.getenv("ALGORITHM_PRIORITY_QUEUES", "false").lower() == "true"
+# частка найдорожчих кодів, що йдуть у чергу з пріоритетом
+ALGORITHM_PRIORITY_SHARE = float(os.getenv("ALGORITHM_PRIORITY_SHARE", 0.1))
+
+
+class SchedulingService:
+
+    @staticmethod
+    def record_runtime(stock_code: str, elapsed_ms: float) -> None:
+        """Зберігає виміряний час обробки коду — оцінка вартості для наступних запусків."""
+        redis_conn.hset(RUNTIME_KEY, stock_code, round(elapsed_ms, 1))
+
+    @staticmethod
+    def measured_runtimes(stock_codes: List[str]) -> Dict[str, float]:
+        if not stock_codes:
+            return {}
+        values = redis_conn.hmget(RUNTIME_KEY, stock_codes)
+        return {code: float(value) for code, value in zip(stock_codes, values) if value is not None}
+
+    @staticmethod
+    def stored_bars(stock_codes: List[str]) -> Dict[str, int]:
+        """Кількість барів кодів, що вже є в локальному сховищі OHLCV."""
+        store = default_store()
+        bars = {}
+        for code in stock_codes:
+            meta = store.read_meta(code)
+            if meta:
+                bars[code] = meta["rows"]
+        return bars
+
+    @staticmethod
+    def estimate_costs(stock_codes: List[str], runtimes: Optional[Dict[str, float]] = None,
+                       bars: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+        """
+        Оцінка часу обробки кожного коду, мс.
+
+        Виміряний час попереднього запуску, якщо він є; інакше
+        k · bars^ALGORITHM_COST_EXPONENT, де k — медіана по кодах, для яких
+        відомі і час, і кількість барів. Коди без історії в сховищі
+        рахуються як ALGORITHM_BATCH_DEFAULT_BARS барів.
+        """
+        if runtimes is None:
+            try:
+                runtimes = SchedulingService.measured_runtimes(stock_codes)
+            except Exception as e:
+                logger.warning(f"Failed to read measured runtimes, using bar counts only: {str(e)}")
+                runtimes = {}
+        if bars is None:
+            bars = SchedulingService.stored_bars(stock_codes)
+
+        exponent = ALGORITHM_COST_EXPONENT
+        ratios = [runtimes[code] / bars[code] ** exponent for code in runtimes if bars.get(code)]
+        k = median(ratios) if ratios else ALGORITHM_COST_DEFAULT_K
+
+        return {
+            code: runtimes[code] if code in runtimes
+            else k * bars.get(code, ALGORITHM_BATCH_DEFAULT_BARS) ** exponent
+            for code in stock_codes
+        }
+
+    @staticmethod
+    def lpt_order(stock_codes: List[str], costs: Dict[str, float]) -> List[str]:
+        """
+        Longest-processing-time-first: найдорожчі коди на початок черги.
+
+        Довгі історії стартують першими, а короткі заповнюють воркери в
+        кінці, тож хвіст запуску не чекає на один 20-річний код.
+        Сортування стабільне — коди з рівною оцінкою лишаються в порядку запуску.
+        """
+        return sorted(stock_codes, key=lambda code: -costs.get(code, 0.0))
+
+    @staticmethod
+    def priority_codes(ordered_codes: List[str], share: float = ALGORITHM_PRIORITY_SHARE) -> Set[str]:
+        """Перші ``share`` кодів LPT-порядку — для черги з пріоритетом."""
+        if not ordered_codes or share <= 0:
+            return set()
+        return set(ordered_codes[:max(1, int(len(ordered_codes) * share))])
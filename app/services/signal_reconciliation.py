@@ -0,0 +1,151 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.models.trade_signal import TradeSignal, from_key
+from app.workers.algo_func.trade_calendar import TradeCalendar
+
+# відхилення дати сигналу, що ще вважається збігом, у торгових днях
+DEVIATION_DAYS = 2
+
+
+@dataclass
+class ReconciliationResult:
+    match_count: int = 0
+    deviations: int = 0
+    deviations_data: List[str] = field(default_factory=list)
+    unmatched_api_data: List[str] = field(default_factory=list)
+    unmatched_algo: List[TradeSignal] = field(default_factory=list)
+    # дати сигналів, яких немає в торгових днях API (для них немає збігу ±2 дні), у порядку появи
+    missing_dates: List[datetime] = field(default_factory=list)
+
+
+class _Index:
+    """
+    Сигнали алгоритму, згруповані за точною датою купівлі/продажу (ключ
+    дати; продаж None — відкрита позиція) і за порядковим номером торгового
+    дня; ``alive`` — ще не зіставлені.
+    """
+
+    def __init__(self, signals: List[TradeSignal], calendar: TradeCalendar):
+        self.signals = signals
+        self.alive = [True] * len(signals)
+        self.buy_value: Dict[Optional[int], List[int]] = defaultdict(list)
+        self.stop_value: Dict[Optional[int], List[int]] = defaultdict(list)
+        self.buy_ordinal: Dict[int, List[int]] = defaultdict(list)
+        self.stop_ordinal: Dict[int, List[int]] = defaultdict(list)
+        self.buy_ordinals: List[Optional[int]] = []
+        self.stop_ordinals: List[Optional[int]] = []
+
+        for i, signal in enumerate(signals):
+            self.buy_value[signal.buy].append(i)
+            self.stop_value[signal.stop].append(i)
+            buy = calendar.position(signal.buy) if signal.buy is not None else None
+            stop = calendar.position(signal.stop) if signal.stop is not None else None
+            self.buy_ordinals.append(buy)
+            self.stop_ordinals.append(stop)
+            if buy is not None:
+                self.buy_ordinal[buy].append(i)
+            if stop is not None:
+                self.stop_ordinal[stop].append(i)
+
+    def candidates(self, buy_value: Optional[int], stop_value: Optional[int],
+                   buy: Optional[int], stop: Optional[int]) -> List[int]:
+        """Живі сигнали, з якими сигнал API має хоч одну рівну або близьку дату, у порядку списку."""
+        found = set(self.buy_value.get(buy_value, ()))
+        found.update(self.stop_value.get(stop_value, ()))
+        for ordinal, buckets in ((buy, self.buy_ordinal), (stop, self.stop_ordinal)):
+            if ordinal is not None:
+                for day in range(ordinal - DEVIATION_DAYS, ordinal + DEVIATION_DAYS + 1):
+                    found.update(buckets.get(day, ()))
+        return sorted(i for i in found if self.alive[i])
+
+
+def reconcile_signals(api_signals: List[TradeSignal], algo_signals: List[TradeSignal],
+                      calendar: TradeCalendar) -> ReconciliationResult:
+    """
+    Зіставляє сигнали API з сигналами алгоритму: точні збіги дат купівлі/продажу
+    і відхилення до ±2 торгових днів.
+
+    Правила ті самі, що в попередньому переборі всіх пар зі ``list.pop``:
+    для кожного сигналу API (у порядку API) переглядаються ще не зіставлені
+    сигнали алгоритму в порядку списку, лічильники ростуть і для тих пар,
+    що не закривають пошук. Переглядати треба лише ті пари, де збігається
+    або близька хоч одна дата — решта нічого не змінює. Тому сигнали
+    алгоритму один раз індексуються за датами і порядковими номерами
+    торгових днів, і кожен сигнал API дивиться лише вікно ±2 дні.
+
+    Дати порівнюються як цілі ключі (``to_key``), ``calendar`` побудований з
+    ключів торгових днів; у тексти відхилень потрапляють ті самі datetime.
+    """
+    result = ReconciliationResult()
+    index = _Index(algo_signals, calendar)
+    missing: Dict[int, None] = {}
+
+    for api_item in api_signals:
+        api_buy_index = calendar.position(api_item.buy) if api_item.buy is not None else None
+        api_stop_index = calendar.position(api_item.stop) if api_item.stop is not None else None
+        if api_item.buy is not None and api_buy_index is None:
+            missing.setdefault(api_item.buy)
+        if api_item.stop is not None and api_stop_index is None:
+            missing.setdefault(api_item.stop)
+
+        found_match = False
+        for i in index.candidates(api_item.buy, api_item.stop, api_buy_index, api_stop_index):
+            csv_item = algo_signals[i]
+            exact_buy = api_item.buy == csv_item.buy
+            except_sell = api_item.stop == csv_item.stop
+
+            if exact_buy and except_sell:
+                result.match_count += 2
+                index.alive[i] = False
+                found_match = True
+                break
+
+            csv_buy_index = index.buy_ordinals[i]
+            buy_match = (api_buy_index is not None and csv_buy_index is not None
+                         and abs(api_buy_index - csv_buy_index) <= DEVIATION_DAYS)
+
+            if api_item.stop is not None and csv_item.stop is not None:
+                csv_stop_index = index.stop_ordinals[i]
+                stop_match = (api_stop_index is not None and csv_stop_index is not None
+                              and abs(api_stop_index - csv_stop_index) <= DEVIATION_DAYS)
+            else:
+                stop_match = except_sell
+
+            if buy_match and not exact_buy and stop_match and not except_sell:
+                result.deviations += 2
+                result.deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
+                result.deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
+                index.alive[i] = False
+                found_match = True
+                break
+
+            if exact_buy or except_sell:
+                result.match_count += 1
+
+            if buy_match and not exact_buy or stop_match and not except_sell:
+                result.deviations += 1
+                if stop_match and not except_sell:
+                    result.deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
+                if buy_match and not exact_buy:
+                    result.deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
+
+            if (exact_buy and stop_match) or (except_sell and buy_match):
+                index.alive[i] = False
+                found_match = True
+                break
+
+        if not found_match:
+            result.unmatched_api_data.append(f'Buy:{api_item.buy_signal}, Sell:{api_item.stop_signal};')
+
+    for i, csv_item in enumerate(algo_signals):
+        if csv_item.buy is not None and index.buy_ordinals[i] is None:
+            missing.setdefault(csv_item.buy)
+        if csv_item.stop is not None and index.stop_ordinals[i] is None:
+            missing.setdefault(csv_item.stop)
+
+    result.unmatched_algo = [item for item, alive in zip(algo_signals, index.alive) if alive]
+    result.missing_dates = [from_key(key) for key in missing]
+    return result
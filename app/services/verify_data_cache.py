@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from app.services.verify_data_client import VerifyDataClient, default_client
+from app.workers.algo_func.ohlcv_store import OHLCVStore, default_store
+
+logger = logging.getLogger(__name__)
+
+VERIFY_DATA_CACHE_ENABLED = os.getenv("VERIFY_DATA_CACHE_ENABLED", "true").lower() == "true"
+VERIFY_DATA_CACHE_DIR = os.getenv("VERIFY_DATA_CACHE_DIR", "data/verify_data")
+# calendar — застаріла, коли в індексі 2800 є новіший торговий день; ttl — за віком;
+# always — будь-яка збережена відповідь (повторні прогони офлайн); never — лише запис
+VERIFY_DATA_CACHE_POLICY = os.getenv("VERIFY_DATA_CACHE_POLICY", "calendar").lower()
+# вік, після якого відповідь завантажується заново за будь-якої політики, крім always; 0 — без обмеження
+VERIFY_DATA_CACHE_MAX_AGE = int(os.getenv("VERIFY_DATA_CACHE_MAX_AGE", 7 * 24 * 3600))
+# API публікує день із запізненням: не питати той самий код частіше, ніж раз на стільки секунд
+VERIFY_DATA_CACHE_RECHECK = int(os.getenv("VERIFY_DATA_CACHE_RECHECK", 3600))
+VERIFY_DATA_CACHE_SERVE_STALE = os.getenv("VERIFY_DATA_CACHE_SERVE_STALE", "true").lower() == "true"
+INDEX_CODE = "2800"
+
+
+def _newest_tradeday(payload: Any) -> Optional[str]:
+    days = [day.get("tradeday") for day in payload if isinstance(day, dict) and day.get("tradeday")]
+    return max(days)[:10] if days else None
+
+
+class VerifyDataCache:
+    """
+    Відповіді verifyData по кодах під ``data/verify_data``.
+
+    ``{code}.json`` — тіло відповіді, ``{code}.meta.json`` — найновіший
+    ``tradeday``, час завантаження і sha1 тіла. Обидва файли пишуться
+    атомарно; тіло, що не збігається з хешем (обірваний чи паралельний
+    запис), вважається відсутнім.
+    """
+
+    def __init__(self, root: str = VERIFY_DATA_CACHE_DIR, policy: str = VERIFY_DATA_CACHE_POLICY,
+                 max_age: int = VERIFY_DATA_CACHE_MAX_AGE, recheck: int = VERIFY_DATA_CACHE_RECHECK,
+                 store: Optional[OHLCVStore] = None):
+        self.root = root
+        self.policy = policy
+        self.max_age = max_age
+        self.recheck = recheck
+        self.store = store
+
+    def _path(self, code: str, suffix: str) -> str:
+        return os.path.join(self.root, f"{code}{suffix}")
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        tmp = f"{path}.{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def read_meta(self, code: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(code, ".meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def read(self, code: str, meta: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        meta = meta or self.read_meta(code)
+        if meta is None:
+            return None
+        try:
+            with open(self._path(code, ".json"), "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        if hashlib.sha1(body).hexdigest() != meta.get("sha1"):
+            logger.warning(f"verifyData cache for {code} does not match its hash, ignoring it")
+            return None
+        return json.loads(body)
+
+    def write(self, code: str, payload: Any) -> Dict[str, Any]:
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        meta = {
+            "code": code,
+            "last_tradeday": _newest_tradeday(payload),
+            "rows": len(payload),
+            "bytes": len(body),
+            "sha1": hashlib.sha1(body).hexdigest(),
+            "fetched_at": time.time(),
+        }
+        os.makedirs(self.root, exist_ok=True)
+        self._write_atomic(self._path(code, ".json"), body)
+        self._write_atomic(self._path(code, ".meta.json"), json.dumps(meta).encode("utf-8"))
+        return meta
+
+    def invalidate(self, code: Optional[str] = None) -> int:
+        """Видаляє збережену відповідь коду (без ``code`` — всіх кодів); повертає кількість кодів."""
+        if code is not None:
+            names = [f"{code}.json", f"{code}.meta.json"]
+        else:
+            names = os.listdir(self.root) if os.path.isdir(self.root) else []
+        removed = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                continue
+            removed += name.endswith(".meta.json")
+        return removed
+
+    def latest_trading_day(self) -> Optional[str]:
+        """Останній торговий день за індексом 2800 у локальному сховищі OHLCV."""
+        meta = (self.store or default_store()).read_meta(INDEX_CODE)
+        return meta.get("last_date") if meta else None
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        if self.policy == "always":
+            return True
+        if self.policy == "never":
+            return False
+        age = time.time() - meta.get("fetched_at", 0)
+        if self.max_age and age >= self.max_age:
+            return False
+        if self.policy == "ttl":
+            return True
+        if age < self.recheck:
+            return True
+        latest = self.latest_trading_day()
+        if latest is None or meta.get("last_tradeday") is None:
+            return False
+        return meta["last_tradeday"] >= latest
+
+
+_default_cache: Optional[VerifyDataCache] = None
+
+
+def default_cache() -> VerifyDataCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = VerifyDataCache()
+    return _default_cache
+
+
+async def fetch_signals(stock_code: str, client: Optional[VerifyDataClient] = None,
+                        cache: Optional[VerifyDataCache] = None, refresh: bool = False) -> Any:
+    """
+    Відповідь verifyData для коду: з диска, поки вона не застаріла, інакше з API.
+
+    Якщо API недоступне, а на диску є застаріла відповідь, з
+    ``VERIFY_DATA_CACHE_SERVE_STALE`` повертається вона. Порожні відповіді
+    не зберігаються. ``VERIFY_DATA_CACHE_ENABLED=false`` — завжди з API.
+    """
+    client = client or default_client()
+    if not VERIFY_DATA_CACHE_ENABLED and cache is None:
+        return await client.fetch_signals(stock_code)
+
+    cache = cache or default_cache()
+    meta = cache.read_meta(stock_code)
+    if meta is not None and not refresh and cache.is_fresh(meta):
+        payload = cache.read(stock_code, meta)
+        if payload is not None:
+            return payload
+
+    try:
+        payload = await client.fetch_signals(stock_code)
+    except Exception as e:
+        stale = cache.read(stock_code, meta) if meta is not None and VERIFY_DATA_CACHE_SERVE_STALE else None
+        if stale is None:
+            raise
+        logger.warning(f"verifyData for {stock_code} failed, serving cached response "
+                       f"of {meta.get('last_tradeday')}: {str(e)}")
+        return stale
+
+    if payload:
+        try:
+            cache.write(stock_code, payload)
+        except OSError as e:
+            logger.warning(f"Failed to cache verifyData response for {stock_code}: {str(e)}")
+    return payload
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Optional
+
+import aiohttp
+
+from app.workers.async_runtime import get_http_session
+
+logger = logging.getLogger(__name__)
+
+VERIFY_DATA_BASE_URL = os.getenv("VERIFY_DATA_BASE_URL", "http://ete.stockfisher.com.hk").rstrip("/")
+VERIFY_DATA_PATH = "/v1.1/debugHKEX/verifyData"
+# одночасних запитів з одного циклу подій; у форкаючому RQ Worker це одна задача
+VERIFY_DATA_CONCURRENCY = int(os.getenv("VERIFY_DATA_CONCURRENCY", 4))
+# запитів за секунду (token bucket); 0 — без обмеження
+VERIFY_DATA_RATE = float(os.getenv("VERIFY_DATA_RATE", 5))
+VERIFY_DATA_BURST = int(os.getenv("VERIFY_DATA_BURST", 5))
+VERIFY_DATA_TIMEOUT = float(os.getenv("VERIFY_DATA_TIMEOUT", 30))
+VERIFY_DATA_CONNECT_TIMEOUT = float(os.getenv("VERIFY_DATA_CONNECT_TIMEOUT", 5))
+VERIFY_DATA_MAX_RETRIES = int(os.getenv("VERIFY_DATA_MAX_RETRIES", 3))
+# база експоненційної затримки між спробами, секунди
+VERIFY_DATA_BACKOFF = float(os.getenv("VERIFY_DATA_BACKOFF", 0.5))
+VERIFY_DATA_MAX_BACKOFF = float(os.getenv("VERIFY_DATA_MAX_BACKOFF", 10))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Не більше ``rate`` запитів за секунду в середньому, до ``burst`` поспіль.
+
+    Лише для одного циклу подій: між перевіркою й списанням токена немає
+    ``await``, тож блокування не потрібне.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class VerifyDataClient:
+    """
+    Клієнт verifyData поверх спільної ``aiohttp`` сесії воркера.
+
+    Не більше ``concurrency`` запитів одночасно і ``rate`` за секунду;
+    тайм-аут на кожну спробу; обрив з'єднання, тайм-аут, 429 і 5xx
+    повторюються до ``max_retries`` разів з експоненційною затримкою та
+    випадковим розкидом (full jitter), щоб воркери не били в API хвилею.
+    Інші 4xx одразу піднімають ``aiohttp.ClientResponseError``.
+    """
+
+    def __init__(self, base_url: str = VERIFY_DATA_BASE_URL, api_key: Optional[str] = None,
+                 concurrency: int = VERIFY_DATA_CONCURRENCY, rate: float = VERIFY_DATA_RATE,
+                 burst: int = VERIFY_DATA_BURST, timeout: float = VERIFY_DATA_TIMEOUT,
+                 connect_timeout: float = VERIFY_DATA_CONNECT_TIMEOUT, max_retries: int = VERIFY_DATA_MAX_RETRIES,
+                 backoff: float = VERIFY_DATA_BACKOFF, max_backoff: float = VERIFY_DATA_MAX_BACKOFF,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.url = base_url.rstrip("/") + VERIFY_DATA_PATH
+        self.api_key = api_key if api_key is not None else os.getenv("API_KEY")
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = session
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _get(self, params: dict) -> Any:
+        session = self.session or get_http_session()
+        headers = {'x-api-key': self.api_key} if self.api_key else {}
+        attempt = 0
+        while True:
+            retry_after = None
+            async with self.semaphore:
+                await self.bucket.acquire()
+                try:
+                    async with session.get(self.url, params=params, headers=headers, timeout=self.timeout) as response:
+                        if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                            response.raise_for_status()
+                            return await response.json(content_type=None)
+                        retry_after = response.headers.get("Retry-After")
+                        reason = f"HTTP {response.status}"
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    reason = f"{type(e).__name__}: {str(e)}"
+
+            # затримка — поза семафором, щоб не тримати слот
+            delay = self._delay(attempt, retry_after)
+            attempt += 1
+            logger.warning(f"verifyData {params.get('Code')}: {reason}, retry {attempt}/{self.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def fetch_signals(self, stock_code: str, trade_day: str = "") -> Any:
+        """Сирі дані verifyData (verifyType=signal) для коду — список днів з позицією і діями."""
+        return await self._get({"TradeDay": trade_day, "Code": stock_code, "verifyType": "signal"})
+
+
+_client: Optional[VerifyDataClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def default_client() -> VerifyDataClient:
+    """
+    Клієнт процесу з налаштуваннями з env.
+
+    Ліміти прив'язані до циклу подій, тож для нового циклу (звичайний RQ
+    воркер відкриває його на кожну задачу) клієнт створюється заново.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        _client = VerifyDataClient()
+        _client_loop = loop
+    return _client
@@ -0,0 +1,233 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Union
+
+from app.workers.algo_func.indicators import (
+    IndicatorSet, lagged, rolling_argmax, rolling_argmin, rolling_max, rolling_min, window_slopes, window_sums,
+)
+from app.workers.algo_func.ohlcv_series import OHLCV, OHLCVSeries, as_series
+from app.workers.algo_func.profiling import measure
+from app.workers.algo_func.trade_calendar import TradeCalendar
+
+BUY_CONDITIONS = ['B1', 'B3', 'B8', 'B9', 'B10', 'B11', 'B12', 'B13', 'B18']
+
+
+@dataclass
+class BuyConditionMatrix:
+    """
+    Buy conditions for every bar of a stock.
+
+    Row ``i`` holds what ``runAllBuyConditions`` returns for ``ohlcv[:i + 1]``:
+    ``flags[i, j]`` is condition ``BUY_CONDITIONS[j]`` and ``stop_loss[i]``
+    is ``calcS1Stop``. None of these depend on position state, so the whole
+    matrix is built once per stock and the F/I loop only indexes into it.
+    """
+    flags: np.ndarray
+    stop_loss: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.stop_loss)
+
+    @property
+    def buy(self) -> np.ndarray:
+        """``isBuy`` for every bar."""
+        f = self.flags
+        return f[:, :8].all(axis=1) | f[:, 8]
+
+    def signals_at(self, index: int) -> Dict[str, Union[bool, float]]:
+        """Row ``index`` in the same shape as ``runAllBuyConditions``."""
+        signals: Dict[str, Union[bool, float]] = {
+            name: bool(self.flags[index, j]) for j, name in enumerate(BUY_CONDITIONS)
+        }
+        signals['stopLoss'] = float(self.stop_loss[index])
+        return signals
+
+
+def _b1(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    highs, lows, closes = ind.highs, ind.lows, ind.closes
+    prev20High = lagged(rolling_max(highs, 20), 1)
+    condNewHigh = highs > prev20High
+
+    upper = ind.bollinger(51, 1.9)[0]
+    sma51 = ind.sma(51)
+    deviation = (closes - sma51) / sma51
+    condBoll = (sma51 != 0) & (closes > upper) & (deviation < 0.25)
+
+    condCloseInUpperRange = closes > lows + 0.65 * (highs - lows)
+    return (bars >= 51) & (condNewHigh | condBoll) & condCloseInUpperRange
+
+
+def _b3(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(ind), dtype=bool)
+    start = 20 + 71
+    if len(ind) - start >= 58:
+        slopes = window_slopes(ind.bb_width_sma(21, 2, 72)[start:], 58)
+        out[start + 57:] = slopes < 0
+    # len(bb) = bars - 20 must reach 72 + 58
+    return out & (bars - 20 >= 72 + 58)
+
+
+def _b8(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    recent46Low = rolling_min(ind.lows, 46)
+    pastMin = lagged(rolling_min(ind.lows, 270 - 46), 46)
+    return (bars >= 270) & (recent46Low > pastMin)
+
+
+def _b9(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    maxHigh = rolling_max(ind.highs, 50)
+    minLow = rolling_min(ind.lows, 50)
+    highIndex = rolling_argmax(ind.highs, 50)
+    lowIndex = rolling_argmin(ind.lows, 50)
+    mid = (maxHigh + minLow) / 2
+
+    condCloseBelowMid = ind.closes < mid
+    condHighEarlierThanLow = highIndex < lowIndex
+    return (bars >= 50) & ~(condCloseBelowMid & condHighEarlierThanLow)
+
+
+def _b10(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    minIndex = rolling_argmin(ind.lows, 250)
+    daysSinceLow = 250 - 1 - minIndex
+    return (bars >= 250) & (daysSinceLow >= 68)
+
+
+def _b11(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    atr22 = ind.atr(22)
+    maxATR = rolling_max(atr22, 126)
+    return (bars >= 126 + 22) & ~(atr22 > 0.87 * maxATR)
+
+
+def _b12(ind: IndicatorSet, calendar: TradeCalendar, dates: List[str], input_B12_growth: float = 0.16,
+         input_B12_days: int = 50, input_B12_deviation: float = 0.2) -> np.ndarray:
+    n = len(ind)
+    # checkB12 uses the first bar with the target date
+    firstIndex = calendar.positions
+    targetIndex = np.array([firstIndex[d] for d in dates], dtype=np.int64)
+
+    # sums150[k] covers closes[k:k + 150]
+    sums150 = np.full(n + 1, np.nan)
+    if n >= 150:
+        sums150[:n - 149] = window_sums(ind.closes, 150)
+
+    valid = targetIndex >= 150 + input_B12_days
+    t = np.where(valid, targetIndex, 150 + input_B12_days)
+    smaNow = sums150[t - 150] / 150
+    smaPast = sums150[t - input_B12_days - 150] / 150
+    smaGrowth = (smaNow - smaPast) / smaPast
+    deviation = (ind.highs[np.minimum(t, n - 1)] - smaNow) / smaNow
+    cancel = (smaGrowth >= input_B12_growth) & (deviation >= input_B12_deviation)
+    return valid & ~cancel
+
+
+def _b13(dates: List[str], closes: np.ndarray, spyData: OHLCVSeries,
+         periods: List[int] = [19, 60]) -> np.ndarray:
+    n = len(dates)
+    out = np.zeros(n, dtype=bool)
+    if not n or not spyData:
+        return out
+
+    idxCloseByDate = dict(zip(spyData.date_strings.tolist(), spyData.close.tolist()))
+    positions = [i for i, d in enumerate(dates) if d in idxCloseByDate]
+    if not positions:
+        return out
+
+    s = closes[positions]
+    idx = np.array([idxCloseByDate[dates[i]] for i in positions], dtype=np.float64)
+    m = len(positions)
+    maxPeriod = max(periods)
+
+    underperformAll = np.ones(m, dtype=bool)
+    for period in periods:
+        under = np.zeros(m, dtype=bool)
+        if m > period:
+            sRet = (s[period:] - s[:-period]) / s[:-period]
+            iRet = (idx[period:] - idx[:-period]) / idx[:-period]
+            under[period:] = sRet < iRet
+        underperformAll &= under
+
+    # number of aligned bars inside each prefix; the last of them is the one checked
+    alignedCount = np.zeros(n, dtype=np.int64)
+    alignedCount[positions] = 1
+    alignedCount = np.cumsum(alignedCount)
+    last = np.maximum(alignedCount - 1, 0)
+    return (alignedCount >= maxPeriod + 1) & ~underperformAll[last]
+
+
+def _b18(ind: IndicatorSet, bars: np.ndarray) -> np.ndarray:
+    closes = ind.closes
+    lastSMA50 = ind.sma(50)
+    lastSMA150 = ind.sma(150)
+    lastSMA200 = ind.sma(200)
+    sma200_21d_ago = lagged(lastSMA200, 20)
+
+    cond1 = (closes > lastSMA150) & (closes > lastSMA200)
+    cond2 = lastSMA150 > lastSMA200
+    cond3 = lastSMA200 > sma200_21d_ago
+    cond4 = (lastSMA50 > lastSMA150) & (lastSMA50 > lastSMA200)
+    cond5 = closes > lastSMA50
+
+    last250High = rolling_max(ind.highs, 250)
+    last250Low = rolling_min(ind.lows, 250)
+    cond6 = closes >= last250Low * 1.30
+    cond7 = closes >= last250High * 0.75
+
+    width = ind.bb_width(21, 2)
+    avgBBW21 = np.full(len(ind), np.nan)
+    avgBBW82 = np.full(len(ind), np.nan)
+    if len(ind) >= 20 + 82:
+        avgBBW21[20 + 20:] = window_sums(width[20:], 21) / 21
+        avgBBW82[20 + 81:] = window_sums(width[20:], 82) / 82
+    cond8 = (avgBBW21 < 0.22 * avgBBW82) & (closes > ind.bollinger(21, 2)[0])
+
+    return (bars >= 250) & cond1 & cond2 & cond3 & cond4 & cond5 & cond6 & cond7 & cond8
+
+
+def _s1_stop(ind: IndicatorSet, factor: float = 3.7, atrPeriod: int = 22) -> np.ndarray:
+    closes = ind.closes.tolist()
+    atr = ind.atr(atrPeriod).tolist()
+    out = [float('nan')] * len(closes)
+    for i in range(atrPeriod, len(closes)):
+        close = closes[i]
+        if close <= 0:
+            continue
+        baseStop = close - factor * atr[i]
+        riskFrac = (close - baseStop) / close
+        # Python round() rounds decimally, np.round does not
+        if riskFrac > 0.30:
+            out[i] = round(close * (1 - 0.1425), 4)
+        elif riskFrac > 0.20:
+            out[i] = round(close * (1 - 0.095), 4)
+        else:
+            out[i] = round(baseStop, 4)
+    return np.array(out, dtype=np.float64)
+
+
+def build_buy_matrix(ohlcv: Union[OHLCVSeries, List[OHLCV]], spyData: Union[OHLCVSeries, List[OHLCV]],
+                     indicators: Optional[IndicatorSet] = None) -> BuyConditionMatrix:
+    """Evaluate every buy condition for every bar of ``ohlcv`` in one vectorized pass."""
+    ohlcv = as_series(ohlcv)
+    if indicators is None:
+        indicators = IndicatorSet.from_bars(ohlcv)
+    n = len(indicators)
+    if n == 0:
+        return BuyConditionMatrix(
+            flags=np.zeros((0, len(BUY_CONDITIONS)), dtype=bool),
+            stop_loss=np.empty(0, dtype=np.float64),
+        )
+    dates = ohlcv.date_strings.tolist()
+    bars = np.arange(1, n + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns = [
+            measure('B1', _b1, indicators, bars),
+            measure('B3', _b3, indicators, bars),
+            measure('B8', _b8, indicators, bars),
+            measure('B9', _b9, indicators, bars),
+            measure('B10', _b10, indicators, bars),
+            measure('B11', _b11, indicators, bars),
+            measure('B12', _b12, indicators, ohlcv.calendar, dates),
+            measure('B13', _b13, dates, indicators.closes, as_series(spyData)),
+            measure('B18', _b18, indicators, bars),
+        ]
+        stop_loss = measure('stopLoss', _s1_stop, indicators)
+    return BuyConditionMatrix(flags=np.column_stack(columns), stop_loss=stop_loss)
@@ -1,19 +1,12 @@
 import numpy as np
 from typing import List, Dict, Optional, Union
 import logging
-from dataclasses import dataclass
+from app.workers.algo_func.indicators import IndicatorSet
+from app.workers.algo_func.ohlcv_series import OHLCV, bar_position
+from app.workers.algo_func.profiling import measure
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class OHLCV:
-    date: str
-    open: float
-    high: float
-    low: float
-    close: float
-    volume: Optional[float] = None
-
 def sma(values: List[float], period: int) -> List[float]:
     if len(values) < period:
         return []
@@ -101,7 +94,7 @@ def linear_regression_slope(values: List[float]) -> float:
     
     return numerator / denominator if denominator != 0 else 0.0
 
-def checkB1(ohlcv: List[OHLCV]) -> bool:
+def checkB1(ohlcv: List[OHLCV], indicators: Optional[IndicatorSet] = None) -> bool:
     if len(ohlcv) < 51:
         return False
 
@@ -114,8 +107,14 @@ def checkB1(ohlcv: List[OHLCV]) -> bool:
     prev20High = max(highs[-21:-1])
     condNewHigh = last.high > prev20High
 
-    bb = bollinger_bands(closes, 51, 1.9)
-    sma51 = sma(closes, 51)
+    if indicators is not None:
+        i = len(ohlcv) - 1
+        upper, middle, lower = indicators.bollinger(51, 1.9)
+        bb = [{'upper': float(upper[i]), 'middle': float(middle[i]), 'lower': float(lower[i])}]
+        sma51 = [float(indicators.sma(51)[i])]
+    else:
+        bb = bollinger_bands(closes, 51, 1.9)
+        sma51 = sma(closes, 51)
 
     condBoll = False
     if bb and sma51:
@@ -134,10 +133,17 @@ def checkB1(ohlcv: List[OHLCV]) -> bool:
 
     return (condNewHigh or condBoll) and condCloseInUpperRange
 
-def checkB3(ohlcv: List[OHLCV]) -> bool:
+def checkB3(ohlcv: List[OHLCV], indicators: Optional[IndicatorSet] = None) -> bool:
     if not ohlcv: 
         return False
 
+    if indicators is not None:
+        i = len(ohlcv) - 1
+        if i - 20 + 1 < 72 + 58:
+            return False
+        win = indicators.bb_width_sma(21, 2, 72)[i - 57:i + 1].tolist()
+        return linear_regression_slope(win) < 0
+
     closes = [bar.close for bar in ohlcv]
 
     bb = bollinger_bands(closes, 21, 2)
@@ -213,10 +219,15 @@ def checkB10(ohlcv: List[OHLCV]) -> bool:
 
     return daysSinceLow >= 68
 
-def checkB11(ohlcv: List[OHLCV]) -> bool:
+def checkB11(ohlcv: List[OHLCV], indicators: Optional[IndicatorSet] = None) -> bool:
     if len(ohlcv) < 126 + 22:
         return False
 
+    if indicators is not None:
+        i = len(ohlcv) - 1
+        last126 = indicators.atr(22)[i - 125:i + 1]
+        return not (float(last126[-1]) > 0.87 * float(last126.max()))
+
     highs = [bar.high for bar in ohlcv]
     lows = [bar.low for bar in ohlcv]
     closes = [bar.close for bar in ohlcv]
@@ -234,8 +245,8 @@ def checkB11(ohlcv: List[OHLCV]) -> bool:
 
 def checkB12(ohlcv: List[OHLCV], targetDate: str, input_B12_growth: float = 0.16, 
              input_B12_days: int = 50, input_B12_deviation: float = 0.2) -> bool:
-    targetIndex = next((i for i, bar in enumerate(ohlcv) if bar.date == targetDate), -1)
-    if targetIndex == -1:
+    targetIndex = bar_position(ohlcv, targetDate)
+    if targetIndex is None:
         raise ValueError(f"Дата {targetDate} не знайдена")
 
     if targetIndex < 150 + input_B12_days:
@@ -292,7 +303,7 @@ def checkB13(ohlcvStock: List[OHLCV], ohlcvIndex: List[OHLCV], periods: List[int
 
     return not underperformAll
 
-def checkB18(ohlcv: List[OHLCV]) -> bool:
+def checkB18(ohlcv: List[OHLCV], indicators: Optional[IndicatorSet] = None) -> bool:
     if not ohlcv or len(ohlcv) < 250:
         return False
 
@@ -303,22 +314,31 @@ def checkB18(ohlcv: List[OHLCV]) -> bool:
     last = ohlcv[-1]
     lastClose = last.close
 
-    sma50 = sma(closes, 50)
-    sma150 = sma(closes, 150)
-    sma200 = sma(closes, 200)
+    if indicators is not None:
+        # 250+ bars guarantee every SMA below is defined, including SMA200 21 bars back
+        i = len(ohlcv) - 1
+        lastSMA50 = float(indicators.sma(50)[i])
+        lastSMA150 = float(indicators.sma(150)[i])
+        lastSMA200 = float(indicators.sma(200)[i])
+        sma200_21d_ago = float(indicators.sma(200)[i - 20])
+    else:
+        sma50 = sma(closes, 50)
+        sma150 = sma(closes, 150)
+        sma200 = sma(closes, 200)
+
+        if not sma50 or not sma150 or not sma200:
+            return False
 
-    if not sma50 or not sma150 or not sma200:
-        return False
+        lastSMA50 = sma50[-1]
+        lastSMA150 = sma150[-1]
+        lastSMA200 = sma200[-1]
 
-    lastSMA50 = sma50[-1]
-    lastSMA150 = sma150[-1]
-    lastSMA200 = sma200[-1]
+        if len(sma200) < 22:
+            return False
+        sma200_21d_ago = sma200[-1 - 20]
 
     cond1 = lastClose > lastSMA150 and lastClose > lastSMA200
     cond2 = lastSMA150 > lastSMA200
-    if len(sma200) < 22:
-        return False
-    sma200_21d_ago = sma200[-1 - 20]
     cond3 = lastSMA200 > sma200_21d_ago
     cond4 = lastSMA50 > lastSMA150 and lastSMA50 > lastSMA200
     cond5 = lastClose > lastSMA50
@@ -328,17 +348,22 @@ def checkB18(ohlcv: List[OHLCV]) -> bool:
     cond6 = lastClose >= last250Low * 1.30
     cond7 = lastClose >= last250High * 0.75
 
-    bb21 = bollinger_bands(closes, 21, 2)
+    if indicators is not None:
+        if i - 20 + 1 < 82:
+            return False
+        bbw = indicators.bb_width(21, 2)[i - 81:i + 1].tolist()
+        lastBB21 = {'upper': float(indicators.bollinger(21, 2)[0][i])}
+    else:
+        bb21 = bollinger_bands(closes, 21, 2)
 
-    if len(bb21) < 82:
-        return False
+        if len(bb21) < 82:
+            return False
 
-    
-    bbw = [(b['upper'] - b['lower']) / b['middle'] * 100 for b in bb21]
+        bbw = [(b['upper'] - b['lower']) / b['middle'] * 100 for b in bb21]
+        lastBB21 = bb21[-1]
 
     avgBBW21 = mean(bbw[-21:])
     avgBBW82 = mean(bbw[-82:])
-    lastBB21 = bb21[-1]
     cond8 = (avgBBW21 < 0.22 * avgBBW82) and (lastClose > lastBB21['upper'])
     
     logger.info(f'B18 Conditions: {cond1}, {cond2}, {cond3}, {cond4}, {cond5}, {cond6}, {cond7}, {cond8}')
@@ -374,7 +399,7 @@ def wilder_atr(highs: List[float], lows: List[float], closes: List[float], perio
     return atr_values
 
 def calcS1Stop(ohlcv: List[OHLCV], factor: float = 3.7, atrPeriod: int = 22, 
-               entryClose: Optional[float] = None) -> float:
+               entryClose: Optional[float] = None, indicators: Optional[IndicatorSet] = None) -> float:
     if not ohlcv or len(ohlcv) < atrPeriod + 1:
         return float('nan')
 
@@ -386,10 +411,13 @@ def calcS1Stop(ohlcv: List[OHLCV], factor: float = 3.7, atrPeriod: int = 22,
     if close <= 0:
         return float('nan')
 
-    atrSeries = wilder_atr(highs, lows, closes, atrPeriod)
-    if not atrSeries:
-        return float('nan')
-    currentATR = atrSeries[-1]
+    if indicators is not None:
+        currentATR = float(indicators.atr(atrPeriod)[len(ohlcv) - 1])
+    else:
+        atrSeries = wilder_atr(highs, lows, closes, atrPeriod)
+        if not atrSeries:
+            return float('nan')
+        currentATR = atrSeries[-1]
 
     baseStop = close - factor * currentATR
 
@@ -401,18 +429,19 @@ def calcS1Stop(ohlcv: List[OHLCV], factor: float = 3.7, atrPeriod: int = 22,
         return round(close * (1 - 0.095), 4)   
     return round(baseStop, 4)
 
-def runAllBuyConditions(ohlcv: List[OHLCV], targetDate: str, spyData: List[OHLCV]) -> Dict[str, Union[bool, float]]:
+def runAllBuyConditions(ohlcv: List[OHLCV], targetDate: str, spyData: List[OHLCV],
+                        indicators: Optional[IndicatorSet] = None) -> Dict[str, Union[bool, float]]:
     return {
-        'B1': checkB1(ohlcv),
-        'B3': checkB3(ohlcv),
-        'B8': checkB8(ohlcv),
-        'B9': checkB9(ohlcv),
-        'B10': checkB10(ohlcv),
-        'B11': checkB11(ohlcv),
-        'B12': checkB12(ohlcv, targetDate),
-        'B13': checkB13(ohlcv, spyData),
-        'B18': checkB18(ohlcv),
-        'stopLoss': calcS1Stop(ohlcv)
+        'B1': measure('B1', checkB1, ohlcv, indicators),
+        'B3': measure('B3', checkB3, ohlcv, indicators),
+        'B8': measure('B8', checkB8, ohlcv),
+        'B9': measure('B9', checkB9, ohlcv),
+        'B10': measure('B10', checkB10, ohlcv),
+        'B11': measure('B11', checkB11, ohlcv, indicators),
+        'B12': measure('B12', checkB12, ohlcv, targetDate),
+        'B13': measure('B13', checkB13, ohlcv, spyData),
+        'B18': measure('B18', checkB18, ohlcv, indicators),
+        'stopLoss': measure('stopLoss', calcS1Stop, ohlcv, indicators=indicators)
     }
 
 def isBuy(signals: Dict[str, Union[bool, float]]) -> bool:
@@ -0,0 +1,209 @@
+import numpy as np
+from bisect import bisect_left
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from typing import Any, Dict, List, Union
+
+from app.workers.algo_func.get_code_energy import StockRecord
+from app.workers.algo_func.indicators import lagged, rolling_max, rolling_min
+from app.workers.algo_func.ohlcv_series import OHLCVSeries, as_series
+
+ENERGY_KEYS = ["E1", "E2", "E3", "E4", "E5"]
+_DAYS = 16
+_RSI_PERIOD = 10
+_STOCH_PERIOD = 10
+_MIN_DATE = "2001-01-01"
+
+
+class EnergySeries:
+    """
+    E1–E5 and ``energy_score`` for every bar of a stock.
+
+    ``at(i)`` returns exactly what ``calculate_energy_indicators_last_16_days``
+    returns for ``(dates[i], stock_data[:i + 1], index bars up to dates[i])``.
+    The same object feeds the signal row and S9, so each bar is computed once.
+    """
+
+    def __init__(self, dates: List[str], flags: np.ndarray, valid: np.ndarray,
+                 totals: np.ndarray, errors: Dict[int, str], start_index: int):
+        self.dates = dates
+        self.flags = flags
+        self.valid = valid
+        self.totals = totals
+        self.errors = errors
+        self.start_index = start_index
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def energy_score(self) -> np.ndarray:
+        """Score per bar; bars before ``start_index`` are NaN."""
+        out = np.full(len(self.dates), np.nan)
+        out[self.start_index:] = self.totals / _DAYS
+        return out
+
+    def at(self, index: int) -> Dict[str, Any]:
+        if index < self.start_index:
+            raise IndexError(f"Energy was computed from bar {self.start_index}, not {index}")
+        if index in self.errors:
+            return {"status": "error", "message": self.errors[index], "indicators": []}
+        row = index - self.start_index
+        result: Dict[str, Any] = {
+            "energy_score": int(self.totals[row]) / _DAYS if self.valid[row].any() else 0,
+        }
+        for j, key in enumerate(ENERGY_KEYS):
+            result[key] = ("1" if self.flags[row, j] else "0") if self.valid[row, -1] else "N/A"
+        return result
+
+
+def _windows_start(dates: List[str], sorted_dates: List[str]) -> np.ndarray:
+    """First position in ``sorted_dates`` inside each bar's 24-month lookback window."""
+    starts = np.empty(len(dates), dtype=np.int64)
+    for i, d in enumerate(dates):
+        cutoff = (datetime.strptime(d, "%Y-%m-%d") - relativedelta(months=24)).strftime("%Y-%m-%d")
+        starts[i] = bisect_left(sorted_dates, max(cutoff, _MIN_DATE))
+    return starts
+
+
+def _rsi_tails(closes: np.ndarray, starts: np.ndarray, ends: np.ndarray, tail: int) -> np.ndarray:
+    """
+    Wilder RSI(10) of ``closes[starts[k]:ends[k] + 1]`` for every lane ``k``.
+
+    ``calculate_rsi`` seeds the smoothing at the first bar of the 24-month
+    window, which moves with the trade day, so each lane runs its own
+    recursion. Lanes run side by side, one vector step per bar, with the
+    same operations in the same order as the scalar code. Only the last
+    ``tail`` values of each lane are kept (NaN where RSI is undefined).
+    """
+    lanes = len(starts)
+    out = np.full((lanes, tail), np.nan)
+    lengths = ends - starts
+    if lanes == 0 or lengths.max() < _RSI_PERIOD:
+        return out
+
+    period = _RSI_PERIOD
+    sum_gain = np.zeros(lanes)
+    sum_loss = np.zeros(lanes)
+    avg_gain = avg_loss = None
+    rows = np.arange(lanes)
+    last = len(closes) - 1
+    for k in range(1, int(lengths.max()) + 1):
+        pos = np.minimum(starts + k, last)
+        delta = closes[pos] - closes[pos - 1]
+        gain = np.maximum(delta, 0)
+        loss = np.abs(np.minimum(delta, 0))
+        if k <= period:
+            sum_gain += gain
+            sum_loss += loss
+            if k < period:
+                continue
+            avg_gain = sum_gain / period
+            avg_loss = sum_loss / period
+        else:
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100.0 - (100.0 / (1.0 + avg_gain / avg_loss)))
+        column = k - (lengths - tail + 1)
+        keep = (k <= lengths) & (column >= 0)
+        out[rows[keep], column[keep]] = rsi[keep]
+    return out
+
+
+def calculate_energy_series(stock_data: Union[OHLCVSeries, List[StockRecord]],
+                            stock_data_2800: Union[OHLCVSeries, List[StockRecord]],
+                            start_index: int = 0) -> EnergySeries:
+    """
+    Energy indicators for bars ``start_index..`` of ``stock_data`` in one pass.
+
+    Both series must be in chronological order with unique dates.
+    """
+    stock_data = as_series(stock_data)
+    stock_data_2800 = as_series(stock_data_2800)
+    dates = stock_data.date_strings.tolist()
+    n = len(dates)
+    highs, lows, closes = stock_data.high, stock_data.low, stock_data.close
+
+    spy_dates = stock_data_2800.date_strings.tolist()
+    spy_closes = stock_data_2800.close
+    spy_position = stock_data_2800.calendar.positions
+
+    lanes = np.arange(start_index, n)
+    starts = _windows_start(dates[start_index:], dates)
+    spy_starts = _windows_start(dates[start_index:], spy_dates)
+
+    # every bar of the trailing 16-day block, one row per trade day
+    block = lanes[:, None] - (_DAYS - 1) + np.arange(_DAYS)[None, :]
+    inside = block >= starts[:, None]
+    rel = block - starts[:, None]
+    valid = inside & (rel >= 66)
+    a = np.clip(block, 0, max(n - 1, 0))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # E1: new 20-day high closing in the upper 35% of the range
+        prevHigh20 = lagged(rolling_max(highs, 20), 1)
+        e1 = (highs > prevHigh20) & (closes > (highs - lows) * 0.65 + lows)
+
+        # E2: StochRSI(10) > 0.5 with RSI seeded at each trade day's window start
+        tail = _DAYS + _STOCH_PERIOD - 1
+        rsi = _rsi_tails(closes, starts, lanes, tail)
+        stoch_windows = np.lib.stride_tricks.sliding_window_view(rsi, _STOCH_PERIOD, axis=1)
+        rsi_max = stoch_windows.max(axis=2)
+        rsi_min = stoch_windows.min(axis=2)
+        rsi_now = rsi[:, _STOCH_PERIOD - 1:]
+        stochrsi = np.where(rsi_max == rsi_min, 0.0, (rsi_now - rsi_min) / (rsi_max - rsi_min))
+        e2 = stochrsi > 0.5
+
+        # E3: 66-day slope of close
+        e3 = (closes - lagged(closes, 66)) / 66 > 0
+
+        # E4: 33-day performance beats the index on the same date
+        p = np.array([spy_position.get(d, -1) for d in dates], dtype=np.int64)
+        p[p >= len(spy_closes)] = -1
+        has_spy = p >= 0
+        spy_perf = np.full(n, np.nan)
+        spy_base = np.full(n, np.nan)
+        ok = has_spy & (p >= 33)
+        spy_base[ok] = spy_closes[p[ok] - 33]
+        spy_perf[ok] = spy_closes[p[ok]] / spy_base[ok]
+        stock_base = lagged(closes, 33)
+        stock_perf = closes / stock_base
+        e4_checked = valid & has_spy[a] & ((p[a] - spy_starts[:, None]) >= 33)
+        e4 = e4_checked & (stock_perf[a] > spy_perf[a])
+
+        # E5: upper half of the 5-day range, up over 5 days, within 7% of the 250-day high
+        min5 = rolling_min(lows, 5)
+        max5 = rolling_max(highs, 5)
+        cond1 = (max5 != min5) & ((closes - min5) / (max5 - min5) > 0.5)
+        cond2 = closes - lagged(closes, 5) > 0
+        max250 = rolling_max(highs, 250)[a]
+        # the 250-day lookback is cut at the start of the 24-month window
+        clipped = valid & (starts[:, None] > a - 249)
+        from_first_bar = clipped & (starts[:, None] == 0)
+        if from_first_bar.any():
+            max250[from_first_bar] = np.maximum.accumulate(highs)[a[from_first_bar]]
+        for row, col in zip(*np.nonzero(clipped & ~from_first_bar)):
+            max250[row, col] = highs[starts[row]:a[row, col] + 1].max()
+        cond3 = (max250 != 0) & ((max250 - closes[a]) / max250 < 0.07)
+        e5 = cond1[a] & cond2[a] & cond3
+
+    flags = np.stack([e1[a], e2, e3[a], e4, e5], axis=2) & valid[:, :, None]
+    totals = flags.sum(axis=(1, 2))
+
+    errors: Dict[int, str] = {}
+    zero_division = (e4_checked & ((stock_base[a] == 0) | (spy_base[a] == 0))).any(axis=1)
+    for row, i in enumerate(lanes):
+        if dates[i] < _MIN_DATE:
+            errors[int(i)] = f"Target date {dates[i]} not found in data"
+        elif zero_division[row]:
+            errors[int(i)] = "Error calculating energy indicators: float division by zero"
+
+    return EnergySeries(
+        dates=dates,
+        flags=flags[:, -1, :],
+        valid=valid,
+        totals=totals,
+        errors=errors,
+        start_index=start_index,
+    )
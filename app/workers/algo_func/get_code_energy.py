@@ -3,6 +3,8 @@ from dateutil.relativedelta import relativedelta
 from typing import Dict, Any, List
 from dataclasses import dataclass
 
+from app.workers.algo_func.trade_calendar import TradeCalendar
+
 @dataclass
 class StockRecord:
     """Stock price record"""
@@ -138,6 +140,7 @@ def calculate_energy_indicators_last_16_days(trade_day: str, stock_data: List[St
         # SPY (reference data) arrays
         close_spy = processed_data_spy['close']
         sdate_spy = processed_data_spy['string_dates']
+        spy_calendar = TradeCalendar(sdate_spy)
         
         # Find the last 16 trading days including the target date
         target_dates = []
@@ -231,24 +234,20 @@ def calculate_energy_indicators_last_16_days(trade_day: str, stock_data: List[St
                 # close/close[33] > close data(2)/close[33] data(2)
                 
                 # Find matching date in SPY data
-                try:
-                    arr_idx = sdate_spy.index(sdate[idx])
-                    
-                    # Check if we have enough data (33 days back) for both stock and SPY
-                    if (idx >= 33 and arr_idx >= 33 and 
-                        arr_idx < len(close_spy) and idx < len(close)):
-                        
-                        stock_performance = close[idx] / close[idx - 33]
-                        spy_performance = close_spy[arr_idx] / close_spy[arr_idx - 33]
-                        
-                        if stock_performance > spy_performance:
-                            E4 = "1"
-                        else:
-                            E4 = "0"
+                arr_idx = spy_calendar.position(sdate[idx])
+
+                # Check if we have enough data (33 days back) for both stock and SPY
+                if (arr_idx is not None and idx >= 33 and arr_idx >= 33 and
+                    arr_idx < len(close_spy) and idx < len(close)):
+
+                    stock_performance = close[idx] / close[idx - 33]
+                    spy_performance = close_spy[arr_idx] / close_spy[arr_idx - 33]
+
+                    if stock_performance > spy_performance:
+                        E4 = "1"
                     else:
-                        E4 = "0" 
-                        
-                except ValueError:
+                        E4 = "0"
+                else:
                     E4 = "0"
                 
                 #####################################
@@ -1,8 +1,10 @@
 import os
 import aiomysql
 import asyncio
+import numpy as np
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import date, datetime
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
 
 load_dotenv()
 
@@ -30,48 +32,110 @@ async def init_db_pool():
         print("✅ MySQL connection pool initialized")
 
 
-async def get_stock_data_from_db(code: str, end_date: str | None = None):
-    """Отримати дані про акції асинхронно з БД."""
+# Кількість рядків, що читаються з серверного курсора за раз
+FETCH_CHUNK_SIZE = int(os.getenv("DB_FETCH_CHUNK_SIZE", 2000))
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_COLUMNS = (
+    ("open", "open_adj", np.float64),
+    ("high", "high_adj", np.float64),
+    ("low", "low_adj", np.float64),
+    ("close", "close_adj", np.float64),
+    ("volume", "volume_adj", np.int64),
+)
+
+
+def _decode_column(chunk, i: int, dtype) -> np.ndarray:
+    convert = float if dtype is np.float64 else int
+    return np.fromiter((0 if row[i] is None else convert(row[i]) for row in chunk), dtype, len(chunk))
+
+
+async def fetch_stock_series(code: str, end_date: str | None = None,
+                             chunk_size: int = FETCH_CHUNK_SIZE) -> OHLCVSeries:
+    """
+    Отримати історію акції з БД одразу як ``OHLCVSeries``.
+
+    Рядки читаються серверним курсором порціями по ``chunk_size`` кортежів і
+    декодуються прямо в заздалегідь виділені колонки: дати — порядкові
+    номери днів, без strftime на кожен рядок. Бари з open == 0 (порожні)
+    відкидаються в тому ж проході.
+    """
     global pool
     if pool is None:
         raise RuntimeError("Database pool not initialized. Call init_db_pool() first.")
 
     query = f"CALL get_symbol_adjusted_data('{code}');"
 
+    capacity = chunk_size
+    buffers = {"dates": np.empty(capacity, dtype=np.int64)}
+    buffers.update({name: np.empty(capacity, dtype=dtype) for name, _, dtype in _COLUMNS})
+    n = 0
+    empty_dates: list[str] = []
+
     async with pool.acquire() as conn:
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
+        async with conn.cursor(aiomysql.SSCursor) as cursor:
             await cursor.execute(query)
-            rows = await cursor.fetchall()
-
-            stock_records = [
-                {
-                    "date": row["timestamp"].strftime("%Y-%m-%d"),
-                    "open": float(row["open_adj"]) if row["open_adj"] is not None else 0.0,
-                    "high": float(row["high_adj"]) if row["high_adj"] is not None else 0.0,
-                    "low": float(row["low_adj"]) if row["low_adj"] is not None else 0.0,
-                    "close": float(row["close_adj"]) if row["close_adj"] is not None else 0.0,
-                    "volume": int(row["volume_adj"]) if row["volume_adj"] is not None else 0,
-                }
-                for row in rows
-            ]
-
-            empty_records = [rec for rec in stock_records if rec["open"] == 0]
-            if empty_records:
-                print("⚠️ Empty records found at dates:", ", ".join(rec["date"] for rec in empty_records))
-
-            stock_records = [rec for rec in stock_records if rec not in empty_records]
-
-            # if end_date:
-            #     idx = next((i for i, rec in enumerate(stock_records) if rec["date"] == end_date), None)
-            #     if idx is None:
-            #         raise ValueError(f"Date {end_date} not found in stock records for {code}")
-            #     stock_records = stock_records[: idx + 1]
-
-            # print(
-            #     f"Retrieved {len(stock_records)} records for stock {code}"
-            #     + (f" up to {end_date}" if end_date else "")
-            # )
-            return stock_records
+            names = [column[0] for column in cursor.description]
+            i_date = names.index("timestamp")
+            positions = [(name, names.index(source), dtype) for name, source, dtype in _COLUMNS]
+
+            while True:
+                chunk = await cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+
+                m = len(chunk)
+                if n + m > capacity:
+                    capacity = max(capacity * 2, n + m)
+                    buffers = {name: np.resize(buffer, capacity) for name, buffer in buffers.items()}
+                buffers["dates"][n:n + m] = np.fromiter((row[i_date].toordinal() for row in chunk), np.int64, m)
+                for name, i, dtype in positions:
+                    buffers[name][n:n + m] = _decode_column(chunk, i, dtype)
+
+                keep = buffers["open"][n:n + m] != 0
+                k = m
+                if not keep.all():
+                    # порожні бари зсуваються на місці; копія лише для порції, де вони є
+                    empty_dates.extend(
+                        str(d) for d in (buffers["dates"][n:n + m][~keep] - _EPOCH_ORDINAL).astype("datetime64[D]")
+                    )
+                    k = int(keep.sum())
+                    for buffer in buffers.values():
+                        buffer[n:n + k] = buffer[n:n + m][keep]
+                n += k
+
+    if empty_dates:
+        print("⚠️ Empty records found at dates:", ", ".join(empty_dates))
+
+    dates = (buffers.pop("dates")[:n] - _EPOCH_ORDINAL).astype("datetime64[D]")
+    return OHLCVSeries(
+        dates=dates,
+        date_strings=dates.astype("U10"),
+        **{name: buffer[:n].copy() for name, buffer in buffers.items()},
+    )
+
+
+async def get_stock_data_from_db(code: str, end_date: str | None = None):
+    """Отримати дані про акції асинхронно з БД (рядки-dict поверх ``fetch_stock_series``)."""
+    series = await fetch_stock_series(code, end_date)
+
+    # if end_date:
+    #     idx = next((i for i, rec in enumerate(stock_records) if rec["date"] == end_date), None)
+    #     if idx is None:
+    #         raise ValueError(f"Date {end_date} not found in stock records for {code}")
+    #     stock_records = stock_records[: idx + 1]
+
+    return [
+        {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for d, o, h, l, c, v in zip(
+            series.date_strings.tolist(),
+            series.open.tolist(),
+            series.high.tolist(),
+            series.low.tolist(),
+            series.close.tolist(),
+            series.volume.tolist(),
+        )
+    ]
 
 
 # Для локального тестування
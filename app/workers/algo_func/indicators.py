@@ -0,0 +1,253 @@
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+
+
+def window_sums(values: np.ndarray, period: int) -> np.ndarray:
+    """Sum every ``period``-long window left to right.
+
+    The accumulation order is the same as Python's ``sum(window)`` on
+    CPython 3.11 (the runtime pinned in the Dockerfile), so the result is
+    bit-identical to the per-bar helpers. Cost is O(N * period) but runs
+    as ``period`` vector additions instead of N Python-level sums.
+    """
+    count = len(values) - period + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.float64)
+    acc = values[0:count].copy()
+    for k in range(1, period):
+        acc += values[k:k + count]
+    return acc
+
+
+def _aligned(values: np.ndarray, first_index: int, length: int) -> np.ndarray:
+    """Place ``values`` at bar positions ``first_index..`` of a NaN series."""
+    out = np.full(length, np.nan, dtype=np.float64)
+    if len(values):
+        out[first_index:first_index + len(values)] = values
+    return out
+
+
+def _wilder(trs: List[float], period: int) -> List[float]:
+    """Wilder smoothing seeded with the SMA of the first ``period`` values."""
+    if len(trs) < period:
+        return []
+    result = [sum(trs[:period]) / period]
+    for i in range(period, len(trs)):
+        result.append((result[-1] * (period - 1) + trs[i]) / period)
+    return result
+
+
+def window_slopes(values: np.ndarray, period: int) -> np.ndarray:
+    """``linear_regression_slope`` of every ``period``-long window, same arithmetic order."""
+    count = len(values) - period + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.float64)
+    if period < 2:
+        return np.zeros(count, dtype=np.float64)
+    x_mean = (period - 1) / 2
+    y_mean = window_sums(values, period) / period
+    numerator = np.zeros(count, dtype=np.float64)
+    denominator = 0
+    for i in range(period):
+        dx = i - x_mean
+        numerator += dx * (values[i:i + count] - y_mean)
+        denominator += dx * dx
+    if denominator == 0:
+        return np.zeros(count, dtype=np.float64)
+    return numerator / denominator
+
+
+def trailing(values: np.ndarray, window: int, reducer) -> np.ndarray:
+    """``reducer`` over the ``window`` bars ending at each position; NaN before that."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = reducer(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def _window_max(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Max of every ``window``-long window and the offset of its first occurrence.
+
+    van Herk/Gil-Werman: cut the series into blocks of ``window`` bars and
+    take running maxima forward and backward inside each block. Any window
+    is the tail of one block plus the head of the next, so its max is one
+    comparison of the two. O(N) for any window length, all in NumPy. NaN
+    propagates like ``np.max``; offsets assume NaN-free input.
+    """
+    n = len(values)
+    count = n - window + 1
+    pad = (-n) % window
+    v = np.concatenate([values.astype(np.float64), np.full(pad, -np.inf)]).reshape(-1, window)
+    pos = np.arange(v.size).reshape(v.shape)
+
+    head = np.maximum.accumulate(v, axis=1)
+    rises = np.ones(v.shape, dtype=bool)
+    rises[:, 1:] = v[:, 1:] > head[:, :-1]
+    head_arg = np.maximum.accumulate(np.where(rises, pos, 0), axis=1)
+
+    tail = np.maximum.accumulate(v[:, ::-1], axis=1)[:, ::-1]
+    leads = np.ones(v.shape, dtype=bool)
+    leads[:, :-1] = v[:, :-1] >= tail[:, 1:]
+    tail_arg = np.minimum.accumulate(np.where(leads, pos, v.size)[:, ::-1], axis=1)[:, ::-1]
+
+    start = np.arange(count)
+    end = start + window - 1
+    left, right = tail.ravel()[start], head.ravel()[end]
+    # ties go to the earlier bar, as np.argmax does
+    arg = np.where(left >= right, tail_arg.ravel()[start], head_arg.ravel()[end])
+    return np.maximum(left, right), arg - start
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """Same as ``trailing(values, window, np.max)`` in O(N)."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = _window_max(values, window)[0]
+    return out
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """Same as ``trailing(values, window, np.min)`` in O(N)."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = -_window_max(-values, window)[0]
+    return out
+
+
+def rolling_argmax(values: np.ndarray, window: int) -> np.ndarray:
+    """First-occurrence position of the max inside each trailing window; -1 before that."""
+    out = np.full(len(values), -1, dtype=np.int64)
+    if len(values) >= window:
+        out[window - 1:] = _window_max(values, window)[1]
+    return out
+
+
+def rolling_argmin(values: np.ndarray, window: int) -> np.ndarray:
+    """First-occurrence position of the min inside each trailing window; -1 before that."""
+    out = np.full(len(values), -1, dtype=np.int64)
+    if len(values) >= window:
+        out[window - 1:] = _window_max(-values, window)[1]
+    return out
+
+
+def lagged(values: np.ndarray, lag: int) -> np.ndarray:
+    """``values`` moved ``lag`` bars later, NaN-padded."""
+    out = np.full(len(values), np.nan)
+    if lag < len(values):
+        out[lag:] = values[:len(values) - lag]
+    return out
+
+
+class IndicatorSet:
+    """
+    Whole-history indicator series for one stock.
+
+    Every series is aligned to bar positions: element ``i`` is exactly the
+    last value the per-bar helpers in ``buy_signals``/``sell_signals``
+    return when called on ``ohlcv[:i + 1]``, and NaN where they would not
+    have enough bars. Series are computed lazily, once, and cached.
+
+    Bars must be in chronological order.
+    """
+
+    def __init__(self, highs: Sequence[float], lows: Sequence[float], closes: Sequence[float]):
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.closes = np.asarray(closes, dtype=np.float64)
+        self._cache: Dict[Tuple, object] = {}
+
+    @classmethod
+    def from_bars(cls, ohlcv) -> "IndicatorSet":
+        if isinstance(ohlcv, OHLCVSeries):
+            return cls(ohlcv.high, ohlcv.low, ohlcv.close)
+        return cls(
+            [float(bar.high) for bar in ohlcv],
+            [float(bar.low) for bar in ohlcv],
+            [float(bar.close) for bar in ohlcv],
+        )
+
+    def __len__(self) -> int:
+        return len(self.closes)
+
+    def _cached(self, key: Tuple, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    def sma(self, period: int) -> np.ndarray:
+        """SMA of closes, as ``sma(closes, period)``."""
+        return self._cached(
+            ("sma", period),
+            lambda: _aligned(window_sums(self.closes, period) / period, period - 1, len(self)),
+        )
+
+    def bollinger(self, period: int, std_dev: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Upper, middle and lower bands, as ``bollinger_bands(closes, period, std_dev)``."""
+        def build():
+            n = len(self)
+            count = n - period + 1
+            if count <= 0:
+                empty = np.full(n, np.nan)
+                return empty, empty.copy(), empty.copy()
+            mean = window_sums(self.closes, period) / period
+            sq = (self.closes[0:count] - mean) ** 2
+            for k in range(1, period):
+                sq += (self.closes[k:k + count] - mean) ** 2
+            variance = sq / period
+            # `variance ** 0.5` goes through C pow(), which is not always equal to sqrt()
+            std = np.array([v ** 0.5 for v in variance.tolist()], dtype=np.float64)
+            upper = mean + std_dev * std
+            lower = mean - std_dev * std
+            return (
+                _aligned(upper, period - 1, n),
+                _aligned(mean, period - 1, n),
+                _aligned(lower, period - 1, n),
+            )
+        return self._cached(("bollinger", period, std_dev), build)
+
+    def bb_width(self, period: int, std_dev: float) -> np.ndarray:
+        """Bollinger bandwidth in percent: ``(upper - lower) / middle * 100``."""
+        def build():
+            upper, middle, lower = self.bollinger(period, std_dev)
+            return (upper - lower) / middle * 100
+        return self._cached(("bb_width", period, std_dev), build)
+
+    def bb_width_sma(self, period: int, std_dev: float, sma_period: int) -> np.ndarray:
+        """SMA of the bandwidth series, as ``sma(bbw, sma_period)`` in checkB3."""
+        def build():
+            first = period - 1
+            width = self.bb_width(period, std_dev)[first:]
+            return _aligned(window_sums(width, sma_period) / sma_period, first + sma_period - 1, len(self))
+        return self._cached(("bb_width_sma", period, std_dev, sma_period), build)
+
+    def true_range(self) -> np.ndarray:
+        """True range of bar ``i`` against close ``i - 1``; NaN for the first bar."""
+        def build():
+            out = np.full(len(self), np.nan)
+            if len(self) > 1:
+                prev_close = self.closes[:-1]
+                out[1:] = np.maximum.reduce([
+                    self.highs[1:] - self.lows[1:],
+                    np.abs(self.highs[1:] - prev_close),
+                    np.abs(self.lows[1:] - prev_close),
+                ])
+            return out
+        return self._cached(("tr",), build)
+
+    def atr(self, period: int) -> np.ndarray:
+        """Wilder ATR, as ``atr``/``wilder_atr`` in buy_signals and ``wilder_atr(trs)`` in sell_signals."""
+        def build():
+            trs = self.true_range()[1:].tolist()
+            return _aligned(np.array(_wilder(trs, period), dtype=np.float64), period, len(self))
+        return self._cached(("atr", period), build)
+
+    def atr_sma(self, period: int) -> np.ndarray:
+        """Simple-mean ATR, as ``sma(calc_tr_series(data), period)`` in sell_signals."""
+        def build():
+            trs = self.true_range()[1:]
+            return _aligned(window_sums(trs, period) / period, period, len(self))
+        return self._cached(("atr_sma", period), build)
@@ -0,0 +1,249 @@
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from redis.exceptions import RedisError
+
+from app.config.queue_config import redis_conn
+from app.workers.algo_func import ohlcv_store
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+OHLCV_CACHE_ENABLED = os.getenv("OHLCV_CACHE_ENABLED", "true").lower() == "true"
+OHLCV_CACHE_MEMORY_MB = int(os.getenv("OHLCV_CACHE_MEMORY_MB", 256))
+# як часто копія в пам'яті звіряється з покажчиком у Redis
+OHLCV_CACHE_MEMORY_TTL = int(os.getenv("OHLCV_CACHE_MEMORY_TTL", 60))
+OHLCV_CACHE_POINTER_TTL = int(os.getenv("OHLCV_CACHE_POINTER_TTL", ohlcv_store.OHLCV_STORE_TTL))
+OHLCV_CACHE_REDIS_TTL = int(os.getenv("OHLCV_CACHE_REDIS_TTL", 24 * 3600))
+
+KEY_PREFIX = "ohlcv"
+STATS_KEY = "ohlcv_cache:stats"
+STAT_FIELDS = ("memory_hits", "redis_hits", "misses")
+
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"OHL1"
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def latest_key(code: str) -> str:
+    return f"{KEY_PREFIX}:latest:{code}"
+
+
+def data_key(code: str, last_date: str) -> str:
+    return f"{KEY_PREFIX}:{code}:{last_date}"
+
+
+def pack_series(series: OHLCVSeries) -> bytes:
+    """
+    Columns as one compact blob: int32 day ordinals, float64 OHLC, int64 volume.
+
+    About 44 bytes per bar, against several hundred for the JSON rows.
+    """
+    n = len(series)
+    ordinals = (series.dates - _EPOCH).astype(np.int32)
+    parts = [_HEADER.pack(_MAGIC, n), ordinals.tobytes()]
+    for name in ("open", "high", "low", "close"):
+        parts.append(np.ascontiguousarray(getattr(series, name), dtype=np.float64).tobytes())
+    parts.append(np.ascontiguousarray(series.volume, dtype=np.int64).tobytes())
+    return b"".join(parts)
+
+
+def unpack_series(blob: bytes) -> OHLCVSeries:
+    magic, n = _HEADER.unpack_from(blob)
+    if magic != _MAGIC:
+        raise ValueError(f"Unknown OHLCV blob format {magic!r}")
+    offset = _HEADER.size
+    ordinals = np.frombuffer(blob, dtype=np.int32, count=n, offset=offset)
+    offset += 4 * n
+    columns = []
+    for _ in range(4):
+        columns.append(np.frombuffer(blob, dtype=np.float64, count=n, offset=offset))
+        offset += 8 * n
+    volume = np.frombuffer(blob, dtype=np.int64, count=n, offset=offset)
+    dates = _EPOCH + ordinals.astype("timedelta64[D]")
+    return OHLCVSeries(dates, dates.astype("U10"), *columns, volume)
+
+
+def series_nbytes(series: OHLCVSeries) -> int:
+    return sum(getattr(series, name).nbytes
+               for name in ("dates", "date_strings", "open", "high", "low", "close", "volume"))
+
+
+class SeriesLRU:
+    """
+    Per-process LRU of decoded histories, bounded by the bytes of their columns.
+
+    Entries are keyed by code and remember the last bar date and when they
+    were last confirmed against Redis.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, Tuple[str, OHLCVSeries, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, code: str) -> Optional[Tuple[str, OHLCVSeries, float]]:
+        entry = self._entries.get(code)
+        if entry is None:
+            return None
+        self._entries.move_to_end(code)
+        return entry[:3]
+
+    def put(self, code: str, last_date: str, series: OHLCVSeries) -> None:
+        self.invalidate(code)
+        size = series_nbytes(series)
+        if size > self.max_bytes:
+            return
+        self._entries[code] = (last_date, series, time.monotonic(), size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, _, _, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def confirm(self, code: str) -> None:
+        last_date, series, _, size = self._entries[code]
+        self._entries[code] = (last_date, series, time.monotonic(), size)
+
+    def invalidate(self, code: Optional[str] = None) -> None:
+        if code is None:
+            self._entries.clear()
+            self.nbytes = 0
+            return
+        entry = self._entries.pop(code, None)
+        if entry is not None:
+            self.nbytes -= entry[3]
+
+
+class OHLCVCache:
+    """
+    Tiered cache in front of the OHLCV store: process memory → Redis → store/DB.
+
+    Redis holds packed histories under ``ohlcv:{code}:{last_bar_date}`` and
+    a short-lived ``ohlcv:latest:{code}`` pointer to the current one, so a
+    new bar never overwrites a history another worker is reading. A memory
+    entry is served without a round trip for ``memory_ttl`` seconds, then
+    re-checked against the pointer. Redis errors only cost the cache tier.
+    """
+
+    def __init__(self, redis=redis_conn, max_bytes: int = OHLCV_CACHE_MEMORY_MB * 1024 * 1024,
+                 memory_ttl: int = OHLCV_CACHE_MEMORY_TTL, pointer_ttl: int = OHLCV_CACHE_POINTER_TTL,
+                 data_ttl: int = OHLCV_CACHE_REDIS_TTL):
+        self.redis = redis
+        self.memory = SeriesLRU(max_bytes)
+        self.memory_ttl = memory_ttl
+        self.pointer_ttl = pointer_ttl
+        self.data_ttl = data_ttl
+        self.stats: Dict[str, int] = dict.fromkeys(STAT_FIELDS, 0)
+        self._unflushed: Dict[str, int] = dict.fromkeys(STAT_FIELDS, 0)
+
+    def _count(self, field: str) -> None:
+        self.stats[field] += 1
+        self._unflushed[field] += 1
+
+    def _redis_latest(self, code: str) -> Optional[str]:
+        try:
+            value = self.redis.get(latest_key(code))
+        except RedisError as e:
+            logger.warning(f"OHLCV cache: Redis unavailable, skipping tier: {str(e)}")
+            return None
+        return value.decode() if isinstance(value, bytes) else value
+
+    def _redis_series(self, code: str, last_date: str) -> Optional[OHLCVSeries]:
+        try:
+            blob = self.redis.get(data_key(code, last_date))
+            return unpack_series(blob) if blob else None
+        except (RedisError, ValueError, struct.error) as e:
+            logger.warning(f"OHLCV cache: failed to read {code} from Redis: {str(e)}")
+            return None
+
+    def _redis_put(self, code: str, last_date: str, series: OHLCVSeries) -> None:
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(data_key(code, last_date), pack_series(series), ex=self.data_ttl)
+            pipe.set(latest_key(code), last_date, ex=self.pointer_ttl)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"OHLCV cache: failed to store {code} in Redis: {str(e)}")
+
+    async def get(self, code: str, end_date: Optional[str] = None) -> OHLCVSeries:
+        cached = self.memory.get(code)
+        if cached is not None and time.monotonic() - cached[2] < self.memory_ttl:
+            self._count("memory_hits")
+            return cached[1]
+
+        last_date = self._redis_latest(code)
+        if last_date is not None:
+            if cached is not None and cached[0] == last_date:
+                self.memory.confirm(code)
+                self._count("memory_hits")
+                return cached[1]
+            series = self._redis_series(code, last_date)
+            if series is not None:
+                self.memory.put(code, last_date, series)
+                self._count("redis_hits")
+                return series
+
+        self._count("misses")
+        series = await ohlcv_store.get_stock_series(code, end_date)
+        if not series:
+            return series
+        last_date = str(series.date_strings[-1])
+        self._redis_put(code, last_date, series)
+        self.memory.put(code, last_date, series)
+        return series
+
+    def invalidate(self, code: Optional[str] = None) -> int:
+        """
+        Drop ``code`` (or every code) from all tiers, including the local store's freshness.
+
+        Other workers drop their memory copy at the next pointer check, i.e.
+        within ``memory_ttl`` seconds. Returns the number of Redis keys removed.
+        """
+        self.memory.invalidate(code)
+        ohlcv_store.default_store().expire(code)
+        if code is None:
+            keys = list(self.redis.scan_iter(match=f"{KEY_PREFIX}:*"))
+        else:
+            keys = [latest_key(code), *self.redis.scan_iter(match=f"{KEY_PREFIX}:{code}:*")]
+        return self.redis.delete(*keys) if keys else 0
+
+    def flush_stats(self) -> None:
+        """Add this process's counters since the last flush to the shared ``ohlcv_cache:stats``."""
+        pending = {k: v for k, v in self._unflushed.items() if v}
+        if not pending:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for field, value in pending.items():
+            pipe.hincrby(STATS_KEY, field, value)
+        pipe.execute()
+        self._unflushed = dict.fromkeys(STAT_FIELDS, 0)
+
+
+_default_cache: Optional[OHLCVCache] = None
+
+
+def default_cache() -> OHLCVCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OHLCVCache()
+    return _default_cache
+
+
+async def get_stock_series(code: str, end_date: Optional[str] = None) -> OHLCVSeries:
+    """
+    Історія коду через кеш: пам'ять процесу → Redis → локальне сховище/БД.
+
+    ``OHLCV_CACHE_ENABLED=false`` — напряму зі сховища.
+    """
+    if not OHLCV_CACHE_ENABLED:
+        return await ohlcv_store.get_stock_series(code, end_date)
+    return await default_cache().get(code, end_date)
+
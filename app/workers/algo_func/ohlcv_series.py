@@ -0,0 +1,154 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Union
+
+from app.workers.algo_func.trade_calendar import TradeCalendar
+
+
+@dataclass
+class OHLCV:
+    date: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: Optional[float] = None
+
+
+class OHLCVSeries:
+    """
+    Price history of one stock as columns instead of a list of bars.
+
+    ``dates`` holds ``datetime64[D]`` day ordinals, ``open``/``high``/``low``/
+    ``close`` are float64 and ``volume`` int64; ``date_strings`` keeps the
+    ``YYYY-MM-DD`` form the conditions compare against. Slicing and
+    ``as_of`` return views over the same buffers, so taking the history up
+    to a bar is O(1) and copies nothing.
+
+    The series also behaves like the ``List[OHLCV]`` the conditions were
+    written against: ``len()``, iteration, negative indexes and slices all
+    work, and indexing one bar returns an ``OHLCV``.
+
+    ``calendar`` maps trade days to bar positions. It is built lazily, once
+    per history: prefix views share their parent's calendar and limit the
+    lookups to their own length.
+    """
+
+    __slots__ = ("dates", "date_strings", "open", "high", "low", "close", "volume", "calendar")
+
+    def __init__(self, dates: np.ndarray, date_strings: np.ndarray, open: np.ndarray, high: np.ndarray,
+                 low: np.ndarray, close: np.ndarray, volume: np.ndarray, calendar: Optional[TradeCalendar] = None):
+        self.dates = dates
+        self.date_strings = date_strings
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.calendar = calendar if calendar is not None else TradeCalendar(date_strings)
+
+    @classmethod
+    def from_columns(cls, dates: Sequence[str], open: Sequence[float], high: Sequence[float],
+                     low: Sequence[float], close: Sequence[float], volume: Sequence[Any]) -> "OHLCVSeries":
+        date_strings = np.array(dates, dtype="U10")
+        return cls(
+            dates=date_strings.astype("datetime64[D]"),
+            date_strings=date_strings,
+            open=np.array(open, dtype=np.float64),
+            high=np.array(high, dtype=np.float64),
+            low=np.array(low, dtype=np.float64),
+            close=np.array(close, dtype=np.float64),
+            volume=np.array([v or 0 for v in volume], dtype=np.int64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "OHLCVSeries":
+        """Build from the dict rows ``get_stock_data_from_db`` returns."""
+        return cls.from_columns(
+            [row["date"] for row in rows],
+            [row["open"] for row in rows],
+            [row["high"] for row in rows],
+            [row["low"] for row in rows],
+            [row["close"] for row in rows],
+            [row["volume"] for row in rows],
+        )
+
+    @classmethod
+    def from_bars(cls, bars) -> "OHLCVSeries":
+        """Build from a list of ``OHLCV``/``StockRecord`` bars."""
+        return cls.from_columns(
+            [bar.date for bar in bars],
+            [float(bar.open) for bar in bars],
+            [float(bar.high) for bar in bars],
+            [float(bar.low) for bar in bars],
+            [float(bar.close) for bar in bars],
+            [bar.volume for bar in bars],
+        )
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __bool__(self) -> bool:
+        return len(self.dates) > 0
+
+    def bar(self, index: int) -> OHLCV:
+        return OHLCV(
+            str(self.date_strings[index]),
+            float(self.open[index]),
+            float(self.high[index]),
+            float(self.low[index]),
+            float(self.close[index]),
+            int(self.volume[index]),
+        )
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[OHLCV, "OHLCVSeries"]:
+        if isinstance(key, slice):
+            is_prefix = key.start in (None, 0) and key.step in (None, 1)
+            return OHLCVSeries(
+                self.dates[key],
+                self.date_strings[key],
+                self.open[key],
+                self.high[key],
+                self.low[key],
+                self.close[key],
+                self.volume[key],
+                self.calendar if is_prefix else None,
+            )
+        return self.bar(key)
+
+    def __iter__(self) -> Iterator[OHLCV]:
+        for i in range(len(self.dates)):
+            yield self.bar(i)
+
+    def as_of(self, index: int) -> "OHLCVSeries":
+        """History up to and including bar ``index`` (a view, not a copy)."""
+        return self[:index + 1]
+
+    def position(self, day: Hashable) -> Optional[int]:
+        """First bar dated exactly ``day`` (``YYYY-MM-DD``), or None."""
+        return self.calendar.position(day, len(self))
+
+    def first_on_or_after(self, day) -> int:
+        """First bar not earlier than ``day``, or -1."""
+        return self.calendar.first_on_or_after(day, len(self))
+
+
+def as_series(bars) -> OHLCVSeries:
+    """Return ``bars`` as an ``OHLCVSeries``, converting a list of bars if needed."""
+    if isinstance(bars, OHLCVSeries):
+        return bars
+    return OHLCVSeries.from_bars(bars)
+
+
+def bar_position(bars, day: Hashable) -> Optional[int]:
+    """First bar of ``bars`` dated exactly ``day``, or None; a series uses its shared calendar."""
+    if isinstance(bars, OHLCVSeries):
+        return bars.position(day)
+    return TradeCalendar.from_bars(bars).position(day)
+
+
+def first_bar_on_or_after(bars, day) -> int:
+    """First bar of date-ordered ``bars`` not earlier than ``day``, or -1."""
+    if isinstance(bars, OHLCVSeries):
+        return bars.first_on_or_after(day)
+    return TradeCalendar.from_bars(bars).first_on_or_after(day)
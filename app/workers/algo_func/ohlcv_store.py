@@ -0,0 +1,233 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from app.workers.algo_func import get_db_data
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+
+logger = logging.getLogger(__name__)
+
+OHLCV_STORE_DIR = os.getenv("OHLCV_STORE_DIR", "data/ohlcv")
+OHLCV_STORE_TTL = int(os.getenv("OHLCV_STORE_TTL", 3600))
+OHLCV_STORE_ENABLED = os.getenv("OHLCV_STORE_ENABLED", "true").lower() == "true"
+# скорегована історія переписується цілком (спліти, дивіденди) — це видно вже на перших барах
+CHECKSUM_WINDOW = int(os.getenv("OHLCV_STORE_CHECKSUM_WINDOW", 250))
+
+COLUMNS = ("dates", "open", "high", "low", "close", "volume")
+
+
+def _checksum(series: OHLCVSeries, window: int) -> str:
+    digest = hashlib.sha1()
+    for name in COLUMNS:
+        digest.update(np.ascontiguousarray(getattr(series, name)[:window]).tobytes())
+    return digest.hexdigest()
+
+
+def _same_bar(a: OHLCVSeries, i: int, b: OHLCVSeries, j: int) -> bool:
+    return all(getattr(a, name)[i] == getattr(b, name)[j] for name in COLUMNS)
+
+
+class OHLCVStore:
+    """
+    Per-code columnar store of decoded bars under ``data/ohlcv``.
+
+    Each code keeps one ``.npy`` file per column in a versioned directory;
+    ``CURRENT`` names the live version and is swapped atomically, so
+    readers (the 2800 index is read by every job) never see a half-written
+    history. Writers of one code are serialized with ``flock`` on
+    ``{code}/.lock``: the 2800 index is refreshed by every job, and a
+    writer removes the versions it replaced. Columns are memory-mapped on read.
+    """
+
+    def __init__(self, root: str = OHLCV_STORE_DIR, ttl: int = OHLCV_STORE_TTL,
+                 checksum_window: int = CHECKSUM_WINDOW):
+        self.root = root
+        self.ttl = ttl
+        self.checksum_window = checksum_window
+
+    def _code_dir(self, code: str) -> str:
+        return os.path.join(self.root, code)
+
+    @contextmanager
+    def _write_lock(self, code: str) -> Iterator[str]:
+        code_dir = self._code_dir(code)
+        os.makedirs(code_dir, exist_ok=True)
+        with open(os.path.join(code_dir, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield code_dir
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def read_meta(self, code: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._code_dir(code), "CURRENT"), encoding="utf-8") as f:
+                version = f.read().strip()
+            with open(os.path.join(self._code_dir(code), version, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        meta["version"] = version
+        return meta
+
+    def read(self, code: str, meta: Optional[Dict[str, Any]] = None) -> Optional[OHLCVSeries]:
+        meta = meta or self.read_meta(code)
+        if meta is None:
+            return None
+        version_dir = os.path.join(self._code_dir(code), meta["version"])
+        try:
+            columns = {name: np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        except (OSError, ValueError) as e:
+            logger.warning(f"OHLCV store for {code} is unreadable, will reload: {str(e)}")
+            return None
+        return OHLCVSeries(
+            dates=columns["dates"],
+            date_strings=columns["dates"].astype("U10"),
+            open=columns["open"],
+            high=columns["high"],
+            low=columns["low"],
+            close=columns["close"],
+            volume=columns["volume"],
+        )
+
+    def write(self, code: str, series: OHLCVSeries, mode: str) -> Dict[str, Any]:
+        with self._write_lock(code) as code_dir:
+            version = f"v{time.time_ns()}"
+            version_dir = os.path.join(code_dir, version)
+            os.makedirs(version_dir)
+            for name in COLUMNS:
+                np.save(os.path.join(version_dir, f"{name}.npy"), np.ascontiguousarray(getattr(series, name)))
+            meta = {
+                "code": code,
+                "rows": len(series),
+                "last_date": str(series.date_strings[-1]) if len(series) else None,
+                "fetched_at": time.time(),
+                "checksum_window": self.checksum_window,
+                # коротша за вікно історія (нещодавній лістинг) хешується цілком
+                "checksum_bars": min(len(series), self.checksum_window),
+                "checksum": _checksum(series, self.checksum_window),
+                "mode": mode,
+            }
+            with open(os.path.join(version_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            pointer = os.path.join(code_dir, f"CURRENT.{version}")
+            with open(pointer, "w", encoding="utf-8") as f:
+                f.write(version)
+            os.replace(pointer, os.path.join(code_dir, "CURRENT"))
+
+            # старі версії більше не потрібні; відкриті mmap лишаються валідними до закриття
+            for entry in os.listdir(code_dir):
+                if entry.startswith("v") and entry != version:
+                    shutil.rmtree(os.path.join(code_dir, entry), ignore_errors=True)
+            meta["version"] = version
+            return meta
+
+    def touch(self, code: str, meta: Dict[str, Any]) -> None:
+        """Нових барів немає — лише переносимо час перевірки, колонки не переписуємо."""
+        self._write_meta(code, dict(meta, fetched_at=time.time()))
+
+    def _write_meta(self, code: str, meta: Dict[str, Any]) -> None:
+        with self._write_lock(code) as code_dir:
+            version_dir = os.path.join(code_dir, meta["version"])
+            if not os.path.isdir(version_dir):
+                # поки чекали на lock, інший записувач уже замінив цю версію
+                return
+            updated = {k: v for k, v in meta.items() if k != "version"}
+            tmp = os.path.join(version_dir, f"meta.json.{os.getpid()}")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(updated, f)
+            os.replace(tmp, os.path.join(version_dir, "meta.json"))
+
+    def expire(self, code: Optional[str] = None) -> None:
+        """Позначає історію коду (або всіх кодів) застарілою: наступне читання звіриться з БД."""
+        codes = [code] if code is not None else (os.listdir(self.root) if os.path.isdir(self.root) else [])
+        for name in codes:
+            meta = self.read_meta(name)
+            if meta is not None:
+                meta["fetched_at"] = 0
+                self._write_meta(name, meta)
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        return time.time() - meta.get("fetched_at", 0) < self.ttl
+
+    def merge(self, code: str, stored: Optional[OHLCVSeries], meta: Optional[Dict[str, Any]],
+              fetched: OHLCVSeries) -> OHLCVSeries:
+        """
+        Merge a fresh download into the stored history.
+
+        If the leading window and the last stored bar are unchanged, only
+        the bars after the last stored date are appended; otherwise the
+        adjusted history was rewritten and the download replaces it.
+        """
+        if stored is None or meta is None or not len(stored):
+            self.write(code, fetched, "full")
+            return fetched
+
+        last = len(stored) - 1
+        window = meta.get("checksum_window", self.checksum_window)
+        covered = meta.get("checksum_bars", min(window, meta.get("rows", len(stored))))
+        unchanged = (
+            len(fetched) > last
+            and _checksum(fetched, covered) == meta.get("checksum")
+            and _same_bar(stored, last, fetched, last)
+        )
+        if not unchanged:
+            logger.info(f"Adjusted history of {code} changed, reloading all {len(fetched)} bars")
+            self.write(code, fetched, "full")
+            return fetched
+
+        tail = fetched[last + 1:]
+        if not len(tail):
+            self.touch(code, meta)
+            return stored
+        merged = OHLCVSeries(*(np.concatenate([getattr(stored, name), getattr(tail, name)])
+                               for name in ("dates", "date_strings", "open", "high", "low", "close", "volume")))
+        logger.info(f"Appended {len(tail)} new bars to stored history of {code}")
+        self.write(code, merged, "incremental")
+        return merged
+
+
+_default_store: Optional[OHLCVStore] = None
+
+
+def default_store() -> OHLCVStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = OHLCVStore()
+    return _default_store
+
+
+async def get_stock_series(code: str, end_date: Optional[str] = None,
+                           store: Optional[OHLCVStore] = None, refresh: bool = False) -> OHLCVSeries:
+    """
+    Історія коду як ``OHLCVSeries``: з локального сховища, поки воно свіже.
+
+    ``get_symbol_adjusted_data`` не вміє фільтрувати за датою, тож коли TTL
+    минув, історія завантажується повністю, але в сховище дописуються лише
+    нові бари; повне перезаписування — тільки якщо змінилась скоригована
+    історія. ``OHLCV_STORE_ENABLED=false`` — завжди напряму з БД.
+    """
+    if not OHLCV_STORE_ENABLED and store is None:
+        return await get_db_data.fetch_stock_series(code, end_date)
+
+    store = store or default_store()
+    meta = store.read_meta(code)
+    stored = store.read(code, meta) if meta is not None else None
+    if stored is not None and not refresh and store.is_fresh(meta):
+        return stored
+
+    fetched = await get_db_data.fetch_stock_series(code, end_date)
+    try:
+        return store.merge(code, stored, meta, fetched)
+    except OSError as e:
+        logger.warning(f"Failed to update OHLCV store for {code}: {str(e)}")
+        return fetched
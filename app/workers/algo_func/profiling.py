@@ -0,0 +1,124 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+PROFILING_ENABLED = os.getenv("CONDITION_PROFILING", "false").lower() == "true"
+
+# Histogram buckets are quarter-octaves of nanoseconds: bucket k holds
+# durations in [2 ** (k / 4), 2 ** ((k + 1) / 4)). That keeps p50/p99 within
+# ~19% and lets workers merge their numbers by adding counts.
+HISTOGRAM_BUCKETS = 160
+
+_active: ContextVar[Optional["ConditionProfiler"]] = ContextVar("condition_profiler", default=None)
+
+
+def bucket_of(ns: int) -> int:
+    if ns <= 1:
+        return 0
+    return min(int(math.log2(ns) * 4), HISTOGRAM_BUCKETS - 1)
+
+
+def bucket_ns(bucket: int) -> float:
+    """Geometric middle of ``bucket`` in nanoseconds."""
+    return 2 ** ((bucket + 0.5) / 4)
+
+
+def histogram_percentile(buckets: Dict[int, int], q: float) -> float:
+    """Approximate ``q``-quantile (0..1) in nanoseconds from bucket counts."""
+    total = sum(buckets.values())
+    if total == 0:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen >= rank:
+            return bucket_ns(bucket)
+    return bucket_ns(max(buckets))
+
+
+class ConditionProfiler:
+    """
+    Wall time of every buy/sell condition and energy call for one stock.
+
+    Durations are kept per call, so ``summary()`` gives exact p50/p99 for
+    the stock; ``histograms()`` folds them into buckets that can be added
+    up across stocks and workers.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[int]] = {}
+
+    def record(self, name: str, ns: int) -> None:
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = []
+        samples.append(ns)
+
+    def merge(self, samples: Dict[str, List[int]]) -> None:
+        """Add samples recorded elsewhere (e.g. in a CPU pool process)."""
+        for name, values in samples.items():
+            self.samples.setdefault(name, []).extend(values)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            count = len(ordered)
+            out[name] = {
+                "count": count,
+                "total_ms": sum(ordered) / 1e6,
+                "p50_ms": ordered[(count - 1) // 2] / 1e6,
+                "p99_ms": ordered[min(count - 1, math.ceil(0.99 * count) - 1)] / 1e6,
+            }
+        return out
+
+    def histograms(self) -> Dict[str, Dict[int, int]]:
+        out: Dict[str, Dict[int, int]] = {}
+        for name, samples in self.samples.items():
+            buckets: Dict[int, int] = {}
+            for ns in samples:
+                b = bucket_of(ns)
+                buckets[b] = buckets.get(b, 0) + 1
+            out[name] = buckets
+        return out
+
+
+def active_profiler() -> Optional[ConditionProfiler]:
+    return _active.get()
+
+
+@contextmanager
+def condition_profiling(enabled: Optional[bool] = None) -> Iterator[Optional[ConditionProfiler]]:
+    """
+    Profile the conditions evaluated inside the block (same task/thread).
+
+    Yields the profiler, or None when profiling is off (``CONDITION_PROFILING``
+    unless ``enabled`` says otherwise); then ``measure`` is a plain call.
+    """
+    if enabled is None:
+        enabled = PROFILING_ENABLED
+    if not enabled:
+        yield None
+        return
+    profiler = ConditionProfiler()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+
+
+def measure(name: str, fn: Callable, *args, **kwargs):
+    """Call ``fn(*args, **kwargs)``, timing it under ``name`` if a profiler is active."""
+    profiler = _active.get()
+    if profiler is None:
+        return fn(*args, **kwargs)
+    start = time.perf_counter_ns()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.record(name, time.perf_counter_ns() - start)
@@ -0,0 +1,301 @@
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from app.workers.algo_func.indicators import IndicatorSet, lagged, rolling_max, rolling_min, trailing
+from app.workers.algo_func.ohlcv_series import OHLCV, OHLCVSeries, as_series
+from app.workers.algo_func.profiling import measure
+from app.workers.algo_func.sell_signals import to_ts
+
+
+def _require(n: int, minimum: int, message: str) -> None:
+    if n < minimum:
+        raise ValueError(message)
+
+
+class SellContext:
+    """
+    Position-independent sell inputs for one stock, computed once.
+
+    Everything ``s4``…``s17`` derive from price history alone (ATRs, 90-day
+    highs, 250-day Fibo levels, the HSI-relative returns of S14, …) is kept
+    here as whole-history arrays aligned to bar positions. ``SellEvaluator``
+    adds the per-position part on top. Bars must be in chronological order
+    with unique dates, as the state machine already assumes.
+    """
+
+    def __init__(self, ohlcv: Union[OHLCVSeries, List[OHLCV]], spy_data: Union[OHLCVSeries, List[OHLCV]],
+                 indicators: Optional[IndicatorSet] = None):
+        ohlcv = as_series(ohlcv)
+        if indicators is None:
+            indicators = IndicatorSet.from_bars(ohlcv)
+        self.indicators = indicators
+        self.dates = ohlcv.date_strings.tolist()
+        self.calendar = ohlcv.calendar
+        self.ts = self.calendar.ts[:len(ohlcv)]
+
+        self.opens = ohlcv.open
+        highs, lows, closes = indicators.highs, indicators.lows, indicators.closes
+        self.closes = closes
+        n = len(closes)
+        positions = np.arange(n)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # S4
+            self.sma150 = indicators.sma(150)
+
+            # S6: bar t prints a new 90-day high; keep the latest such bar for every position
+            prev90High = lagged(rolling_max(highs, 90), 1)
+            newHigh = (positions >= 90) & (highs > prev90High)
+            self.last_new_high = np.maximum.accumulate(np.where(newHigh, positions, -1)) if n else positions
+
+            # S7
+            atr22 = indicators.atr_sma(22)
+            body = self.opens - closes
+            bearish = body > 2 * atr22
+            self.s7 = np.zeros(n, dtype=bool)
+            self.s7[1:] = bearish[1:] & bearish[:-1]
+
+            # S8
+            atr100 = indicators.atr_sma(100)
+            gate = atr100 > 0.74 * rolling_max(atr22, 126)
+            bearHuge = (body > 2.4 * atr100).astype(np.float64)
+            self.s8 = gate & (trailing(bearHuge, 5, np.sum) >= 3)
+
+            # S10
+            self.high90 = lagged(rolling_max(highs, 90), 1)
+            drawdown_pct = ((self.high90 - closes) / self.high90) * 100
+            self.s10 = (indicators.atr(10) > 2.6 * indicators.atr(100)) & (drawdown_pct > 5)
+
+            # S11 / S12: closes have to stay below the level of the current bar
+            self.top250 = rolling_max(highs, 250)
+            self.bottom250 = rolling_min(lows, 250)
+            span = self.top250 - self.bottom250
+            self.s11 = rolling_max(closes, 3) < self.bottom250 + 0.382 * span
+            self.s12 = rolling_max(closes, 23) < self.bottom250 + 0.236 * span
+
+            # S13
+            self.s13 = closes < lagged(rolling_min(closes, 80), 1)
+
+            # S15 / S16
+            self.close_t4 = lagged(closes, 4)
+            self.s15 = (closes / self.close_t4) - 1 < -0.25
+            self.close_t10 = lagged(closes, 10)
+            self.s16 = (atr22 > 1.5 * lagged(atr22, 12)) & (closes / self.close_t10 - 1 < -0.15)
+
+            # S17
+            self.high150 = rolling_max(highs, 150)
+            self.low150 = rolling_min(lows, 150)
+            self.s17 = (self.high150 > 1.6 * self.low150) & (closes < 1.3 * self.low150)
+
+        self._init_s14(as_series(spy_data))
+
+    def _init_s14(self, spy_data: OHLCVSeries) -> None:
+        """Bars shared with the index (HSI tracker) and S14's underperformance on them."""
+        idxCloseByDate = dict(zip(spy_data.date_strings.tolist(), spy_data.close.tolist()))
+        self.spy_count = np.searchsorted(
+            np.sort(spy_data.date_strings),
+            np.array(self.dates, dtype=str),
+            side='right',
+        ) if spy_data and self.dates else np.zeros(len(self.dates), dtype=np.int64)
+
+        common = [i for i, d in enumerate(self.dates) if d in idxCloseByDate]
+        self.common_positions = np.array(common, dtype=np.int64)
+        self.common_ts = self.ts[self.common_positions] if common else np.empty(0)
+
+        m = len(common)
+        assetC = self.closes[self.common_positions] if common else np.empty(0)
+        hsiC = np.array([idxCloseByDate[self.dates[i]] for i in common], dtype=np.float64)
+        underAll = np.zeros(m, dtype=bool)
+        if m > 105:
+            underAll[105:] = True
+            for horizon in [35, 70, 105]:
+                ra = assetC[105:] / assetC[105 - horizon:m - horizon] - 1
+                rh = hsiC[105:] / hsiC[105 - horizon:m - horizon] - 1
+                underAll[105:] &= ra < rh
+        self.s14_common = underAll
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def evaluator(self, buy_date: str, buy_price: Optional[float], stop_loss: Optional[float]) -> "SellEvaluator":
+        return SellEvaluator(self, buy_date, buy_price, stop_loss)
+
+
+class SellEvaluator:
+    """
+    Incremental sell evaluator for one open position.
+
+    Created on entry with the buy date, buy price and initial stop and then
+    advanced one bar at a time. It keeps the buy position (both the exact
+    match S5 needs and the "first bar on or after" the others use), the
+    ratcheting S5 stop and the S14 buy position on common dates; the rest
+    is read from the stock's ``SellContext``. ``advance(i, energy)`` returns
+    exactly what ``runAllSellConditions`` returns for ``ohlcv[:i + 1]``,
+    including the ``ValueError`` those rules raise on short histories.
+    """
+
+    def __init__(self, context: SellContext, buy_date: str, buy_price: Optional[float], stop_loss: Optional[float]):
+        self.context = context
+        self.buy_price = buy_price
+        self.stop_loss = stop_loss
+
+        bts = to_ts(buy_date)
+        self.buy_idx = int(np.searchsorted(context.ts, bts, side='left'))
+        self.common_buy_idx = int(np.searchsorted(context.common_ts, bts, side='left'))
+
+        s5_date = datetime.fromisoformat(buy_date.replace("Z", "")).strftime("%Y-%m-%d")
+        self.s5_buy_idx = context.calendar.position(s5_date, len(context))
+
+    def _days_since_buy(self, index: int) -> int:
+        if self.buy_idx > index:
+            raise ValueError("Buy date is outside data range.")
+        return index - self.buy_idx
+
+    def _s1(self, index: int, stop_loss) -> bool:
+        if not isinstance(stop_loss, (int, float)) or not np.isfinite(stop_loss):
+            raise ValueError("stopLoss must be a number.")
+        return float(self.context.closes[index]) <= stop_loss
+
+    def _s4(self, index: int) -> bool:
+        ctx = self.context
+        _require(index + 1, 200, "Insufficient history: need at least ~200 days for 150D SMA and validation window.")
+        self._days_since_buy(index)
+        buy_idx = self.buy_idx
+        if buy_idx < 149:
+            return False
+        day50_idx = buy_idx + 50
+        if day50_idx > index:
+            return False
+
+        window = slice(buy_idx + 1, day50_idx + 1)
+        A = int(np.count_nonzero(ctx.closes[window] > ctx.sma150[window]))
+        ratio = A / 50.0
+        gain_pct = ((float(ctx.closes[day50_idx]) - self.buy_price) / self.buy_price) * 100.0
+        return (ratio < 0.5) and (gain_pct < 5.0)
+
+    def _s5(self, index: int, stop_loss):
+        if self.s5_buy_idx is None or self.s5_buy_idx > index:
+            return False, stop_loss
+        days_since_buy = index - self.s5_buy_idx
+
+        is_key_day = days_since_buy == 45 or (days_since_buy > 45 and (days_since_buy - 44) % 25 == 0)
+        if not is_key_day:
+            return False, stop_loss
+
+        _require(index + 1, 21, "Insufficient data for ATR(20).")
+        current_atr = float(self.context.indicators.atr(20)[index])
+        if current_atr == 0:
+            return False, stop_loss
+
+        if days_since_buy == 45:
+            new_stop_loss = self.buy_price + 0.62 * current_atr
+        else:
+            new_stop_loss = stop_loss + 0.62 * current_atr
+        return float(self.context.closes[index]) < new_stop_loss, new_stop_loss
+
+    def _s6(self, index: int) -> bool:
+        _require(index + 1, 100, "Insufficient history: need at least ~100 days to evaluate 90D high.")
+        if self._days_since_buy(index) < 50:
+            return False
+        start = max(index - 76, 0, 90)
+        return not (self.context.last_new_high[index] >= start)
+
+    def _s10(self, index: int) -> bool:
+        ctx = self.context
+        _require(index + 1, 101, "Insufficient history: need at least 101 days for ATR(100) and 90D High.")
+        high90 = ctx.high90[index]
+        if not np.isfinite(high90) or high90 <= 0:
+            raise ValueError("Invalid 90D High value.")
+        return bool(ctx.s10[index])
+
+    def _fibo(self, index: int, min_days: int, flags: np.ndarray, message: str) -> bool:
+        ctx = self.context
+        _require(index + 1, 250, f"Insufficient history: need at least 250 days {message}.")
+        if self._days_since_buy(index) < min_days:
+            return False
+        if not ctx.top250[index] > ctx.bottom250[index]:
+            raise ValueError("Invalid 250D High/Low range for Fibo." if min_days == 300 else "Invalid 250D High/Low range.")
+        return bool(flags[index])
+
+    def _s13(self, index: int) -> bool:
+        _require(index + 1, 81, "Insufficient history: need at least 81 days.")
+        if self._days_since_buy(index) < 238:
+            return False
+        return bool(self.context.s13[index])
+
+    def _s14(self, index: int) -> bool:
+        ctx = self.context
+        if index + 1 < 106 or ctx.spy_count[index] < 106:
+            raise ValueError("Insufficient history: need at least 106 days.")
+        common_count = int(np.searchsorted(ctx.common_positions, index, side='right'))
+        if common_count < 106:
+            raise ValueError("Too few common trading days between asset and HSI.")
+        if self.common_buy_idx >= common_count:
+            raise ValueError("Buy date is outside common dates range.")
+        last_idx = common_count - 1
+        if last_idx - self.common_buy_idx < 300:
+            return False
+        return bool(ctx.s14_common[last_idx])
+
+    def _s15(self, index: int) -> bool:
+        _require(index + 1, 5, "Insufficient history: need at least 5 trading days for S15.")
+        if self.context.close_t4[index] <= 0:
+            raise ValueError("Invalid base close[t-4] value.")
+        return bool(self.context.s15[index])
+
+    def _s16(self, index: int) -> bool:
+        _require(index + 1, 35, "Insufficient history: need at least 35 trading days for S16.")
+        if self.context.close_t10[index] <= 0:
+            raise ValueError("Invalid base close[t-10] value.")
+        return bool(self.context.s16[index])
+
+    def _s17(self, index: int) -> bool:
+        ctx = self.context
+        _require(index + 1, 150, "Insufficient history: need at least 150 days for S17.")
+        if self._days_since_buy(index) < 150:
+            return False
+        if not ctx.high150[index] > ctx.low150[index]:
+            raise ValueError("Invalid 150-day High/Low range.")
+        return bool(ctx.s17[index])
+
+    def advance(self, index: int, energy: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Evaluate the sell conditions on bar ``index`` and move the S5 stop.
+
+        ``energy`` is the bar's ``calculate_energy_indicators_last_16_days``
+        result, shared with the signal row instead of being recomputed for S9.
+        """
+        ctx = self.context
+        stop_loss = self.stop_loss
+        s5_exit, new_stop = measure("S5", self._s5, index, stop_loss)
+
+        conditions = {
+            "S1": measure("S1", self._s1, index, stop_loss),
+            "S4": measure("S4", self._s4, index),
+            "S5": s5_exit,
+            "S6": measure("S6", self._s6, index),
+            "S7": measure("S7", self._s7, index),
+            "S8": measure("S8", self._s8, index),
+            "S9": energy["energy_score"] < 0.22,
+            "S10": measure("S10", self._s10, index),
+            "S11": measure("S11", self._fibo, index, 300, ctx.s11, "to build Fibo Top/Bottom"),
+            "S12": measure("S12", self._fibo, index, 240, ctx.s12, "for Fibo Top/Bottom"),
+            "S13": measure("S13", self._s13, index),
+            "S14": measure("S14", self._s14, index),
+            "S15": measure("S15", self._s15, index),
+            "S16": measure("S16", self._s16, index),
+            "S17": measure("S17", self._s17, index),
+        }
+
+        self.stop_loss = new_stop
+        return {"conditions": conditions, "stop_loss": new_stop}
+
+    def _s7(self, index: int) -> bool:
+        _require(index + 1, 23, "Insufficient data: need at least 23 daily bars for S7.")
+        _require(index + 1, 24, "Insufficient history to calculate ATR(22) for the last two days.")
+        return bool(self.context.s7[index])
+
+    def _s8(self, index: int) -> bool:
+        _require(index + 1, 148, "Insufficient history: need at least 148 days for S8.")
+        return bool(self.context.s8[index])
@@ -1,6 +1,10 @@
 import numpy as np
 from datetime import datetime
 from app.workers.algo_func.get_code_energy import calculate_energy_indicators_last_16_days
+from app.workers.algo_func.indicators import rolling_max
+from app.workers.algo_func.ohlcv_series import OHLCVSeries, bar_position, first_bar_on_or_after
+from app.workers.algo_func.profiling import measure
+from app.workers.algo_func.trade_calendar import TradeCalendar, to_ts
 import pandas as pd
 
 
@@ -13,8 +17,15 @@ def sma(values, period):
     return result
 
 
+def in_date_order(ohlcv):
+    # OHLCVSeries завжди зберігається в хронологічному порядку — сортувати не треба
+    if isinstance(ohlcv, OHLCVSeries):
+        return ohlcv
+    return sorted(ohlcv, key=lambda x: to_ts(x.date))
+
+
 def exit_by_stop_loss(ohlcv, stop_loss):
-    if not isinstance(ohlcv, list) or len(ohlcv) == 0:
+    if not isinstance(ohlcv, (list, OHLCVSeries)) or len(ohlcv) == 0:
         raise ValueError("OHLCV is empty or invalid.")
     if not isinstance(stop_loss, (int, float)) or not np.isfinite(stop_loss):
         raise ValueError("stopLoss must be a number.")
@@ -28,7 +39,7 @@ def exit_by_stop_loss(ohlcv, stop_loss):
 
 
 def s4(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     if len(data) < 200:
         raise ValueError(
             "Insufficient history: need at least ~200 days for 150D SMA and validation window."
@@ -38,10 +49,7 @@ def s4(ohlcv, buy_date, buy_price):
     sma_vals = sma(closes, 150)  # length N-149
     sma150 = [None] * 149 + list(sma_vals)  # align to N
 
-    bts = to_ts(buy_date)
-    buy_idx = next((i for i, d in enumerate(data) if to_ts(d.date) == bts), -1)
-    if buy_idx == -1:
-        buy_idx = next((i for i, d in enumerate(data) if to_ts(d.date) > bts), -1)
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -67,10 +75,13 @@ def s4(ohlcv, buy_date, buy_price):
     return (ratio < 0.5) and (gain_pct < 5.0)
 
 
-def calc_atr20(ohlcv):
+def calc_atr20(ohlcv, indicators=None):
     if len(ohlcv) < 21:
         raise ValueError("Insufficient data for ATR(20).")
 
+    if indicators is not None:
+        return float(indicators.atr(20)[len(ohlcv) - 1])
+
     trs = []
     for i in range(1, len(ohlcv)):
         high = float(ohlcv[i].high)
@@ -82,13 +93,10 @@ def calc_atr20(ohlcv):
     atr_vals = wilder_atr(trs, 20)
     return atr_vals[-1]
 
-def s5(ohlcv, buy_date, buy_price, stop_loss):
+def s5(ohlcv, buy_date, buy_price, stop_loss, indicators=None):
     buy_date = datetime.fromisoformat(buy_date.replace("Z", "")).strftime("%Y-%m-%d")
     
-    buy_index = next(
-        (i for i, d in enumerate(ohlcv) if d.date == buy_date),
-        None,  
-    )
+    buy_index = bar_position(ohlcv, buy_date)
     
     if buy_index is None:
         return False, stop_loss
@@ -108,7 +116,7 @@ def s5(ohlcv, buy_date, buy_price, stop_loss):
         return False, stop_loss
 
     # Розраховуємо ATR(20) на поточну дату
-    current_atr = calc_atr20(ohlcv)  # повертає float, не Series
+    current_atr = calc_atr20(ohlcv, indicators)  # повертає float, не Series
     
     # Якщо ATR не може бути розрахований (недостатньо даних), повертаємо поточний стоп
     if current_atr is None or current_atr == 0:
@@ -142,23 +150,13 @@ def ema(values, period):
 
 
 def s6(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     if len(data) < 100:
         raise ValueError(
             "Insufficient history: need at least ~100 days to evaluate 90D high."
         )
     last_idx = len(data) - 1
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, d in enumerate(data):
-        if to_ts(d.date) == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, d in enumerate(data):
-            if to_ts(d.date) > bts:
-                buy_idx = i
-                break
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -174,17 +172,11 @@ def s6(ohlcv, buy_date, buy_price):
             "Insufficient history to check 90-day highs in the given window."
         )
 
-    highs = [num(d.high, "high") for d in data]
-    had_new_90d_high = False
+    highs = np.array([num(d.high, "high") for d in data], dtype=np.float64)
 
-    for t in range(start, end + 1):
-        prev_max = -float("inf")
-        for k in range(t - 90, t):
-            if highs[k] > prev_max:
-                prev_max = highs[k]
-        if highs[t] > prev_max:
-            had_new_90d_high = True
-            break
+    # high[t] > max(high[t-90:t]) для всіх t у вікні одним порівнянням
+    prev_max = rolling_max(highs[start - 90:end], 90)[89:]
+    had_new_90d_high = bool(np.any(highs[start:end + 1] > prev_max))
 
     return not had_new_90d_high
 
@@ -203,13 +195,16 @@ def calc_atr22_series(ohlcv):
     return atr_vals
 
 
-def s7(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+def s7(ohlcv, buy_date, buy_price, indicators=None):
+    data = in_date_order(ohlcv)
     n = len(data)
     if n < 23:
         raise ValueError("Insufficient data: need at least 23 daily bars for S7.")
 
-    atr22_series = calc_atr22_series(data)
+    if indicators is not None:
+        atr22_series = indicators.atr_sma(22)[max(22, n - 2):n].tolist()
+    else:
+        atr22_series = calc_atr22_series(data)
     if len(atr22_series) < 2:
         raise ValueError(
             "Insufficient history to calculate ATR(22) for the last two days."
@@ -246,16 +241,21 @@ def calc_tr_series(data):
     return trs
 
 
-def s8(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+def s8(ohlcv, buy_date, buy_price, indicators=None):
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 148:
         raise ValueError("Insufficient history: need at least 148 days for S8.")
 
-    trs = calc_tr_series(data)
-    atr22 = sma(trs, 22)
-    atr100 = sma(trs, 100)
+    if indicators is not None:
+        # only the tails are read below; 148+ bars keep both series long enough
+        atr22 = indicators.atr_sma(22)[n - 126:n].tolist()
+        atr100 = indicators.atr_sma(100)[n - 5:n].tolist()
+    else:
+        trs = calc_tr_series(data)
+        atr22 = sma(trs, 22)
+        atr100 = sma(trs, 100)
 
     if len(atr22) < 126:
         raise ValueError("Too few ATR(22) values for 126-day window.")
@@ -279,13 +279,16 @@ def s8(ohlcv, buy_date, buy_price):
     return count_bear_huge >= 3
 
 
-def s9(trade_date, ohlcv, spy_data):
-    energy_level = calculate_energy_indicators_last_16_days(trade_date, ohlcv, spy_data)
+def s9(trade_date, ohlcv, spy_data, energy=None):
+    # energy - вже пораховані індикатори цього дня (той самий dict, що йде в рядок сигналу)
+    energy_level = energy
+    if energy_level is None:
+        energy_level = measure("energy", calculate_energy_indicators_last_16_days, trade_date, ohlcv, spy_data)
     return energy_level["energy_score"] < 0.22
 
 
-def s10(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+def s10(ohlcv, buy_date, buy_price, indicators=None):
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 101:
@@ -293,9 +296,13 @@ def s10(ohlcv, buy_date, buy_price):
             "Insufficient history: need at least 101 days for ATR(100) and 90D High."
         )
 
-    trs = calc_tr_series(data)
-    atr10_series = wilder_atr(trs, 10)
-    atr100_series = wilder_atr(trs, 100)
+    if indicators is not None:
+        atr10_series = [float(indicators.atr(10)[n - 1])]
+        atr100_series = [float(indicators.atr(100)[n - 1])]
+    else:
+        trs = calc_tr_series(data)
+        atr10_series = wilder_atr(trs, 10)
+        atr100_series = wilder_atr(trs, 100)
 
     if len(atr10_series) < 1 or len(atr100_series) < 1:
         raise ValueError("Failed to calculate ATR(10) or ATR(100) - insufficient data.")
@@ -318,7 +325,7 @@ def s10(ohlcv, buy_date, buy_price):
 
 
 def s11(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 250:
@@ -326,17 +333,7 @@ def s11(ohlcv, buy_date, buy_price):
             "Insufficient history: need at least 250 days to build Fibo Top/Bottom."
         )
 
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, d in enumerate(data):
-        if to_ts(d.date) == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, d in enumerate(data):
-            if to_ts(d.date) > bts:
-                buy_idx = i
-                break
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -366,7 +363,7 @@ def s11(ohlcv, buy_date, buy_price):
 
 
 def s12(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 250:
@@ -374,17 +371,7 @@ def s12(ohlcv, buy_date, buy_price):
             "Insufficient history: need at least 250 days for Fibo Top/Bottom."
         )
 
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, d in enumerate(data):
-        if to_ts(d.date) == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, d in enumerate(data):
-            if to_ts(d.date) > bts:
-                buy_idx = i
-                break
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -414,22 +401,12 @@ def s12(ohlcv, buy_date, buy_price):
 
 
 def s13(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     n = len(data)
     if n < 81:
         raise ValueError("Insufficient history: need at least 81 days.")
 
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, d in enumerate(data):
-        if to_ts(d.date) == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, d in enumerate(data):
-            if to_ts(d.date) > bts:
-                buy_idx = i
-                break
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -448,8 +425,8 @@ def s13(ohlcv, buy_date, buy_price):
 
 
 def s14(ohlcv, hsi_ohlcv, buy_date, buy_price):
-    asset = sorted(ohlcv, key=lambda x: to_ts(x.date))
-    hsi = sorted(hsi_ohlcv, key=lambda x: to_ts(x.date))
+    asset = in_date_order(ohlcv)
+    hsi = in_date_order(hsi_ohlcv)
 
     if len(asset) < 106 or len(hsi) < 106:
         raise ValueError("Insufficient history: need at least 106 days.")
@@ -466,17 +443,7 @@ def s14(ohlcv, hsi_ohlcv, buy_date, buy_price):
 
     last_idx = len(common_ts) - 1
 
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, ts in enumerate(common_ts):
-        if ts == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, ts in enumerate(common_ts):
-            if ts > bts:
-                buy_idx = i
-                break
+    buy_idx = TradeCalendar(common_ts).first_on_or_after(buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside common dates range.")
 
@@ -501,7 +468,7 @@ def s14(ohlcv, hsi_ohlcv, buy_date, buy_price):
 
 
 def s15(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 5:
@@ -517,8 +484,8 @@ def s15(ohlcv, buy_date, buy_price):
     return ret4d < -0.25
 
 
-def s16(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+def s16(ohlcv, buy_date, buy_price, indicators=None):
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 35:
@@ -530,8 +497,11 @@ def s16(ohlcv, buy_date, buy_price):
     if base10_close <= 0:
         raise ValueError("Invalid base close[t-10] value.")
 
-    trs = calc_tr_series(data)
-    atr22 = sma(trs, 22)
+    if indicators is not None:
+        atr22 = indicators.atr_sma(22)[max(22, n - 13):n].tolist()
+    else:
+        trs = calc_tr_series(data)
+        atr22 = sma(trs, 22)
     if len(atr22) < 13:
         raise ValueError("Too few ATR(22) values for comparison with t-12.")
 
@@ -547,23 +517,13 @@ def s16(ohlcv, buy_date, buy_price):
 
 
 def s17(ohlcv, buy_date, buy_price):
-    data = sorted(ohlcv, key=lambda x: to_ts(x.date))
+    data = in_date_order(ohlcv)
     n = len(data)
 
     if n < 150:
         raise ValueError("Insufficient history: need at least 150 days for S17.")
 
-    bts = to_ts(buy_date)
-    buy_idx = -1
-    for i, d in enumerate(data):
-        if to_ts(d.date) == bts:
-            buy_idx = i
-            break
-    if buy_idx == -1:
-        for i, d in enumerate(data):
-            if to_ts(d.date) > bts:
-                buy_idx = i
-                break
+    buy_idx = first_bar_on_or_after(data, buy_date)
     if buy_idx == -1:
         raise ValueError("Buy date is outside data range.")
 
@@ -590,26 +550,26 @@ def s17(ohlcv, buy_date, buy_price):
     return near_bottom
 
 
-def runAllSellConditions(ohlcv, spy_data, buy_date, buy_price, stop_loss, trade_date):
+def runAllSellConditions(ohlcv, spy_data, buy_date, buy_price, stop_loss, trade_date, indicators=None, energy=None):
     # спочатку рахуємо S5
-    s5_exit, new_stop = s5(ohlcv, buy_date, buy_price, stop_loss)
+    s5_exit, new_stop = measure("S5", s5, ohlcv, buy_date, buy_price, stop_loss, indicators)
 
     conditions = {
-        "S1": exit_by_stop_loss(ohlcv, stop_loss),
-        "S4": s4(ohlcv, buy_date, buy_price),
+        "S1": measure("S1", exit_by_stop_loss, ohlcv, stop_loss),
+        "S4": measure("S4", s4, ohlcv, buy_date, buy_price),
         "S5": s5_exit,
-        "S6": s6(ohlcv, buy_date, buy_price),
-        "S7": s7(ohlcv, buy_date, buy_price),
-        "S8": s8(ohlcv, buy_date, buy_price),
-        "S9": s9(trade_date, ohlcv, spy_data),
-        "S10": s10(ohlcv, buy_date, buy_price),
-        "S11": s11(ohlcv, buy_date, buy_price),
-        "S12": s12(ohlcv, buy_date, buy_price),
-        "S13": s13(ohlcv, buy_date, buy_price),
-        "S14": s14(ohlcv, spy_data, buy_date, buy_price),
-        "S15": s15(ohlcv, buy_date, buy_price),
-        "S16": s16(ohlcv, buy_date, buy_price),
-        "S17": s17(ohlcv, buy_date, buy_price),
+        "S6": measure("S6", s6, ohlcv, buy_date, buy_price),
+        "S7": measure("S7", s7, ohlcv, buy_date, buy_price, indicators),
+        "S8": measure("S8", s8, ohlcv, buy_date, buy_price, indicators),
+        "S9": measure("S9", s9, trade_date, ohlcv, spy_data, energy),
+        "S10": measure("S10", s10, ohlcv, buy_date, buy_price, indicators),
+        "S11": measure("S11", s11, ohlcv, buy_date, buy_price),
+        "S12": measure("S12", s12, ohlcv, buy_date, buy_price),
+        "S13": measure("S13", s13, ohlcv, buy_date, buy_price),
+        "S14": measure("S14", s14, ohlcv, spy_data, buy_date, buy_price),
+        "S15": measure("S15", s15, ohlcv, buy_date, buy_price),
+        "S16": measure("S16", s16, ohlcv, buy_date, buy_price, indicators),
+        "S17": measure("S17", s17, ohlcv, buy_date, buy_price),
     }
 
     return {"conditions": conditions, "stop_loss": new_stop}
@@ -635,21 +595,6 @@ def isSell(signals):
     )
 
 
-def to_ts(date):
-    if isinstance(date, datetime):
-        return date.timestamp() * 1000
-    if isinstance(date, (int, float)):
-        return date
-    try:
-        if isinstance(date, str):
-            dt = datetime.fromisoformat(date.replace("Z", "+00:00"))
-        else:
-            dt = datetime.fromisoformat(str(date))
-        return dt.timestamp() * 1000
-    except (ValueError, TypeError):
-        raise ValueError(f"Invalid date: {date}")
-
-
 def num(value, name):
     try:
         n = float(value)
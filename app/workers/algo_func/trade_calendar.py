@@ -0,0 +1,77 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, Hashable, Optional, Sequence
+
+
+def to_ts(date):
+    if isinstance(date, datetime):
+        return date.timestamp() * 1000
+    if isinstance(date, (int, float)):
+        return date
+    try:
+        if isinstance(date, str):
+            dt = datetime.fromisoformat(date.replace("Z", "+00:00"))
+        else:
+            dt = datetime.fromisoformat(str(date))
+        return dt.timestamp() * 1000
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid date: {date}")
+
+
+class TradeCalendar:
+    """
+    Trade-day lookups for one series, built once and shared by every rule.
+
+    ``position(day)`` is the first bar whose date equals ``day`` (what
+    ``list.index`` / ``next(i for ... == day)`` return), in O(1).
+    ``first_on_or_after(day)`` is the first bar whose ``to_ts`` is not
+    earlier than ``day``'s (the "exact match, else the next bar" search the
+    sell rules do), by bisection; it requires dates in chronological order.
+
+    Both accept ``limit`` so a prefix of the series can reuse the calendar
+    of the whole history: positions at or past ``limit`` count as missing.
+    """
+
+    def __init__(self, dates: Sequence[Hashable]):
+        self.dates = dates
+        self._positions: Optional[Dict[Hashable, int]] = None
+        self._ts: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_bars(cls, bars) -> "TradeCalendar":
+        return cls([bar.date for bar in bars])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _date_list(self) -> Sequence[Hashable]:
+        # date_strings of a series come as a numpy array; plain str keys hash faster
+        return self.dates.tolist() if isinstance(self.dates, np.ndarray) else self.dates
+
+    @property
+    def positions(self) -> Dict[Hashable, int]:
+        if self._positions is None:
+            positions: Dict[Hashable, int] = {}
+            for i, d in enumerate(self._date_list()):
+                positions.setdefault(d, i)
+            self._positions = positions
+        return self._positions
+
+    @property
+    def ts(self) -> np.ndarray:
+        if self._ts is None:
+            self._ts = np.array([to_ts(d) for d in self._date_list()], dtype=np.float64)
+        return self._ts
+
+    def position(self, day: Hashable, limit: Optional[int] = None) -> Optional[int]:
+        """First bar dated exactly ``day``, or None."""
+        index = self.positions.get(day)
+        if index is None or (limit is not None and index >= limit):
+            return None
+        return index
+
+    def first_on_or_after(self, day, limit: Optional[int] = None) -> int:
+        """First bar not earlier than ``day``, or -1 if every bar is earlier."""
+        end = len(self.dates) if limit is None else limit
+        index = int(np.searchsorted(self.ts[:end], to_ts(day), side='left'))
+        return index if index < end else -1
@@ -3,14 +3,23 @@ import logging
 import aiohttp
 from datetime import datetime
 from app.services.queue_service import QueueService
-from app.workers.algo_func.get_db_data import get_stock_data_from_db, init_db_pool
+from app.workers.algo_func.get_db_data import init_db_pool
+from app.workers.algo_func.ohlcv_cache import default_cache, get_stock_series, pack_series, unpack_series
+from app.workers import cpu_pool
 from app.services.file_service import FileService
 import os
 import csv
-from app.workers.algo_func.buy_signals import runAllBuyConditions, isBuy, OHLCV
-from typing import Optional, Dict, Any, List, Union
-from app.workers.algo_func.sell_signals import runAllSellConditions, isSell
-from app.workers.algo_func.get_code_energy import calculate_energy_indicators_last_16_days
+from app.workers.algo_func.buy_signals import isBuy
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+from typing import Optional, Dict, Any, List, Tuple, Union
+from app.workers.algo_func.sell_signals import isSell
+from app.workers.algo_func.energy_series import calculate_energy_series
+from app.workers.algo_func.indicators import IndicatorSet
+from app.workers.algo_func.buy_matrix import build_buy_matrix
+from app.workers.algo_func.sell_evaluator import SellContext
+from app.workers.algo_func.profiling import active_profiler, condition_profiling, measure
+from app.services.profiling_service import ProfilingService
+from app.services.scheduling_service import SchedulingService
 import pandas as pd
 import numpy as np
 
@@ -27,23 +36,9 @@ async def process_algorithm_task(task_data):
         await init_db_pool()
         stock_code = task_data['stock']
 
-        # await get_stock_data_from_db(stock_code)
-        logger.info('Starting get_data_and_save_to_csv')
-        await get_data_and_save_to_csv(stock_code, "2019-01-02")
-        logger.info('Finished get_data_and_save_to_csv')
-
-        logger.info('Starting signals_for_the_period')
-        await signals_for_the_period(stock_code, "2025-10-16")
-        logger.info('Finished signals_for_the_period')
-
-        logger.info('Starting format_signals_csv_inplace')
-        await format_signals_csv_inplace(file_service=FileService(), file_name=stock_code)
-        logger.info('Finished format_signals_csv_inplace')
-
-        # Додаємо результат до другої черги
-        processing_task_id = QueueService.add_to_result_processing_queue(stock_code)
+        task_data.update(await process_stock(stock_code))
         
-        logger.info(f"Algorithm task {task_data['task_id']} completed, added to processing queue: {processing_task_id}")
+        logger.info(f"Algorithm task {task_data['task_id']} completed, added to processing queue: {task_data['processing_task_id']}")
         
         return task_data
         
@@ -52,13 +47,103 @@ async def process_algorithm_task(task_data):
         raise e
 
 
+async def process_algorithm_batch_task(task_data):
+    """
+    Воркер для пакету кодів (перша черга): один job на кілька кодів
+
+    Коди обробляються по черзі; помилка одного коду записується в його
+    результат і не зупиняє решту. Job падає, лише якщо не вдався жоден код.
+    """
+    try:
+        stocks = task_data['stocks']
+        logger.info(f"Processing algorithm batch task: {task_data['task_id']} ({len(stocks)} codes)")
+        await init_db_pool()
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for stock_code in stocks:
+            start = time.perf_counter()
+            try:
+                result = await process_stock(stock_code)
+                result["status"] = "ok"
+            except Exception as e:
+                logger.error(f"Error processing {stock_code} in batch {task_data['task_id']}: {str(e)}")
+                result = {"status": "failed", "error": str(e)}
+            result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            results[stock_code] = result
+
+        failed = [code for code, result in results.items() if result["status"] == "failed"]
+        task_data["results"] = results
+        task_data["succeeded"] = len(results) - len(failed)
+        task_data["failed"] = failed
+        logger.info(
+            f"Algorithm batch task {task_data['task_id']} completed: "
+            f"{task_data['succeeded']} ok, {len(failed)} failed"
+        )
+
+        if stocks and len(failed) == len(stocks):
+            raise RuntimeError(f"All {len(stocks)} codes of the batch failed")
+        return task_data
+
+    except Exception as e:
+        logger.error(f"Error processing algorithm batch task {task_data['task_id']}: {str(e)}")
+        raise e
+
+
+async def process_stock(stock_code: str) -> Dict[str, Any]:
+    """
+    Повний цикл одного коду: сигнали, форматування CSV, задача в другу чергу.
+
+    Повертає поля для результату job: ``processing_task_id`` і, при
+    CONDITION_PROFILING=true, ``condition_profile``.
+    """
+    result: Dict[str, Any] = {}
+    start = time.perf_counter()
+
+    # await get_stock_data_from_db(stock_code)
+    logger.info('Starting get_data_and_save_to_csv')
+    await get_data_and_save_to_csv(stock_code, "2019-01-02")
+    logger.info('Finished get_data_and_save_to_csv')
+
+    logger.info('Starting signals_for_the_period')
+    # CONDITION_PROFILING=true — заміри часу кожної умови для цього коду
+    with condition_profiling() as profiler:
+        await signals_for_the_period(stock_code, "2025-10-16")
+    logger.info('Finished signals_for_the_period')
+
+    if profiler is not None:
+        result["condition_profile"] = profiler.summary()
+        try:
+            ProfilingService.publish(stock_code, profiler)
+        except Exception as e:
+            logger.warning(f"Failed to publish condition profile for {stock_code}: {str(e)}")
+
+    try:
+        default_cache().flush_stats()
+    except Exception as e:
+        logger.warning(f"Failed to publish OHLCV cache stats: {str(e)}")
+
+    logger.info('Starting format_signals_csv_inplace')
+    await format_signals_csv_inplace(file_service=FileService(), file_name=stock_code)
+    logger.info('Finished format_signals_csv_inplace')
+
+    # Час обробки коду — оцінка вартості для LPT-порядку наступного запуску
+    try:
+        SchedulingService.record_runtime(stock_code, (time.perf_counter() - start) * 1000)
+    except Exception as e:
+        logger.warning(f"Failed to record runtime of {stock_code}: {str(e)}")
+
+    # Додаємо результат до другої черги
+    result["processing_task_id"] = QueueService.add_to_result_processing_queue(stock_code)
+    return result
+
+
 async def get_data_and_save_to_csv(code: str, trade_date: str, file_service: "FileService" = None):
     if file_service is None:
         file_service = FileService()
 
-    code_data_raw = await get_stock_data_from_db(code, "2025-10-17")
+    code_data = await get_stock_series(code, "2025-10-17")
 
-    first_date = code_data_raw[0]["date"] if code_data_raw else None
+    first_date = str(code_data.date_strings[0]) if code_data else None
     effective_date = first_date if (first_date and first_date > trade_date) else trade_date
 
     fieldnames = [
@@ -115,33 +200,11 @@ async def get_data_and_save_to_csv(code: str, trade_date: str, file_service: "Fi
 
 async def signals_for_the_period(code, trade_date):
     print("start")
-    spy_data_raw = await get_stock_data_from_db("2800", trade_date)
-    code_data_raw = await get_stock_data_from_db(code, trade_date)
-
-    # print(f'Spy- {spy_data_raw[0]}')
-
-    spy_data = [
-        OHLCV(
-            bar["date"],
-            bar["open"],
-            bar["high"],
-            bar["low"],
-            bar["close"],
-            bar["volume"],
-        )
-        for bar in spy_data_raw
-    ]
-    code_data = [
-        OHLCV(
-            bar["date"],
-            bar["open"],
-            bar["high"],
-            bar["low"],
-            bar["close"],
-            bar["volume"],
-        )
-        for bar in code_data_raw
-    ]
+    # Колонки numpy замість списків OHLCV; префікси історії — це view, без копіювання.
+    # Індекс 2800 і сам код беруться з кешу (пам'ять → Redis → data/ohlcv → БД):
+    # get_data_and_save_to_csv щойно читав цей код, а 2800 потрібен кожній задачі
+    spy_data = await get_stock_series("2800", trade_date)
+    code_data = await get_stock_series(code, trade_date)
     
     # logger.info(f'Code_data-{code_data[0]}')
 
@@ -154,41 +217,72 @@ async def signals_for_the_period(code, trade_date):
 
     # print(latest_signal)
 
+    # Розрахунок сигналів — чиста CPU-робота: з пулом процесів (async-воркер)
+    # іде туди, і цикл подій тим часом обслуговує I/O інших задач
+    if cpu_pool.enabled():
+        results_batch, samples = await cpu_pool.submit(
+            replay_packed, code, pack_series(code_data), pack_series(spy_data), latest_signal,
+            active_profiler() is not None,
+        )
+        if samples:
+            active_profiler().merge(samples)
+    else:
+        results_batch = replay_signals(code, code_data, spy_data, latest_signal)
+
+    if len(results_batch) > 0:
+        ok = await append_to_signals_csv(results_batch, code)
+        # logger.info(f"Appended {len(results_batch)} rows to {code}.csv: {'OK' if ok else 'FAILED'}")        
+
+
+def replay_packed(code: str, code_blob: bytes, spy_blob: bytes, latest_signal: Dict[str, Any],
+                  profile: bool) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, List[int]]]]:
+    """``replay_signals`` у процесі пулу: історії приходять упакованими байтами, заміри умов повертаються."""
+    with condition_profiling(profile) as profiler:
+        results_batch = replay_signals(code, unpack_series(code_blob), unpack_series(spy_blob), latest_signal)
+    return results_batch, profiler.samples if profiler is not None else None
+
+
+def replay_signals(code: str, code_data: OHLCVSeries, spy_data: OHLCVSeries,
+                   latest_signal: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Прогін стану позиції по барах після ``latest_signal``; без I/O, повертає нові рядки сигналів."""
+    # Індикатори рахуються один раз на всю історію, умови читають значення за індексом бару
+    indicators = IndicatorSet.from_bars(code_data)
+    # Умови купівлі не залежать від стану позиції — рахуємо матрицю для всіх барів одразу
+    buy_matrix = build_buy_matrix(code_data, spy_data, indicators)
+    sell_context = measure("SellContext", SellContext, code_data, spy_data, indicators)
+    sell_evaluator = None
+
     latest_date = pd.to_datetime(latest_signal["tradeday"]).tz_localize(None)
 
-    filtered_code_data = []
-    for bar in code_data:
-        bar_date = pd.to_datetime(bar.date)
-        if bar_date > latest_date:
-            filtered_code_data.append(bar)
+    new_bars = np.flatnonzero(code_data.dates > np.datetime64(latest_date.date(), "D"))
+    filtered_code_data = [(int(bar_index), code_data[int(bar_index)]) for bar_index in new_bars]
 
     # print(len(filtered_code_data))
+
+    # Енергія (E1-E5, energy_score) рахується одним проходом для всіх нових барів;
+    # той самий dict іде і в рядок сигналу, і в S9
+    energy = measure(
+        "energy", calculate_energy_series,
+        code_data, spy_data, filtered_code_data[0][0] if filtered_code_data else len(code_data),
+    )
     
     results_batch: List[Dict[str, Any]] = []
 
-    for bar in filtered_code_data:
+    for bar_index, bar in filtered_code_data:
         # print(bar)
         tradeday = pd.to_datetime(bar.date).tz_localize(None)
 
-        filtered_spy = [
-            bar for bar in spy_data if bar.date <= tradeday.strftime("%Y-%m-%d")
-        ]
-        filtered_code = [
-            bar for bar in code_data if bar.date <= tradeday.strftime("%Y-%m-%d")
-        ]
+        filtered_code = code_data.as_of(bar_index)
 
-        energy_data = calculate_energy_indicators_last_16_days(
-            tradeday.strftime("%Y-%m-%d"), filtered_code, filtered_spy
-        )
+        energy_data = energy.at(bar_index)
 
         # print(latest_signal)
 
         position_status = latest_signal["position_status"]
 
         if position_status == "F":
-            buySignals = runAllBuyConditions(
-                filtered_code, tradeday.strftime("%Y-%m-%d"), filtered_spy
-            )
+            sell_evaluator = None
+            buySignals = buy_matrix.signals_at(bar_index)
             logger.info(f'Trade day: {tradeday.strftime("%Y-%m-%d")}, stock: {code}')
             logger.info(F'Buy signals: {buySignals}')
             buy = isBuy(buySignals)
@@ -240,14 +334,10 @@ async def signals_for_the_period(code, trade_date):
 
             # next_open_action = latest_signal.get("next_open_action")
             exit1 = to_float_or_none(latest_signal.get("exit1"))
-            sellSignals = runAllSellConditions(
-                filtered_code,
-                filtered_spy,
-                entry_date,
-                to_float_or_none(entry_price),
-                exit1,
-                tradeday.strftime("%Y-%m-%d"),
-            )
+            # Евалюатор живе протягом позиції: створюється на вході, далі лише крок на один бар
+            if sell_evaluator is None or latest_signal["next_open_action"] == "B":
+                sell_evaluator = sell_context.evaluator(entry_date, to_float_or_none(entry_price), exit1)
+            sellSignals = sell_evaluator.advance(bar_index, energy_data)
             logger.info(f'Trade day: {tradeday.strftime("%Y-%m-%d")}, stock: {code}')
             logger.info(f'Sell signals: {sellSignals}')
             sell = isSell(sellSignals['conditions'])
@@ -278,10 +368,8 @@ async def signals_for_the_period(code, trade_date):
             results_batch.append(result)
             # print(result)
             # return result
-            
-    if len(results_batch) > 0:
-        ok = await append_to_signals_csv(results_batch, code)
-        # logger.info(f"Appended {len(results_batch)} rows to {code}.csv: {'OK' if ok else 'FAILED'}")        
+
+    return results_batch
             
 def to_float_or_none(v):
     if v is None:
@@ -0,0 +1,210 @@
+import asyncio
+import inspect
+import logging
+import os
+import signal
+import traceback
+from typing import Dict, List, Optional
+
+import aiohttp
+from rq import Queue, Worker
+from rq.exceptions import DequeueTimeout
+from rq.job import Job
+from rq.utils import utcnow
+
+from app.config.queue_config import redis_conn
+from app.workers import cpu_pool
+from app.workers.algo_func import get_db_data
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM_WORKER_CONCURRENCY = int(os.getenv("ALGORITHM_WORKER_CONCURRENCY", 4))
+# скільки секунд BLPOP чекає на задачу; це ж і затримка зупинки воркера
+DEQUEUE_TIMEOUT = int(os.getenv("ASYNC_WORKER_DEQUEUE_TIMEOUT", 5))
+HTTP_TIMEOUT = int(os.getenv("ASYNC_WORKER_HTTP_TIMEOUT", 60))
+
+_http_session: Optional[aiohttp.ClientSession] = None
+# сесію відкрив AsyncWorkerRuntime і тримає між задачами
+_runtime_session = False
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Спільна ``aiohttp`` сесія процесу.
+
+    У довгоживучому воркері її відкриває ``AsyncWorkerRuntime``; в інших
+    режимах сесія створюється при першому виклику в поточному циклі подій.
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+    return _http_session
+
+
+async def release_http_session() -> None:
+    """
+    Закриває спільну сесію наприкінці задачі, якщо її не тримає ``AsyncWorkerRuntime``.
+
+    Звичайний RQ воркер виконує кожну задачу в новому процесі й циклі подій,
+    тож незакрита сесія лише лишила б відкриті з'єднання до кінця процесу.
+    """
+    global _http_session
+    if _runtime_session or _http_session is None:
+        return
+    await _http_session.close()
+    _http_session = None
+
+
+class AsyncWorkerRuntime:
+    """
+    Long-lived RQ worker that runs coroutine jobs on one event loop.
+
+    The stock RQ worker forks a process and opens a new event loop for
+    every job, so each stock pays for the MySQL pool, connections and
+    module warm-up. Here the pool, the ``aiohttp`` session and the
+    in-process OHLCV cache stay warm across jobs, and up to
+    ``concurrency`` jobs run at once. RQ bookkeeping (started/finished/
+    failed registries, retries, dependents) goes through ``rq.Worker``.
+
+    Jobs share the loop for I/O; their CPU part (the signal replay) runs
+    in ``cpu_pool``, one process per core, so fetches and file writes of
+    other stocks go on while it computes. Plain (non-async) job functions
+    run in a thread.
+    """
+
+    def __init__(self, queues: List[Queue], concurrency: int = ALGORITHM_WORKER_CONCURRENCY,
+                 dequeue_timeout: int = DEQUEUE_TIMEOUT, name: Optional[str] = None):
+        self.queues = queues
+        self.concurrency = concurrency
+        self.dequeue_timeout = dequeue_timeout
+        self.worker = Worker(queues, connection=redis_conn, name=name)
+        self._stopping = False
+        self._running: Dict[asyncio.Task, Job] = {}
+
+    def stop(self) -> None:
+        if not self._stopping:
+            logger.info("Stopping async worker: no new jobs, waiting for running ones")
+        self._stopping = True
+
+    def _job_heartbeat_ttl(self) -> int:
+        # як у RQ: наступний пульс має прийти раніше, інакше clean_registries стороннього воркера
+        # перенесе задачу, що ще виконується, у FailedJobRegistry
+        return self.worker.job_monitoring_interval + 60
+
+    def _prepare(self, job: Job) -> None:
+        """
+        ``Worker.prepare_job_execution`` без ``current_job`` воркера: задач
+        кілька, а ``handle_job_success`` скидає це поле, поки інші ще виконуються.
+        """
+        with redis_conn.pipeline() as pipeline:
+            self.worker.heartbeat(pipeline=pipeline)
+            job.heartbeat(utcnow(), self._job_heartbeat_ttl(), pipeline=pipeline)
+            job.prepare_for_execution(self.worker.name, pipeline=pipeline)
+            pipeline.execute()
+
+    def _send_heartbeats(self) -> None:
+        """Продовжує ключ воркера і score кожної задачі, що виконується, у StartedJobRegistry одним pipeline."""
+        jobs = list(self._running.values())
+        with redis_conn.pipeline() as pipeline:
+            self.worker.heartbeat(pipeline=pipeline)
+            for job in jobs:
+                job.heartbeat(utcnow(), self._job_heartbeat_ttl(), pipeline=pipeline, xx=True)
+            results = pipeline.execute()
+        # worker.heartbeat — два результати, далі по два на задачу; hset == 1 означає, що ключ
+        # задачі вже видалили (result_ttl=0) і пульс створив його знову — прибираємо, як RQ
+        for job, created in zip(jobs, results[2::2]):
+            if created == 1:
+                redis_conn.delete(job.key)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(self.worker.job_monitoring_interval)
+            try:
+                self._send_heartbeats()
+            except Exception as e:
+                logger.warning(f"Worker heartbeat failed: {str(e)}")
+
+    async def _dequeue(self):
+        try:
+            return await asyncio.to_thread(
+                Queue.dequeue_any, self.queues, self.dequeue_timeout, connection=redis_conn
+            )
+        except DequeueTimeout:
+            return None
+
+    async def _perform(self, job, queue: Queue) -> None:
+        started_job_registry = queue.started_job_registry
+        try:
+            self._prepare(job)
+            redis_conn.persist(job.key)
+            job.started_at = utcnow()
+            timeout = job.timeout if job.timeout and job.timeout > 0 else None
+
+            if inspect.iscoroutinefunction(job.func):
+                result = await asyncio.wait_for(job.func(*job.args, **job.kwargs), timeout)
+            else:
+                result = await asyncio.wait_for(asyncio.to_thread(job.func, *job.args, **job.kwargs), timeout)
+
+            job.ended_at = utcnow()
+            job._result = result
+            self.worker.handle_job_success(job=job, queue=queue, started_job_registry=started_job_registry)
+            logger.info(f"{queue.name}: Job OK ({job.id})")
+        except Exception as e:
+            job.ended_at = utcnow()
+            logger.error(f"{queue.name}: Job {job.id} failed: {str(e)}")
+            self.worker.handle_job_failure(
+                job=job, queue=queue, started_job_registry=started_job_registry,
+                exc_string=traceback.format_exc(),
+            )
+
+    def _finished(self, task: asyncio.Task, slots: asyncio.Semaphore) -> None:
+        self._running.pop(task, None)
+        slots.release()
+        if not self._running:
+            self.worker.set_state("idle")
+
+    async def run(self) -> None:
+        global _http_session, _runtime_session
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stop)
+
+        await get_db_data.init_db_pool()
+        cpu_pool.configure()
+        _http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+        _runtime_session = True
+        self.worker.register_birth()
+        self.worker.set_state("idle")
+        heartbeat = asyncio.create_task(self._heartbeat())
+        slots = asyncio.Semaphore(self.concurrency)
+        logger.info(
+            f"Async worker {self.worker.name} started: queues {[q.name for q in self.queues]}, "
+            f"concurrency {self.concurrency}, CPU pool {'on' if cpu_pool.enabled() else 'off'}"
+        )
+
+        try:
+            while not self._stopping:
+                await slots.acquire()
+                dequeued = await self._dequeue()
+                if dequeued is None:
+                    slots.release()
+                    continue
+                job, queue = dequeued
+                task = asyncio.create_task(self._perform(job, queue))
+                self._running[task] = job
+                self.worker.set_state("busy")
+                task.add_done_callback(lambda done: self._finished(done, slots))
+
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            self.worker.register_death()
+            _runtime_session = False
+            await _http_session.close()
+            cpu_pool.shutdown()
+            if get_db_data.pool is not None:
+                get_db_data.pool.close()
+                await get_db_data.pool.wait_closed()
+                get_db_data.pool = None
+            logger.info(f"Async worker {self.worker.name} stopped")
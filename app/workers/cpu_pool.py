@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import logging.handlers
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _cgroup_cpu_limit() -> Optional[float]:
+    """Квота CPU контейнера в ядрах (cgroup v2 ``cpu.max`` або v1 ``cfs_quota_us``); None — без квоти."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    for root in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        try:
+            with open(os.path.join(root, "cpu.cfs_quota_us"), encoding="utf-8") as f:
+                quota = int(f.read())
+            with open(os.path.join(root, "cpu.cfs_period_us"), encoding="utf-8") as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        return quota / period if quota > 0 and period > 0 else None
+    return None
+
+
+def available_cores() -> int:
+    """Ядра, доступні процесу: маска афінності (де її немає — ``os.cpu_count()``), обмежена квотою cgroup."""
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cores = min(cores, math.ceil(limit))
+    return max(1, cores)
+
+
+# за замовчуванням — стільки процесів, скільки ядер доступно контейнеру; 0 — рахувати в циклі подій
+ALGORITHM_CPU_WORKERS = int(os.getenv("ALGORITHM_CPU_WORKERS", available_cores()))
+ALGORITHM_CPU_MAX_IN_FLIGHT = int(os.getenv("ALGORITHM_CPU_MAX_IN_FLIGHT", 0))
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class _ToParentLoggers(logging.Handler):
+    """Routes records from the pool processes to the parent's logger of the same name."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def _init_process(log_queue, level: int) -> None:
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+
+
+def configure(workers: int = ALGORITHM_CPU_WORKERS, max_in_flight: int = ALGORITHM_CPU_MAX_IN_FLIGHT) -> bool:
+    """
+    Запускає пул процесів для CPU-частини задач; повертає False, якщо пул вимкнено (``workers`` 0).
+
+    Процеси стартують через spawn (батьківський процес має потоки й цикл
+    подій, fork тут небезпечний). Логи процесів пулу пересилаються у
+    логери батьківського процесу. Одночасно в пулі не більше
+    ``max_in_flight`` задач (за замовчуванням 2 на процес), решта чекає в
+    ``submit`` — так черга пулу не росте без меж.
+    """
+    global _executor, _slots, _log_listener
+    if _executor is not None or workers <= 0:
+        return _executor is not None
+
+    context = multiprocessing.get_context("spawn")
+    log_queue = context.Queue()
+    _log_listener = logging.handlers.QueueListener(log_queue, _ToParentLoggers())
+    _log_listener.start()
+    level = logging.getLogger("app.workers.algorithm_worker").getEffectiveLevel()
+    _executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_process, initargs=(log_queue, level),
+    )
+    _slots = asyncio.Semaphore(max_in_flight or workers * 2)
+    logger.info(f"CPU pool started: {workers} processes, up to {max_in_flight or workers * 2} tasks in flight")
+    return True
+
+
+def shutdown() -> None:
+    global _executor, _slots, _log_listener
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+        _slots = None
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def enabled() -> bool:
+    return _executor is not None
+
+
+async def submit(fn: Callable, *args: Any) -> Any:
+    """
+    Виконує ``fn(*args)`` у пулі, не блокуючи цикл подій; без пулу — тут же.
+
+    ``fn`` і аргументи передаються між процесами через pickle, тож мають
+    бути функцією модуля та компактними даними.
+    """
+    if _executor is None:
+        return fn(*args)
+    async with _slots:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
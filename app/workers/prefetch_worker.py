@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.queue_service import QueueService
+from app.workers.algo_func.get_db_data import init_db_pool
+from app.workers.algo_func.ohlcv_store import OHLCVStore, default_store, get_stock_series
+
+logger = logging.getLogger(__name__)
+
+# з'єднань у пулі 20 — лишаємо запас для інших задач
+OHLCV_PREFETCH_CONCURRENCY = int(os.getenv("OHLCV_PREFETCH_CONCURRENCY", 8))
+INDEX_CODE = "2800"
+
+
+async def prefetch_series(codes: List[str], concurrency: int = OHLCV_PREFETCH_CONCURRENCY,
+                          refresh: bool = False, store: Optional[OHLCVStore] = None) -> Dict[str, Any]:
+    """
+    Завантажує історії всіх кодів у локальне сховище, не більше ``concurrency`` запитів до БД одночасно.
+
+    Коди, свіжі в сховищі, не запитуються (якщо не ``refresh``) і не входять
+    у rows/s та затримки — звіт описує саме навантаження на БД. Помилка
+    одного коду не зупиняє інші — вона потрапляє у ``failed``, а сам код
+    пізніше завантажиться задачею алгоритму.
+    """
+    store = store or default_store()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: Dict[str, float] = {}
+    rows: Dict[str, int] = {}
+    failed: Dict[str, str] = {}
+    fresh: List[str] = []
+
+    async def fetch(code: str) -> None:
+        meta = store.read_meta(code)
+        if not refresh and meta is not None and store.is_fresh(meta):
+            fresh.append(code)
+            return
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                series = await get_stock_series(code, store=store, refresh=refresh)
+            except Exception as e:
+                failed[code] = str(e)
+                logger.warning(f"Prefetch of {code} failed: {str(e)}")
+                return
+            latencies[code] = (time.perf_counter() - start) * 1000
+            rows[code] = len(series)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(fetch(code) for code in dict.fromkeys(codes)))
+    elapsed = time.perf_counter() - start
+
+    total_rows = sum(rows.values())
+    ms = np.array(list(latencies.values())) if latencies else np.zeros(1)
+    slowest = sorted(latencies.items(), key=lambda item: item[1], reverse=True)[:10]
+    return {
+        "codes": len(latencies) + len(failed) + len(fresh),
+        "fetched": len(latencies),
+        "already_fresh": len(fresh),
+        "failed": failed,
+        "concurrency": concurrency,
+        "rows": total_rows,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(total_rows / elapsed, 1) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 2),
+            "p95": round(float(np.percentile(ms, 95)), 2),
+            "max": round(float(ms.max()), 2),
+        },
+        "slowest": [{"code": code, "ms": round(value, 2), "rows": rows[code]} for code, value in slowest],
+    }
+
+
+async def process_prefetch_task(task_data):
+    """
+    Воркер попереднього завантаження історій (стадія перед чергою алгоритмів)
+
+    Задачі алгоритмів залежать від цієї задачі (RQ depends_on) і стартують,
+    коли всі історії запуску вже лежать у локальному сховищі.
+    """
+    try:
+        codes = [INDEX_CODE, *task_data["stocks"]]
+        logger.info(f"Prefetching {len(codes)} series for task {task_data['task_id']}")
+        await init_db_pool()
+
+        report = await prefetch_series(
+            codes,
+            concurrency=task_data.get("concurrency") or OHLCV_PREFETCH_CONCURRENCY,
+            refresh=task_data.get("refresh", False),
+        )
+        logger.info(
+            f"Prefetch {task_data['task_id']}: {report['fetched']} fetched, {report['already_fresh']} fresh, "
+            f"{len(report['failed'])} failed, "
+            f"{report['rows']} rows in {report['elapsed_s']}s ({report['rows_per_s']} rows/s), "
+            f"p50 {report['latency_ms']['p50']} ms, p95 {report['latency_ms']['p95']} ms"
+        )
+
+        task_data["report"] = report
+
+        # Задачі алгоритмів — у LPT-порядку, а не в порядку множини залежностей RQ
+        try:
+            released = QueueService.release_dependents_by_cost(task_data['task_id'])
+            logger.info(f"Released {released} algorithm jobs by estimated cost")
+        except Exception as e:
+            logger.warning(f"Failed to release algorithm jobs in cost order, RQ will release them: {str(e)}")
+
+        return task_data
+
+    except Exception as e:
+        logger.error(f"Error processing prefetch task {task_data['task_id']}: {str(e)}")
+        raise e
@@ -1,14 +1,17 @@
-import os
 from datetime import timedelta
 import logging
 from datetime import datetime
 from typing import List, Optional, TypedDict, Union, Tuple
-import requests
+import aiohttp
 
 from app.services.file_service import FileService
-from app.models.algorithm_models import UnifiedTradeSignal
+from app.models.trade_signal import TradeSignal, DateKeys, parse_api_dates, parse_csv_dates
 from app.config.queue_config import file_write_queue
 from app.services.queue_service import QueueService
+from app.workers.algo_func.trade_calendar import TradeCalendar
+from app.services.signal_reconciliation import reconcile_signals
+from app.services.verify_data_cache import fetch_signals
+from app.workers.async_runtime import release_http_session
 
 class ErrorResponse(TypedDict):
     error: str
@@ -17,7 +20,6 @@ class ErrorResponse(TypedDict):
 
 logger = logging.getLogger(__name__)
 
-API_KEY = os.getenv('API_KEY')
 START_FROM = '2019'
 
 file_service = FileService()
@@ -31,6 +33,11 @@ def _to_float_or_zero(value) -> float:
     except Exception:
         return 0.0
 
+def _required_buy(key: Optional[int]) -> int:
+    if key is None:
+        raise ValueError("buy_signal is missing")
+    return key
+
 def _to_float_or_open(value) -> Union[float, str]:
     try:
         if value in (None, "", "Open position"):
@@ -39,31 +46,28 @@ def _to_float_or_open(value) -> Union[float, str]:
     except Exception:
         return "Open position"
 
-async def load_server_data(stock_code:str)-> Union[Tuple[List[UnifiedTradeSignal], List[Optional[datetime]]], ErrorResponse]:
-    """Завантажує дані з API, повертає підготовлений масив сигналів та масив торгових днів"""
+async def load_server_data(stock_code:str)-> Union[Tuple[List[TradeSignal], List[Optional[int]]], ErrorResponse]:
+    """Завантажує дані з API, повертає підготовлений масив сигналів та масив торгових днів (ключі дат, ``to_key``)"""
 
     try:
-        API_URL =f'http://ete.stockfisher.com.hk/v1.1/debugHKEX/verifyData?TradeDay=&Code={stock_code}&verifyType=signal'
-        headers = {
-            'x-api-key': API_KEY,
-        }
-        response = requests.get(API_URL, headers=headers)
-        response.raise_for_status()
-
-        result_data = response.json()
+        # з диска, поки відповідь не застаріла за торговим календарем; інакше — клієнт API
+        # (спільна keep-alive сесія, ліміти паралельності й частоти, тайм-аути та повтори)
+        result_data = await fetch_signals(stock_code)
     
         if not result_data:
             logger.warning(f"Empty result for stock {stock_code}")
             return {"error": "Empty response", "detail": f"There is not any data in API for stock {stock_code}"
         }
         #TODO форуємо вихідний масив
-        trade_days = []
-        response_data: List[UnifiedTradeSignal] = []
+        # дати всіх днів розбираються однією колонкою; угоди — легкі TradeSignal з цілими ключами дат
+        trade_day_strings = [day.get("tradeday") or "" for day in result_data]
+        trade_days = parse_api_dates(trade_day_strings)
+        date_key = DateKeys(trade_day_strings, trade_days)
+        response_data: List[TradeSignal] = []
         current_position = None
         
         for  day in result_data: 
             trade_day = day.get("tradeday") or ""
-            trade_days.append(datetime.fromisoformat(trade_day.replace('Z', '+00:00')).replace(tzinfo=None) if trade_day else None)
             entry_date = day.get("entry_date") or ""
     
         #TODO Не доаю значення раніше 2019
@@ -86,19 +90,13 @@ async def load_server_data(stock_code:str)-> Union[Tuple[List[UnifiedTradeSignal
             elif today_action == "S" and pos_status == "F":
                 if current_position:
                     try:
-                        buy_ts = current_position.get("buy_signal")
-                        stop_ts = day.get("tradeday")
-                        prev_buy = current_position.get("day_before_buy")
-                        prev_sell = day.get("prev_tradeday")
-
-                        unified = UnifiedTradeSignal(
-                            buy_signal=datetime.fromisoformat(buy_ts.replace('Z', '+00:00')).replace(tzinfo=None) if buy_ts else None,
-                            stop_signal=datetime.fromisoformat(stop_ts.replace('Z', '+00:00')).replace(tzinfo=None) if stop_ts else "Open position",
+                        unified = TradeSignal(
+                            buy=_required_buy(date_key(current_position.get("buy_signal"))),
+                            stop=date_key(day.get("tradeday")),
                             entry_price=_to_float_or_zero(current_position.get("entry_price")),
                             exit_price=_to_float_or_open(day.get("exit_price")),
-                            day_before_buy=datetime.fromisoformat(prev_buy.replace('Z', '+00:00')).replace(tzinfo=None) if prev_buy else None,
-                            day_before_sell=datetime.fromisoformat(prev_sell.replace('Z', '+00:00')).replace(tzinfo=None) if prev_sell else None,
-                            gain_lose=None,
+                            day_before_buy_key=date_key(current_position.get("day_before_buy")),
+                            day_before_sell_key=date_key(day.get("prev_tradeday")),
                             source="api"
                         )
                         response_data.append(unified)
@@ -106,36 +104,19 @@ async def load_server_data(stock_code:str)-> Union[Tuple[List[UnifiedTradeSignal
                         logger.error(f"Error building unified trade signal: {e}")
                     current_position = None 
                 else:
-                    try:
-                        stop_ts = day.get("tradeday")
-                        prev_sell = day.get("prev_tradeday")
-                        unified = UnifiedTradeSignal(
-                            buy_signal=None,
-                            stop_signal=datetime.fromisoformat(stop_ts.replace('Z', '+00:00')).replace(tzinfo=None) if stop_ts else "Open position",
-                            entry_price=0.0,
-                            exit_price=_to_float_or_open(day.get("exit_price")),
-                            day_before_buy=None,
-                            day_before_sell=datetime.fromisoformat(prev_sell.replace('Z', '+00:00')).replace(tzinfo=None) if prev_sell else None,
-                            gain_lose=None,
-                            source="api"
-                        )
-                        response_data.append(unified)
-                    except Exception as e:
-                        logger.error(f"Error building unified open position signal: {e}")
+                    # продаж без купівлі в межах START_FROM: угоді без дати купівлі немає пари
+                    logger.error(f"Error building unified open position signal: buy_signal is missing, "
+                                 f"sell on {day.get('tradeday')}")
 
 
         if current_position:
             try:
-                buy_ts = current_position.get("buy_signal")
-                prev_buy = current_position.get("day_before_buy")
-                unified = UnifiedTradeSignal(
-                    buy_signal=datetime.fromisoformat(buy_ts.replace('Z', '+00:00')).replace(tzinfo=None) if buy_ts else None,
-                    stop_signal="Open position",
+                unified = TradeSignal(
+                    buy=_required_buy(date_key(current_position.get("buy_signal"))),
+                    stop=None,
                     entry_price=_to_float_or_zero(current_position.get("entry_price")),
                     exit_price="Open position",
-                    day_before_buy=datetime.fromisoformat(prev_buy.replace('Z', '+00:00')) if prev_buy else None,
-                    day_before_sell=None,
-                    gain_lose=None,
+                    day_before_buy_key=date_key(current_position.get("day_before_buy")),
                     source="api"
                 )
                 response_data.append(unified)
@@ -144,57 +125,59 @@ async def load_server_data(stock_code:str)-> Union[Tuple[List[UnifiedTradeSignal
                 
         return response_data, trade_days
 
-    except requests.HTTPError as e:
-        logger.error(f"HTTP error for stock {stock_code}: {e}, status=    {response.status_code}")
+    except aiohttp.ClientResponseError as e:
+        logger.error(f"HTTP error for stock {stock_code}: {e.message}, status=    {e.status}")
         return { "error": "API error", "detail": str(e)}
     except Exception as e:
         logger.error(f'Error while loading data from API, stock: {stock_code}, {e}')
         return { "error": "API error", "detail": "API error"}
 
-def convert_csv_to_unified(csv_row: dict) -> UnifiedTradeSignal:
-    """Конвертує CSV рядок до UnifiedTradeSignal"""
-    try:
-        # Парсинг дат з різних форматів
-        buy_signal_str = csv_row.get('Buy Signal', '')
-        stop_signal_str = csv_row.get('Stop Signal', '')
-        
-        # Парсинг buy_signal (формат: 2016-12-08)
-        buy_signal = datetime.strptime(buy_signal_str, '%Y-%m-%d') if buy_signal_str else None
-        
-        # Парсинг stop_signal (формат: 2017-08-07 00:00:00 або "Open position")
-        if stop_signal_str == "Open position":
-            stop_signal = "Open position"
+def convert_csv_signals(csv_rows: List[dict]) -> List[TradeSignal]:
+    """
+    Конвертує рядки CSV алгоритму в TradeSignal; рядок з помилкою пропускається
+
+    Дати розбираються колонками: Buy Signal — 2016-12-08, Stop Signal —
+    2017-08-07 00:00:00, 2017-08-07 або "Open position". Рядок, де Stop
+    Signal не рядок (None від csv.DictReader для обірваного рядка),
+    відкидається ще до розбору колонок.
+    """
+    rows = []
+    for csv_row in csv_rows:
+        stop_value = csv_row.get('Stop Signal', '')
+        if isinstance(stop_value, str):
+            rows.append(csv_row)
         else:
-            try:
-                stop_signal = datetime.strptime(stop_signal_str, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                try:
-                    stop_signal = datetime.strptime(stop_signal_str, '%Y-%m-%d')
-                except ValueError:
-                    stop_signal = "Open position"
-        
-        # Конвертація цін
-        entry_price = float(csv_row.get('Entry price', '0'))
-        exit_price_str = csv_row.get('Exit price', '0')
-        exit_price = float(exit_price_str) if exit_price_str != "Open position" else "Open position"
-        
-        # Парсинг gain_lose
-        gain_lose_str = csv_row.get('Gain/Lose', '')
-        gain_lose = float(gain_lose_str) if gain_lose_str else None
-        
-        return UnifiedTradeSignal(
-            buy_signal=buy_signal,
-            stop_signal=stop_signal,
-            entry_price=entry_price,
-            exit_price=exit_price,
-            day_before_buy=None,  # CSV не має цих полів
-            day_before_sell=None,
-            gain_lose=gain_lose,
-            source="csv"
-        )
-    except Exception as e:
-        logger.error(f"Error converting CSV signal: {e}")
-        raise
+            logger.error(f"Error converting CSV signal: Stop Signal must be a string, not {type(stop_value).__name__}")
+
+    buy_signals = parse_csv_dates([row.get('Buy Signal', '') for row in rows], ('%Y-%m-%d',))
+    stop_signals = parse_csv_dates(
+        [value if value != "Open position" else '' for value in (row.get('Stop Signal', '') for row in rows)],
+        ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'),
+    )
+
+    signals = []
+    for csv_row, buy_signal, stop_signal in zip(rows, buy_signals, stop_signals):
+        try:
+            # Конвертація цін
+            entry_price = float(csv_row.get('Entry price', '0'))
+            exit_price_str = csv_row.get('Exit price', '0')
+            exit_price = float(exit_price_str) if exit_price_str != "Open position" else "Open position"
+
+            # Парсинг gain_lose
+            gain_lose_str = csv_row.get('Gain/Lose', '')
+            gain_lose = float(gain_lose_str) if gain_lose_str else None
+
+            signals.append(TradeSignal(
+                buy=_required_buy(buy_signal),
+                stop=stop_signal,
+                entry_price=entry_price,
+                exit_price=exit_price,
+                gain_lose=gain_lose,
+                source="csv"
+            ))
+        except Exception as e:
+            logger.error(f"Error converting CSV signal: {e}")
+    return signals
 
 
 async def process_result_task(processing_data):
@@ -216,122 +199,25 @@ async def process_result_task(processing_data):
         #TODO Підготовка 
         if isinstance(api_result, dict):
             logger.error(f"API error for stock {stock_code}: {api_result}")
-            unified_api_data: List[UnifiedTradeSignal] = []
-            trade_days: List[Optional[datetime]] = []
+            unified_api_data: List[TradeSignal] = []
+            trade_days: List[Optional[int]] = []
         else:
             unified_api_data, trade_days = api_result
                 
-        unified_algo_data = []
-        for csv_row in new_algo_data:
-            try:
-                unified_signal = convert_csv_to_unified(csv_row)
-                unified_algo_data.append(unified_signal)
-            except Exception as e:
-                logger.error(f"Error converting CSV signal to unified: {e}")
+        unified_algo_data = convert_csv_signals(new_algo_data)
 
-        #TODO Обробка даних
-        match_count = 0
-        deviations = 0
-        deviations_data = []
-        unmatched_api_data = []
-
-        for api_item in unified_api_data:
-            found_match = False
-            i = 0
-            while i < len(unified_algo_data):
-                csv_item = unified_algo_data[i]
-                exact_buy = api_item.buy_signal == csv_item.buy_signal
-                except_sell = api_item.stop_signal == csv_item.stop_signal
-
-
-                if (exact_buy and except_sell):
-                    match_count += 2
-
-                    unified_algo_data.pop(i)
-                    found_match = True
-                    break
-                
-                
-                
-                #buy_signal
-                api_buy_index = None
-                csv_buy_index = None
-                    
-                if api_item.buy_signal:
-                    try:
-                        api_buy_index = trade_days.index(api_item.buy_signal)
-                    except ValueError:
-                            logger.info(f"API buy_signal {api_item.buy_signal} не знайдено в trade_days")
-                    
-                if csv_item.buy_signal:
-                    try:
-                        csv_buy_index = trade_days.index(csv_item.buy_signal)
-                    except ValueError:
-                        logger.info(f"CSV buy_signal {csv_item.buy_signal} не знайдено в trade_days")
-                    
-                if api_buy_index is not None and csv_buy_index is not None:
-                    index_diff = abs(api_buy_index - csv_buy_index)
-                    buy_match = index_diff <= 2
-                else:
-                    buy_match = False
-                    
-                #stop_signal
-                api_stop_index = None
-                csv_stop_index = None
-                    
-                if (api_item.stop_signal and csv_item.stop_signal and 
-                    api_item.stop_signal != "Open position" and csv_item.stop_signal != "Open position"):
-                    try:
-                        if isinstance(api_item.stop_signal, datetime):
-                            api_stop_index = trade_days.index(api_item.stop_signal)
-                    except ValueError:
-                        logger.info(f"API stop_signal {api_item.stop_signal} не знайдено в trade_days")
-                        
-                    try:
-                        if isinstance(csv_item.stop_signal, datetime):
-                            csv_stop_index = trade_days.index(csv_item.stop_signal)
-                    except ValueError:
-                        logger.info(f"CSV stop_signal {csv_item.stop_signal} не знайдено в trade_days")
-                        
-                    if api_stop_index is not None and csv_stop_index is not None:
-                        index_diff = abs(api_stop_index - csv_stop_index)
-                        stop_match = index_diff <= 2
-                    else:
-                        stop_match = False
-
-                elif api_item.stop_signal == csv_item.stop_signal:
-                    stop_match = True
-                else:
-                    stop_match = False
-                
-                if buy_match and not exact_buy and stop_match and not except_sell:
-                    deviations += 2
-                    deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
-                    deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
-                    unified_algo_data.pop(i)
-                    found_match = True
-                    break
-
-                if (exact_buy or except_sell):
-                    match_count += 1
-
-                if (buy_match and not exact_buy or stop_match and not except_sell):
-                    deviations += 1
-                    if stop_match and not except_sell:
-                        deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
-
-                    if buy_match and not exact_buy: 
-                        deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
-                if ((exact_buy and  stop_match) or (except_sell and buy_match)):
-                    unified_algo_data.pop(i)
-                    found_match = True
-                    break
-                
-                i += 1
-            
-            if not found_match:
-                unmatched_api_data.append(f'Buy:{api_item.buy_signal}, Sell:{api_item.stop_signal};')
+        # Індекс торгових днів будується один раз; позиція — перше входження дати, як у list.index
+        trade_calendar = TradeCalendar(trade_days)
 
+        #TODO Обробка даних
+        reconciliation = reconcile_signals(unified_api_data, unified_algo_data, trade_calendar)
+        match_count = reconciliation.match_count
+        deviations = reconciliation.deviations
+        deviations_data = reconciliation.deviations_data
+        unmatched_api_data = reconciliation.unmatched_api_data
+        unified_algo_data = reconciliation.unmatched_algo
+        if reconciliation.missing_dates:
+            logger.info(f"Дати сигналів не знайдено в trade_days ({len(reconciliation.missing_dates)}): {reconciliation.missing_dates}")
 
         total_api_count = len(unified_api_data)*2
         total_algo = len(new_algo_data)*2
@@ -386,3 +272,5 @@ async def process_result_task(processing_data):
     except Exception as e:
         logger.error(f"Error processing result task {processing_data['task_id']}: {str(e)}")
         raise e
+    finally:
+        await release_http_session()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Перевірка еквівалентності: еталонний побаровий шлях проти швидкого.
+
+Еталон — runAllBuyConditions / runAllSellConditions /
+calculate_energy_indicators_last_16_days на відфільтрованих за датою
+списках барів, як у воркері до векторизації. Швидкий шлях — матриця
+купівлі, SellEvaluator і серія енергії, як у поточному воркері. Обидва
+проходять той самий автомат позиції F/I; порівнюються всі прапорці умов,
+стоп-лосс, поля енергії та рядки сигналу, а потім сирий і форматований
+CSV еталону проти CSV справжнього signals_for_the_period.
+
+Еталон у цьому ж дереві — код, який уже частково переписано (rolling_max,
+TradeCalendar), тож регресію в ньому він не помітить. З
+``--reference-tree`` CSV воркера додатково порівнюються з CSV
+signals_for_the_period замороженого дерева, запущеного в окремому
+інтерпретаторі (``benchmarks/reference_tree.py``):
+
+    git worktree add ../baseline <commit>
+    python benchmarks/equivalence.py --synthetic --reference-tree ../baseline
+
+    python benchmarks/equivalence.py --synthetic --sizes 1200 --seeds 0 1 2
+    python benchmarks/equivalence.py --snapshot data/snapshots/700.json
+    python benchmarks/equivalence.py --record 700 --output data/snapshots/700.json
+
+Код виходу 1, якщо знайдено розбіжність; друкується перший бар, де шляхи
+розійшлися, і кількість розбіжностей по кожному полю.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app.services.file_service import FileService
+from app.workers import algorithm_worker as worker
+from app.workers.algo_func.buy_matrix import build_buy_matrix
+from app.workers.algo_func.buy_signals import OHLCV, isBuy, runAllBuyConditions
+from app.workers.algo_func.energy_series import ENERGY_KEYS, calculate_energy_series
+from app.workers.algo_func.get_code_energy import calculate_energy_indicators_last_16_days
+from app.workers.algo_func.indicators import IndicatorSet
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+from app.workers.algo_func.sell_evaluator import SellContext
+from app.workers.algo_func.sell_signals import isSell, runAllSellConditions
+from benchmarks.synthetic import generate_pair, to_rows
+from benchmarks.worker_replay import INDEX_CODE, replay_worker, rows_instead_of_db
+
+DEFAULT_REPLAY_FROM = "2019-01-02"
+DEFAULT_TRADE_DATE = "2025-10-16"
+REFERENCE_TREE_RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reference_tree.py")
+
+
+@dataclass
+class BarTrace:
+    """Все, що шлях порахував для одного бару."""
+    index: int
+    date: str
+    position_status: str
+    conditions: Dict[str, Any] = field(default_factory=dict)
+    stop: Any = None
+    energy: Dict[str, Any] = field(default_factory=dict)
+    row: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Divergence:
+    index: int
+    date: str
+    field: str
+    reference: Any
+    fast: Any
+
+
+class ReferenceEngine:
+    """Побаровий шлях: кожна умова отримує відфільтровані за датою списки."""
+
+    def __init__(self, bars: List[OHLCV], index_bars: List[OHLCV]):
+        self.bars = bars
+        self.index_bars = index_bars
+        self._upto: Tuple[int, List[OHLCV], List[OHLCV]] = (-1, [], [])
+
+    def prepare(self, start: int) -> None:
+        pass
+
+    def _history(self, i: int) -> Tuple[List[OHLCV], List[OHLCV]]:
+        if self._upto[0] != i:
+            day = self.bars[i].date
+            self._upto = (
+                i,
+                [b for b in self.bars if b.date <= day],
+                [b for b in self.index_bars if b.date <= day],
+            )
+        return self._upto[1], self._upto[2]
+
+    def energy(self, i: int) -> Dict[str, Any]:
+        code, index = self._history(i)
+        return calculate_energy_indicators_last_16_days(self.bars[i].date, code, index)
+
+    def buy(self, i: int) -> Dict[str, Any]:
+        code, index = self._history(i)
+        return runAllBuyConditions(code, self.bars[i].date, index)
+
+    def sell(self, i: int, entry_date, entry_price, exit1, opened: bool, energy: Dict[str, Any]) -> Dict[str, Any]:
+        code, index = self._history(i)
+        return runAllSellConditions(code, index, entry_date, entry_price, exit1, self.bars[i].date)
+
+
+class FastEngine:
+    """Шлях воркера: матриця купівлі, SellEvaluator на позицію, серія енергії."""
+
+    def __init__(self, bars: List[OHLCV], index_bars: List[OHLCV]):
+        self.series = OHLCVSeries.from_bars(bars)
+        self.index_series = OHLCVSeries.from_bars(index_bars)
+        indicators = IndicatorSet.from_bars(self.series)
+        self.matrix = build_buy_matrix(self.series, self.index_series, indicators)
+        self.sell_context = SellContext(self.series, self.index_series, indicators)
+        self.evaluator = None
+        self.energy_series = None
+
+    def prepare(self, start: int) -> None:
+        self.energy_series = calculate_energy_series(self.series, self.index_series, start)
+
+    def energy(self, i: int) -> Dict[str, Any]:
+        return self.energy_series.at(i)
+
+    def buy(self, i: int) -> Dict[str, Any]:
+        self.evaluator = None
+        return self.matrix.signals_at(i)
+
+    def sell(self, i: int, entry_date, entry_price, exit1, opened: bool, energy: Dict[str, Any]) -> Dict[str, Any]:
+        if self.evaluator is None or opened:
+            self.evaluator = self.sell_context.evaluator(entry_date, entry_price, exit1)
+        return self.evaluator.advance(i, energy)
+
+
+def replay(engine, code: str, bars: List[OHLCV], replay_from: str) -> List[BarTrace]:
+    """
+    Автомат позиції з signals_for_the_period над довільним рушієм.
+
+    Стан починається з рядка, який пише get_data_and_save_to_csv; виняток
+    рушія записується в останній BarTrace і зупиняє прогін, як і у воркері.
+    """
+    first_date = bars[0].date if bars else None
+    effective_date = first_date if (first_date and first_date > replay_from) else replay_from
+    latest_signal: Dict[str, Any] = {
+        "tradeday": effective_date, "position_status": "F", "next_open_action": "N",
+        "exit1": 0, "entry_price": 0, "entry_date": 0,
+    }
+    latest_date = pd.to_datetime(effective_date).tz_localize(None)
+    replayed = [i for i, bar in enumerate(bars) if pd.to_datetime(bar.date) > latest_date]
+
+    traces: List[BarTrace] = []
+    if not replayed:
+        return traces
+    engine.prepare(replayed[0])
+
+    for i in replayed:
+        bar = bars[i]
+        tradeday = pd.to_datetime(bar.date).tz_localize(None)
+        trace = BarTrace(index=i, date=bar.date, position_status=latest_signal["position_status"])
+        traces.append(trace)
+        try:
+            energy_data = engine.energy(i)
+            trace.energy = dict(energy_data)
+            energy_fields = {key: energy_data[key] for key in ENERGY_KEYS}
+
+            if trace.position_status == "F":
+                signals = engine.buy(i)
+                buy = isBuy(signals)
+                trace.conditions = {k: v for k, v in signals.items() if k != "stopLoss"}
+                trace.stop = signals.get("stopLoss")
+                exit_price = bar.open if latest_signal["next_open_action"] == "S" else 0
+                trace.row = {
+                    "code": code, "tradeday": tradeday, "position_status": "F",
+                    "next_open_action": "B" if buy else "N", **energy_fields,
+                    "exit1": trace.stop, "entry_price": bar.close, "close": bar.close,
+                    "entry_date": 0, "exit_price": exit_price,
+                }
+                latest_signal = {
+                    "entry_date": tradeday, "entry_price": bar.close, "exit1": trace.stop,
+                    "position_status": "I" if buy else "F", "next_open_action": "B" if buy else "N",
+                }
+            else:
+                entry_date = latest_signal.get("entry_date")
+                entry_price = latest_signal.get("entry_price")
+                opened = latest_signal["next_open_action"] == "B"
+                if opened:
+                    entry_date = tradeday.strftime("%Y-%m-%d")
+                    entry_price = bar.open
+                exit1 = worker.to_float_or_none(latest_signal.get("exit1"))
+                signals = engine.sell(i, entry_date, worker.to_float_or_none(entry_price), exit1, opened, energy_data)
+                sell = isSell(signals["conditions"])
+                trace.conditions = dict(signals["conditions"])
+                trace.stop = signals["stop_loss"]
+                trace.row = {
+                    "code": code, "tradeday": tradeday, "position_status": "I",
+                    "next_open_action": "S" if sell else "N", **energy_fields,
+                    "exit1": trace.stop, "entry_price": entry_price, "close": bar.close,
+                    "entry_date": entry_date, "exit_price": 0,
+                }
+                latest_signal = {
+                    "entry_date": entry_date, "entry_price": entry_price, "exit1": trace.stop,
+                    "position_status": "F" if sell else "I", "next_open_action": "S" if sell else "N",
+                }
+        except Exception as e:
+            trace.error = f"{type(e).__name__}: {e}"
+            break
+    return traces
+
+
+def _same(a: Any, b: Any) -> bool:
+    # numpy scalars compare by value: a numpy bool and a bool with the same value are the same flag
+    a = a.item() if isinstance(a, np.generic) else a
+    b = b.item() if isinstance(b, np.generic) else b
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def compare_traces(reference: List[BarTrace], fast: List[BarTrace]) -> List[Divergence]:
+    diffs: List[Divergence] = []
+    for ref, got in zip(reference, fast):
+        def check(name: str, a: Any, b: Any) -> None:
+            if not _same(a, b):
+                diffs.append(Divergence(ref.index, ref.date, name, a, b))
+
+        check("bar", (ref.index, ref.position_status), (got.index, got.position_status))
+        check("error", ref.error, got.error)
+        for key in sorted(set(ref.conditions) | set(got.conditions)):
+            check(f"conditions.{key}", ref.conditions.get(key), got.conditions.get(key))
+        check("stop", ref.stop, got.stop)
+        for key in sorted(set(ref.energy) | set(got.energy)):
+            check(f"energy.{key}", ref.energy.get(key), got.energy.get(key))
+        for key in sorted(set(ref.row) | set(got.row)):
+            check(f"row.{key}", ref.row.get(key), got.row.get(key))
+    if len(reference) != len(fast):
+        shorter = min(len(reference), len(fast))
+        tail = (reference if len(reference) > shorter else fast)[shorter]
+        diffs.append(Divergence(tail.index, tail.date, "replayed_bars", len(reference), len(fast)))
+    return diffs
+
+
+def _first_line_diff(a: str, b: str) -> Optional[Tuple[int, str, str]]:
+    left, right = a.splitlines(), b.splitlines()
+    for n, (x, y) in enumerate(zip(left, right), start=1):
+        if x != y:
+            return n, x, y
+    if len(left) != len(right):
+        n = min(len(left), len(right)) + 1
+        return n, (left[n - 1] if len(left) >= n else "<EOF>"), (right[n - 1] if len(right) >= n else "<EOF>")
+    return None
+
+
+async def _signal_csvs(code: str, stock_rows, index_rows, replay_from: str,
+                       reference: List[BarTrace], workdir: str) -> Dict[str, Tuple[str, str]]:
+    """
+    Сирий і форматований CSV: еталонні рядки проти справжнього signals_for_the_period.
+
+    Воркер пише рядки одним пакетом наприкінці, тож якщо прогін упав, у CSV
+    лишається тільки початковий рядок; з еталоном робимо так само, а текст
+    винятку порівнюємо окремо (ключ ``error``).
+    """
+    ref_dir = os.path.join(workdir, "reference")
+    fast_dir = os.path.join(workdir, "worker")
+    os.makedirs(ref_dir)
+    os.makedirs(fast_dir)
+
+    with rows_instead_of_db(stock_rows, index_rows, ref_dir):
+        await worker.get_data_and_save_to_csv(code, replay_from)
+        if reference and reference[-1].error is None:
+            await worker.append_to_signals_csv([t.row for t in reference], code)
+    worker_error = None
+    try:
+        await replay_worker(code, stock_rows, index_rows, replay_from, fast_dir)
+    except Exception as e:
+        worker_error = f"{type(e).__name__}: {e}"
+
+    out: Dict[str, Tuple[str, str]] = {
+        "error": (reference[-1].error if reference else None, worker_error),
+    }
+    texts = []
+    for directory in (ref_dir, fast_dir):
+        service = FileService()
+        service.data_dir = os.path.join(directory, "data")
+        with open(os.path.join(service.data_dir, f"{code}.csv"), encoding="utf-8") as f:
+            raw = f.read()
+        with contextlib.redirect_stdout(io.StringIO()):
+            await worker.format_signals_csv_inplace(file_service=service, file_name=code)
+        with open(os.path.join(service.data_dir, f"{code}.csv"), encoding="utf-8") as f:
+            texts.append((raw, f.read()))
+    out["raw"] = (texts[0][0], texts[1][0])
+    out["formatted"] = (texts[0][1], texts[1][1])
+    return out
+
+
+def rows_to_bars(rows: List[Dict[str, Any]]) -> List[OHLCV]:
+    return [OHLCV(r["date"], r["open"], r["high"], r["low"], r["close"], r["volume"]) for r in rows]
+
+
+def frozen_reference_csvs(tree: str, code: str, stock_rows, index_rows, replay_from: str,
+                          workdir: str) -> Dict[str, Any]:
+    """Сирий і форматований CSV та помилка signals_for_the_period дерева ``tree`` на тих самих барах."""
+    os.makedirs(workdir)
+    case_path = os.path.join(workdir, "case.json")
+    result_path = os.path.join(workdir, "result.json")
+    with open(case_path, "w", encoding="utf-8") as f:
+        json.dump({"code": code, "stock": stock_rows, "index": index_rows,
+                   "replay_from": replay_from, "trade_date": DEFAULT_TRADE_DATE}, f)
+    # лише дерево еталона в sys.path: жоден модуль поточного дерева не підміняє його
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONPATH"}
+    done = subprocess.run([sys.executable, REFERENCE_TREE_RUNNER, tree, case_path, result_path],
+                          cwd=workdir, env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        raise RuntimeError(f"reference tree {tree} failed:\n{done.stderr.strip()}")
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def check_case(name: str, code: str, stock_rows, index_rows, replay_from: str,
+                     reference_tree: Optional[str] = None) -> bool:
+    bars, index_bars = rows_to_bars(stock_rows), rows_to_bars(index_rows)
+    # еталонні правила друкують проміжні значення
+    with contextlib.redirect_stdout(io.StringIO()):
+        reference = replay(ReferenceEngine(bars, index_bars), code, bars, replay_from)
+        fast = replay(FastEngine(bars, index_bars), code, bars, replay_from)
+    diffs = compare_traces(reference, fast)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csvs = await _signal_csvs(code, stock_rows, index_rows, replay_from, reference, tmp)
+        if reference_tree:
+            frozen = frozen_reference_csvs(reference_tree, code, stock_rows, index_rows, replay_from,
+                                           os.path.join(tmp, "frozen"))
+            csvs["frozen raw"] = (frozen["raw"], csvs["raw"][1])
+            csvs["frozen formatted"] = (frozen["formatted"], csvs["formatted"][1])
+    ref_error, worker_error = csvs.pop("error")
+    csv_diffs = {kind: _first_line_diff(a, b) for kind, (a, b) in csvs.items()}
+    csv_diffs = {kind: d for kind, d in csv_diffs.items() if d is not None}
+    if ref_error != worker_error:
+        csv_diffs["worker error"] = (0, str(ref_error), str(worker_error))
+    if reference_tree and frozen["error"] != worker_error:
+        csv_diffs["frozen worker error"] = (0, str(frozen["error"]), str(worker_error))
+
+    status = "OK" if not diffs and not csv_diffs else "DIVERGED"
+    stopped = f", stopped by {ref_error}" if ref_error else ""
+    frozen_note = f", frozen reference {reference_tree}" if reference_tree else ""
+    print(f"{name}: {status} ({len(reference)} bars replayed{stopped}{frozen_note})")
+    if diffs:
+        first = diffs[0]
+        print(f"  first diverging bar: #{first.index} {first.date}")
+        for d in diffs:
+            if d.index != first.index:
+                break
+            print(f"    {d.field}: reference={d.reference!r} fast={d.fast!r}")
+        counts: Dict[str, int] = {}
+        for d in diffs:
+            counts[d.field] = counts.get(d.field, 0) + 1
+        print("  diverging bars per field: " + ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+    for kind, (line, ref_line, fast_line) in csv_diffs.items():
+        where = f"{kind} CSV differs at line {line}" if line else f"{kind} differs"
+        print(f"  {where}:\n    reference: {ref_line}\n    worker:    {fast_line}")
+    return status == "OK"
+
+
+async def record_snapshot(code: str, output: str, replay_from: str) -> None:
+    """Зберігає дані коду та індексу з БД у JSON для офлайн-прогонів."""
+    from app.workers.algo_func.get_db_data import get_stock_data_from_db, init_db_pool
+
+    await init_db_pool()
+    snapshot = {
+        "code": code,
+        "replay_from": replay_from,
+        "stock": await get_stock_data_from_db(code),
+        "index": await get_stock_data_from_db(INDEX_CODE),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    print(f"Saved {len(snapshot['stock'])} bars of {code} and {len(snapshot['index'])} of {INDEX_CODE} to {output}")
+
+
+async def main_async(args) -> int:
+    if args.record:
+        await record_snapshot(args.record, args.output or f"data/snapshots/{args.record}.json", args.replay_from)
+        return 0
+
+    ok = True
+    for path in args.snapshot or []:
+        with open(path, encoding="utf-8") as f:
+            snap = json.load(f)
+        ok &= await check_case(path, snap["code"], snap["stock"], snap["index"],
+                               snap.get("replay_from", args.replay_from), args.reference_tree)
+    if args.synthetic:
+        for size in args.sizes:
+            for seed in args.seeds:
+                bars, index_bars = generate_pair(size, seed)
+                # прогін з бару 300, щоб правила мали достатню історію
+                replay_from = bars[min(300, size - 1)].date
+                ok &= await check_case(f"synthetic size={size} seed={seed}", "SYN",
+                                       to_rows(bars), to_rows(index_bars), replay_from, args.reference_tree)
+    return 0 if ok else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", action="store_true", help="run on generated histories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1200])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--snapshot", nargs="+", help="JSON snapshots written by --record")
+    parser.add_argument("--record", metavar="CODE", help="save CODE and the index from the database")
+    parser.add_argument("--output", help="snapshot path for --record")
+    parser.add_argument("--replay-from", default=DEFAULT_REPLAY_FROM)
+    parser.add_argument("--reference-tree", metavar="PATH",
+                        help="also compare the worker CSVs with signals_for_the_period of a frozen checkout")
+    args = parser.parse_args(argv)
+    if args.reference_tree:
+        args.reference_tree = os.path.abspath(args.reference_tree)
+    if not (args.synthetic or args.snapshot or args.record):
+        parser.error("nothing to do: pass --synthetic, --snapshot or --record")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Run ``signals_for_the_period`` of another checkout over in-memory OHLCV rows.
+
+``equivalence.py --reference-tree`` starts this script in a separate
+interpreter with only that checkout on ``sys.path``, so a frozen tree
+(e.g. ``git worktree add ../baseline <commit>``) replays the same rows as
+the current worker without sharing a single module with it. The data
+source the tree's worker reads from (``get_stock_series`` or, in older
+trees, ``get_stock_data_from_db``) is swapped for the rows; CSVs are
+written under the current directory.
+
+    python benchmarks/reference_tree.py <tree> <input.json> <output.json>
+
+``input.json``: code, stock, index, replay_from, trade_date.
+``output.json``: raw and formatted CSV text and the replay error, if any.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+INDEX_CODE = "2800"
+
+
+def _serve_rows(worker, stock_rows: List[Dict[str, Any]], index_rows: List[Dict[str, Any]]) -> None:
+    if hasattr(worker, "get_stock_series"):
+        from app.workers.algo_func.ohlcv_series import OHLCVSeries
+
+        stock, index = OHLCVSeries.from_rows(stock_rows), OHLCVSeries.from_rows(index_rows)
+
+        async def series(requested: str, end_date: Optional[str] = None):
+            return index if requested == INDEX_CODE else stock
+
+        worker.get_stock_series = series
+    else:
+        async def rows(requested: str, end_date: Optional[str] = None):
+            return [dict(r) for r in (index_rows if requested == INDEX_CODE else stock_rows)]
+
+        worker.get_stock_data_from_db = rows
+
+
+async def run(case: Dict[str, Any]) -> Dict[str, Any]:
+    import app.workers.algorithm_worker as worker
+    from app.services.file_service import FileService
+
+    code = case["code"]
+    _serve_rows(worker, case["stock"], case["index"])
+    error = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        await worker.get_data_and_save_to_csv(code, case["replay_from"])
+        try:
+            await worker.signals_for_the_period(code, case["trade_date"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        path = os.path.join("data", f"{code}.csv")
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        await worker.format_signals_csv_inplace(file_service=FileService(), file_name=code)
+        with open(path, encoding="utf-8") as f:
+            formatted = f.read()
+    return {"raw": raw, "formatted": formatted, "error": error}
+
+
+def main() -> int:
+    tree, input_path, output_path = sys.argv[1:4]
+    sys.path.insert(0, os.path.abspath(tree))
+    with open(input_path, encoding="utf-8") as f:
+        case = json.load(f)
+    result = asyncio.run(run(case))
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
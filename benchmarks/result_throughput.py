@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Пропускна здатність завантаження verifyData на стадії результатів.
+
+Піднімає ``verify_data_server`` у тому ж процесі, спрямовує на нього
+``VERIFY_DATA_BASE_URL`` (без кешу на диску) і проганяє ``load_server_data``
+для ``--codes`` кодів не більше ``--concurrency`` одночасно — так, як їх
+обробляв би один асинхронний воркер.
+
+    python benchmarks/result_throughput.py --codes 500 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+
+async def run(args) -> dict:
+    # клієнт читає налаштування з env під час імпорту
+    os.environ["VERIFY_DATA_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ["VERIFY_DATA_CACHE_ENABLED"] = "false"
+    os.environ["VERIFY_DATA_CONCURRENCY"] = str(args.concurrency)
+    os.environ["VERIFY_DATA_RATE"] = str(args.rate)
+    os.environ.setdefault("VERIFY_DATA_BACKOFF", "0.05")
+
+    from app.workers.async_runtime import release_http_session
+    from app.workers.result_worker import load_server_data
+    from benchmarks.verify_data_server import VerifyDataStub, start
+
+    stub = VerifyDataStub(
+        fixtures=None, journals=None, generate_days=args.days, pad_bytes=args.pad_bytes,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate, seed=0,
+    )
+    runner = await start(stub, port=args.port)
+    codes = [str(1000 + i) for i in range(args.codes)]
+    for code in codes:
+        stub.body(code)
+    latencies = []
+    failed = 0
+
+    async def one(code: str) -> None:
+        nonlocal failed
+        begin = time.perf_counter()
+        result = await load_server_data(code)
+        latencies.append((time.perf_counter() - begin) * 1000)
+        if isinstance(result, dict):
+            failed += 1
+
+    try:
+        begin = time.perf_counter()
+        await asyncio.gather(*(one(code) for code in codes))
+        elapsed = time.perf_counter() - begin
+    finally:
+        await release_http_session()
+        await runner.cleanup()
+
+    ms = np.array(latencies)
+    return {
+        "codes": len(codes),
+        "failed": failed,
+        "elapsed_s": round(elapsed, 3),
+        "codes_per_s": round(len(codes) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 2),
+            "p95": round(float(np.percentile(ms, 95)), 2),
+            "max": round(float(ms.max()), 2),
+        },
+        "server": stub.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=200)
+    parser.add_argument("--days", type=int, default=2500, help="Trade days per generated response")
+    parser.add_argument("--pad-bytes", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="Client requests per second (0 for no limit)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=8091)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки сигнального рушія на синтетичних даних.
+
+Міряє кожне правило B*/S* (еталонні функції з buy_signals / sell_signals),
+calculate_energy_indicators_last_16_days, векторизовані шляхи воркера
+(матриця купівлі, SellContext, енергія за всю історію) та повний прогін
+signals_for_the_period для кожного розміру історії.
+
+    python benchmarks/run_benchmarks.py --sizes 1000 5000 10000 --output bench.json
+    python benchmarks/run_benchmarks.py --compare baseline.json
+
+З --compare результати порівнюються з раніше збереженим файлом; код виходу 1,
+якщо будь-який замір (--metric) погіршився більше ніж на --threshold.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.workers.algo_func import buy_signals, sell_signals
+from app.workers.algo_func.buy_matrix import build_buy_matrix
+from app.workers.algo_func.energy_series import calculate_energy_series
+from app.workers.algo_func.get_code_energy import calculate_energy_indicators_last_16_days
+from app.workers.algo_func.indicators import IndicatorSet
+from app.workers.algo_func.profiling import condition_profiling
+from app.workers.algo_func.sell_evaluator import SellContext
+from benchmarks.synthetic import generate_pair, to_rows, to_series
+from benchmarks.worker_replay import replay_worker
+
+DEFAULT_SIZES = [1000, 5000, 10000]
+# заміри, коротші за цей поріг, порівнюються лише за абсолютною різницею
+MIN_DELTA_MS = 0.05
+
+BUY_RULES = {
+    "B1": lambda c: buy_signals.checkB1(c["bars"]),
+    "B3": lambda c: buy_signals.checkB3(c["bars"]),
+    "B8": lambda c: buy_signals.checkB8(c["bars"]),
+    "B9": lambda c: buy_signals.checkB9(c["bars"]),
+    "B10": lambda c: buy_signals.checkB10(c["bars"]),
+    "B11": lambda c: buy_signals.checkB11(c["bars"]),
+    "B12": lambda c: buy_signals.checkB12(c["bars"], c["trade_date"]),
+    "B13": lambda c: buy_signals.checkB13(c["bars"], c["spy"]),
+    "B18": lambda c: buy_signals.checkB18(c["bars"]),
+    "stopLoss": lambda c: buy_signals.calcS1Stop(c["bars"]),
+}
+
+SELL_RULES = {
+    "S1": lambda c: sell_signals.exit_by_stop_loss(c["bars"], c["stop_loss"]),
+    "S4": lambda c: sell_signals.s4(c["bars"], c["buy_date"], c["buy_price"]),
+    "S5": lambda c: sell_signals.s5(c["bars"], c["buy_date"], c["buy_price"], c["stop_loss"]),
+    "S6": lambda c: sell_signals.s6(c["bars"], c["buy_date"], c["buy_price"]),
+    "S7": lambda c: sell_signals.s7(c["bars"], c["buy_date"], c["buy_price"]),
+    "S8": lambda c: sell_signals.s8(c["bars"], c["buy_date"], c["buy_price"]),
+    "S9": lambda c: sell_signals.s9(c["trade_date"], c["bars"], c["spy"]),
+    "S10": lambda c: sell_signals.s10(c["bars"], c["buy_date"], c["buy_price"]),
+    "S11": lambda c: sell_signals.s11(c["bars"], c["buy_date"], c["buy_price"]),
+    "S12": lambda c: sell_signals.s12(c["bars"], c["buy_date"], c["buy_price"]),
+    "S13": lambda c: sell_signals.s13(c["bars"], c["buy_date"], c["buy_price"]),
+    "S14": lambda c: sell_signals.s14(c["bars"], c["spy"], c["buy_date"], c["buy_price"]),
+    "S15": lambda c: sell_signals.s15(c["bars"], c["buy_date"], c["buy_price"]),
+    "S16": lambda c: sell_signals.s16(c["bars"], c["buy_date"], c["buy_price"]),
+    "S17": lambda c: sell_signals.s17(c["bars"], c["buy_date"], c["buy_price"]),
+}
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # прогрів: ліниві кеші, імпорти, алокації
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _record(name: str, bars: int, samples: List[float]) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "bars": bars,
+        "repeat": len(samples),
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+    }
+
+
+def _case(size: int, seed: int) -> Dict[str, Any]:
+    bars, spy = generate_pair(size, seed)
+    trade_date = bars[-1].date
+    # позиція відкрита за 350 барів до кінця: S11/S13 проходять ранні виходи
+    entry = bars[max(size - 350, 0)]
+    return {
+        "bars": bars,
+        "spy": [b for b in spy if b.date <= trade_date],
+        "trade_date": trade_date,
+        "buy_date": entry.date,
+        "buy_price": entry.close,
+        "stop_loss": round(entry.close * 0.8, 4),
+    }
+
+
+def bench_rules(case: Dict[str, Any], size: int, repeat: int) -> List[Dict[str, Any]]:
+    records = []
+    for group, rules in (("buy", BUY_RULES), ("sell", SELL_RULES)):
+        for name, rule in rules.items():
+            records.append(_record(f"{group}/{name}", size, _time(lambda: rule(case), repeat)))
+    energy = lambda: calculate_energy_indicators_last_16_days(case["trade_date"], case["bars"], case["spy"])
+    records.append(_record("energy/last_16_days", size, _time(energy, repeat)))
+    return records
+
+
+def bench_fast_paths(case: Dict[str, Any], size: int, repeat: int) -> List[Dict[str, Any]]:
+    """Векторизовані шляхи воркера для всієї історії; умови — через профайлер."""
+    series = to_series(case["bars"])
+    spy = to_series(case["spy"])
+
+    records = [
+        _record("fast/buy_matrix", size, _time(lambda: build_buy_matrix(series, spy), repeat)),
+        _record("fast/sell_context", size, _time(lambda: SellContext(series, spy, IndicatorSet.from_bars(series)), repeat)),
+        _record("fast/energy_series", size, _time(lambda: calculate_energy_series(series, spy), repeat)),
+    ]
+
+    columns: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        with condition_profiling(True) as profiler:
+            build_buy_matrix(series, spy)
+        for name, samples in profiler.samples.items():
+            columns.setdefault(name, []).extend(ns / 1e6 for ns in samples)
+    records.extend(_record(f"fast/buy_matrix/{name}", size, samples) for name, samples in sorted(columns.items()))
+    return records
+
+
+def bench_replay(case: Dict[str, Any], size: int, repeat: int) -> List[Dict[str, Any]]:
+    """
+    Повний прогін signals_for_the_period від першого бару з достатньою історією.
+
+    Дані з БД підміняються синтетичними, CSV пишуться у тимчасову теку.
+    """
+    stock_rows = to_rows(case["bars"])
+    spy_rows = to_rows(case["spy"])
+
+    # енергія рахується лише з 2001 року, і потрібна історія для правил
+    first = next(i for i, b in enumerate(case["bars"]) if b.date >= "2001-01-01")
+    replay_from = case["bars"][min(first + 250, size - 1)].date
+
+    samples = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            samples.append(asyncio.run(replay_worker("BENCH", stock_rows, spy_rows, replay_from, tmp)))
+    return [_record("replay/signals_for_the_period", size, samples)]
+
+
+def run(sizes: List[int], repeat: int, seed: int, skip_replay: bool) -> Dict[str, Any]:
+    results = []
+    for size in sizes:
+        case = _case(size, seed)
+        results.extend(bench_rules(case, size, repeat))
+        results.extend(bench_fast_paths(case, size, repeat))
+        if not skip_replay:
+            results.extend(bench_replay(case, size, max(1, repeat // 2)))
+        print(f"{size} bars done", file=sys.stderr)
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeat": repeat,
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+            metric: str = "min_ms") -> List[Dict[str, Any]]:
+    """
+    Порівнює ``metric`` кожного заміру з базовим.
+
+    Регресія — ріст більше ніж на ``threshold`` (частка) і більше ніж на
+    MIN_DELTA_MS. За замовчуванням береться найкращий з повторів (min_ms):
+    він менше залежить від сусідніх процесів, ніж медіана.
+    """
+    base = {(r["name"], r["bars"]): r for r in baseline["results"]}
+    rows = []
+    for record in current["results"]:
+        old = base.get((record["name"], record["bars"]))
+        if old is None:
+            continue
+        ratio = record[metric] / old[metric] if old[metric] > 0 else float("inf")
+        rows.append({
+            "name": record["name"],
+            "bars": record["bars"],
+            "baseline_ms": old[metric],
+            "current_ms": record[metric],
+            "ratio": ratio,
+            "regression": ratio > 1 + threshold and record[metric] - old[metric] > MIN_DELTA_MS,
+        })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-replay", action="store_true")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON file written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--metric", choices=["min_ms", "median_ms"], default="min_ms")
+    args = parser.parse_args(argv)
+
+    current = run(args.sizes, args.repeat, args.seed, args.skip_replay)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+
+    if not args.compare:
+        for r in current["results"]:
+            print(f"{r['name']:<40} {r['bars']:>6} {r['median_ms']:>12.3f} ms")
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold, args.metric)
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        print(f"{row['name']:<40} {row['bars']:>6} {row['baseline_ms']:>12.3f} {row['current_ms']:>12.3f} "
+              f"{row['ratio']:>7.2f}x {flag}")
+    regressions = [r for r in rows if r["regression"]]
+    print(f"{len(regressions)} regression(s) out of {len(rows)} measurements", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
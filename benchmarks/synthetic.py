@@ -0,0 +1,115 @@
+"""
+Deterministic synthetic OHLCV histories for benchmarks and equivalence runs.
+
+The same (length, seed, options) always produce the same bars, so timings
+and outputs are comparable between runs and machines.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.workers.algo_func.ohlcv_series import OHLCV, OHLCVSeries
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    """
+    ``end`` is the last trade day; the calendar is built backwards from it.
+    ``holiday_rate`` drops single weekdays and ``halt_rate`` starts a
+    suspension of ``halt_days`` trade days, which leaves gaps between bars.
+    Volatility switches every ``regime_length`` bars to ``volatility``
+    times one of ``regime_multipliers``. Histories with the same
+    ``calendar_seed`` (``seed`` by default) and ``end`` share their trade
+    days: a longer one only reaches further back.
+    """
+    length: int = 1000
+    seed: int = 0
+    calendar_seed: Optional[int] = None
+    end: str = "2025-10-16"
+    start_price: float = 10.0
+    drift: float = 0.0003
+    volatility: float = 0.02
+    regime_length: int = 250
+    regime_multipliers: Tuple[float, ...] = (0.5, 1.0, 2.0, 3.0)
+    holiday_rate: float = 0.02
+    halt_rate: float = 0.0
+    halt_days: int = 10
+    tick: float = 0.01
+
+
+def _calendar(config: SyntheticConfig, rng: np.random.Generator) -> List[str]:
+    days: List[str] = []
+    day = date.fromisoformat(config.end)
+    while len(days) < config.length:
+        if day.weekday() < 5 and rng.random() >= config.holiday_rate:
+            days.append(day.isoformat())
+            if config.halt_rate and rng.random() < config.halt_rate:
+                day -= timedelta(days=config.halt_days * 7 // 5)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def generate_bars(config: SyntheticConfig) -> List[OHLCV]:
+    """Random-walk bars with regime-switching volatility, rounded to ``tick``."""
+    calendar_seed = config.seed if config.calendar_seed is None else config.calendar_seed
+    days = _calendar(config, np.random.default_rng([calendar_seed, 0]))
+    rng = np.random.default_rng([config.seed, 1])
+    n = config.length
+
+    regimes = rng.choice(config.regime_multipliers, size=n // config.regime_length + 1)
+    vol = config.volatility * regimes[np.arange(n) // config.regime_length]
+    gap = rng.normal(0, vol / 3)
+    move = rng.normal(config.drift, vol)
+    wick_up = np.abs(rng.normal(0, vol / 2))
+    wick_down = np.abs(rng.normal(0, vol / 2))
+    flat_high = rng.random(n) < 0.05
+    volume = rng.integers(100_000, 10_000_000, size=n)
+
+    digits = max(0, int(round(-np.log10(config.tick))))
+    bars: List[OHLCV] = []
+    close = config.start_price
+    # plain Python floats, as the database rows are: rounding rules differ for numpy scalars
+    gap, move, wick_up, wick_down = gap.tolist(), move.tolist(), wick_up.tolist(), wick_down.tolist()
+    for i in range(n):
+        open_ = round(max(config.tick, close * (1 + gap[i])), digits)
+        close = round(max(config.tick * 5, open_ * (1 + move[i])), digits)
+        high = max(open_, close) if flat_high[i] else round(max(open_, close) * (1 + wick_up[i]), digits)
+        low = round(max(config.tick, min(open_, close) * (1 - wick_down[i])), digits)
+        bars.append(OHLCV(days[i], open_, high, low, close, int(volume[i])))
+    return bars
+
+
+def generate_pair(length: int, seed: int = 0, index_gap_rate: float = 0.0,
+                  **options: Any) -> Tuple[List[OHLCV], List[OHLCV]]:
+    """
+    A stock and a calmer 2800-like index.
+
+    The index trades on the stock's days plus 100 earlier ones; with
+    ``index_gap_rate`` a share of its bars is dropped so the two series
+    are not perfectly aligned.
+    """
+    stock = generate_bars(SyntheticConfig(length=length, seed=seed, **options))
+    index_options = dict(options)
+    index_options["volatility"] = index_options.get("volatility", 0.02) * 0.6
+    index_options.setdefault("start_price", 20.0)
+    index = generate_bars(SyntheticConfig(
+        length=length + 100, seed=seed + 1_000_003, calendar_seed=seed, **index_options,
+    ))
+    if index_gap_rate:
+        keep = np.random.default_rng([seed, 2]).random(len(index)) >= index_gap_rate
+        index = [bar for bar, k in zip(index, keep) if k]
+    return stock, index
+
+
+def to_rows(bars: Sequence[OHLCV]) -> List[Dict[str, Any]]:
+    """Bars in the dict shape ``get_stock_data_from_db`` returns."""
+    return [
+        {"date": b.date, "open": b.open, "high": b.high, "low": b.low, "close": b.close, "volume": b.volume}
+        for b in bars
+    ]
+
+
+def to_series(bars: Sequence[OHLCV]) -> OHLCVSeries:
+    return OHLCVSeries.from_bars(bars)
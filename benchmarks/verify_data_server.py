@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Локальна заміна verifyData API для навантажувальних і інтеграційних прогонів стадії результатів.
+
+Відповідь для коду береться з першого джерела, де вона є:
+
+1. записана відповідь ``{fixtures}/{code}.json`` (за замовчуванням —
+   кеш verifyData ``data/verify_data``, тобто те, що API вже віддавало);
+2. журнал сигналів алгоритму ``{journals}/{code}.csv``, перекладений у
+   рядки verifyData (дія дня — ``next_open_action`` попереднього рядка);
+3. детермінована синтетична історія (``--generate``): той самий код
+   завжди дає ті самі угоди.
+
+Затримка, частка помилок і розмір відповіді налаштовуються:
+
+    python benchmarks/verify_data_server.py --port 8090 --latency-ms 80 --jitter-ms 40 --error-rate 0.05
+    VERIFY_DATA_BASE_URL=http://localhost:8090 VERIFY_DATA_CACHE_POLICY=never python workers/start_result_worker.py
+
+``GET /stats`` — кількість запитів, відданих помилок, рядків і байтів.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import zlib
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.verify_data_client import VERIFY_DATA_PATH
+
+DEFAULT_FIXTURES = os.getenv("VERIFY_DATA_CACHE_DIR", "data/verify_data")
+DEFAULT_JOURNALS = "data"
+
+
+def _iso(day: Optional[str]) -> Optional[str]:
+    return f"{day}T00:00:00.000Z" if day and day != "0" else None
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number else None
+
+
+def journal_to_rows(journal: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Рядки журналу алгоритму (data/{code}.csv) у форматі днів verifyData."""
+    rows = []
+    previous: Optional[Dict[str, str]] = None
+    for row in journal:
+        rows.append({
+            "code": row.get("code"),
+            "tradeday": _iso(row.get("tradeday")),
+            "prev_tradeday": _iso(previous.get("tradeday")) if previous else None,
+            "today_open_action": previous.get("next_open_action", "N") if previous else "N",
+            "position_status": row.get("position_status"),
+            "entry_date": _iso(row.get("entry_date")),
+            "entry_price": _number(row.get("entry_price")),
+            "exit_price": _number(row.get("exit_price")),
+            "close": _number(row.get("close")),
+            **{name: row.get(name) for name in ("E1", "E2", "E3", "E4", "E5", "exit1") if name in row},
+        })
+        previous = row
+    return rows
+
+
+def generate_rows(code: str, days: int, end: str = "2025-10-16", trade_rate: float = 0.02,
+                  hold_days: int = 12) -> List[Dict[str, Any]]:
+    """
+    Синтетична історія ``days`` торгових днів (будні) до ``end``: угоди
+    відкриваються з імовірністю ``trade_rate`` на день і тримаються в
+    середньому ``hold_days`` днів. Зерно — від коду.
+    """
+    rng = random.Random(zlib.crc32(code.encode()))
+    trade_days: List[date] = []
+    day = date.fromisoformat(end)
+    while len(trade_days) < days:
+        if day.weekday() < 5:
+            trade_days.append(day)
+        day -= timedelta(days=1)
+    trade_days.reverse()
+
+    journal = []
+    price = 10.0
+    position, entry_date, entry_price, action = "F", "0", 0.0, "N"
+    for d in trade_days:
+        price = max(0.01, round(price * (1 + rng.gauss(0.0003, 0.02)), 2))
+        exit_price = 0.0
+        if action == "B":
+            position, entry_date, entry_price = "I", d.isoformat(), price
+        elif action == "S":
+            position, entry_date, exit_price = "F", "0", price
+        if position == "F":
+            action = "B" if rng.random() < trade_rate else "N"
+        else:
+            action = "S" if rng.random() < 1 / hold_days else "N"
+        journal.append({
+            "code": code, "tradeday": d.isoformat(), "position_status": position, "next_open_action": action,
+            "close": str(price), "entry_price": str(entry_price if position == "I" else price),
+            "entry_date": entry_date, "exit_price": str(exit_price),
+        })
+    return journal_to_rows(journal)
+
+
+class VerifyDataStub:
+
+    def __init__(self, fixtures: Optional[str] = DEFAULT_FIXTURES, journals: Optional[str] = DEFAULT_JOURNALS,
+                 generate: bool = True, days: int = 0, generate_days: int = 2500, pad_bytes: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, seed: Optional[int] = None):
+        self.fixtures = fixtures
+        self.journals = journals
+        self.generate = generate
+        self.days = days
+        self.generate_days = generate_days
+        self.pad = "x" * pad_bytes
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self._bodies: Dict[str, Optional[bytes]] = {}
+        self.stats = {"requests": 0, "errors": 0, "not_found": 0, "rows": 0, "bytes": 0}
+
+    def _load_rows(self, code: str) -> Optional[List[Dict[str, Any]]]:
+        if self.fixtures:
+            try:
+                with open(os.path.join(self.fixtures, f"{code}.json"), encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        if self.journals:
+            try:
+                with open(os.path.join(self.journals, f"{code}.csv"), newline="", encoding="utf-8") as f:
+                    journal = list(csv.DictReader(f))
+                if journal and "next_open_action" in journal[0]:
+                    return journal_to_rows(journal)
+            except OSError:
+                pass
+        if self.generate:
+            return generate_rows(code, self.generate_days)
+        return None
+
+    def body(self, code: str) -> Optional[bytes]:
+        """Тіло відповіді коду; збирається один раз, щоб сервер не міряв сам себе."""
+        if code not in self._bodies:
+            rows = self._load_rows(code)
+            if rows is not None:
+                if self.days:
+                    rows = rows[-self.days:]
+                if self.pad:
+                    rows = [dict(row, padding=self.pad) for row in rows]
+                self._bodies[code] = json.dumps(rows).encode("utf-8")
+                self.stats["rows"] += len(rows)
+            else:
+                self._bodies[code] = None
+        return self._bodies[code]
+
+    async def verify_data(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        delay = self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.Response(status=self.error_status, text="stand-in error")
+
+        body = self.body(request.query.get("Code", ""))
+        if body is None:
+            self.stats["not_found"] += 1
+            return web.json_response([])
+        self.stats["bytes"] += len(body)
+        return web.Response(body=body, content_type="application/json")
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(VERIFY_DATA_PATH, self.verify_data)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+async def start(stub: VerifyDataStub, host: str = "127.0.0.1", port: int = 8090) -> web.AppRunner:
+    """Запускає заміну в поточному циклі подій (для бенчмарків); зупинка — ``await runner.cleanup()``."""
+    runner = web.AppRunner(stub.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Directory of recorded {code}.json responses")
+    parser.add_argument("--journals", default=DEFAULT_JOURNALS, help="Directory of algorithm journals {code}.csv")
+    parser.add_argument("--no-generate", action="store_true", help="Unknown codes get an empty response")
+    parser.add_argument("--generate-days", type=int, default=2500, help="Trade days of generated histories")
+    parser.add_argument("--days", type=int, default=0, help="Serve only the last N days of every response")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="Extra bytes added to every day")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    stub = VerifyDataStub(
+        fixtures=args.fixtures or None, journals=args.journals or None, generate=not args.no_generate,
+        days=args.days, generate_days=args.generate_days, pad_bytes=args.pad_bytes,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        error_status=args.error_status, seed=args.seed,
+    )
+    web.run_app(stub.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
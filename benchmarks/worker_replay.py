@@ -0,0 +1,53 @@
+"""
+Run the real ``signals_for_the_period`` over in-memory OHLCV rows.
+
+The stock data source is swapped for the given rows and the CSVs are written
+under ``workdir`` (``FileService`` writes to ``./data``), so nothing
+outside that directory is touched.
+"""
+import contextlib
+import io
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import app.workers.algorithm_worker as worker
+from app.workers.algo_func.ohlcv_series import OHLCVSeries
+
+INDEX_CODE = "2800"
+
+
+@contextlib.contextmanager
+def rows_instead_of_db(stock_rows: List[Dict[str, Any]], index_rows: List[Dict[str, Any]],
+                       workdir: str) -> Iterator[None]:
+    """Serve the worker's stock histories from memory and run with ``workdir`` as cwd."""
+    stock = OHLCVSeries.from_rows(stock_rows)
+    index = OHLCVSeries.from_rows(index_rows)
+
+    async def from_memory(requested: str, end_date: Optional[str] = None):
+        return index if requested == INDEX_CODE else stock
+
+    original = worker.get_stock_series
+    cwd = os.getcwd()
+    worker.get_stock_series = from_memory
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        os.chdir(cwd)
+        worker.get_stock_series = original
+
+
+async def replay_worker(code: str, stock_rows: List[Dict[str, Any]], index_rows: List[Dict[str, Any]],
+                        replay_from: str, workdir: str, trade_date: str = "2025-10-16") -> float:
+    """
+    Seed ``data/{code}.csv`` as ``process_algorithm_task`` does, replay, return the replay time in ms.
+
+    The raw signal rows are left in ``{workdir}/data/{code}.csv``.
+    """
+    with rows_instead_of_db(stock_rows, index_rows, workdir):
+        await worker.get_data_and_save_to_csv(code, replay_from)
+        start = time.perf_counter()
+        await worker.signals_for_the_period(code, trade_date)
+        return (time.perf_counter() - start) * 1000
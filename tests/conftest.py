@@ -0,0 +1,27 @@
+import fakeredis
+import pytest
+
+
+class FakeRedis(fakeredis.FakeStrictRedis):
+    """fakeredis не реалізує INFO, а RQ читає з нього лише версію сервера."""
+
+    def info(self, section=None, *args, **kwargs):
+        return {"redis_version": "7.2.0"}
+
+
+@pytest.fixture
+def redis_conn(monkeypatch):
+    """Порожній fake Redis замість ``queue_config.redis_conn`` у чергах і сервісах."""
+    from app.config import queue_config
+    from app.services import queue_service
+
+    conn = FakeRedis()
+    for queue in (
+        queue_config.algorithm_calculation_queue, queue_config.algorithm_priority_queue,
+        queue_config.result_processing_queue, queue_config.ohlcv_prefetch_queue, queue_config.file_write_queue,
+    ):
+        monkeypatch.setattr(queue, "connection", conn)
+        monkeypatch.setattr(queue, "redis_server_version", None)
+    monkeypatch.setattr(queue_config, "redis_conn", conn)
+    monkeypatch.setattr(queue_service, "redis_conn", conn)
+    return conn
@@ -0,0 +1,243 @@
+"""
+Код стадії результатів до переписування на TradeSignal (pydantic-моделі, datetime, list.index)
+
+Еталон для тестів: нова реалізація має давати ті самі підсумки.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.models.algorithm_models import UnifiedTradeSignal
+
+
+def reconcile(unified_api_data, unified_algo_data, trade_days):
+    """Цикл зіставлення з result_worker до індексів (list.pop, trade_days.index), без логування."""
+    unified_algo_data = list(unified_algo_data)
+    match_count = 0
+    deviations = 0
+    deviations_data = []
+    unmatched_api_data = []
+
+    for api_item in unified_api_data:
+        found_match = False
+        i = 0
+        while i < len(unified_algo_data):
+            csv_item = unified_algo_data[i]
+            exact_buy = api_item.buy_signal == csv_item.buy_signal
+            except_sell = api_item.stop_signal == csv_item.stop_signal
+
+            if (exact_buy and except_sell):
+                match_count += 2
+                unified_algo_data.pop(i)
+                found_match = True
+                break
+
+            api_buy_index = None
+            csv_buy_index = None
+            if api_item.buy_signal:
+                try:
+                    api_buy_index = trade_days.index(api_item.buy_signal)
+                except ValueError:
+                    pass
+            if csv_item.buy_signal:
+                try:
+                    csv_buy_index = trade_days.index(csv_item.buy_signal)
+                except ValueError:
+                    pass
+            if api_buy_index is not None and csv_buy_index is not None:
+                buy_match = abs(api_buy_index - csv_buy_index) <= 2
+            else:
+                buy_match = False
+
+            api_stop_index = None
+            csv_stop_index = None
+            if (api_item.stop_signal and csv_item.stop_signal and
+                    api_item.stop_signal != "Open position" and csv_item.stop_signal != "Open position"):
+                try:
+                    if isinstance(api_item.stop_signal, datetime):
+                        api_stop_index = trade_days.index(api_item.stop_signal)
+                except ValueError:
+                    pass
+                try:
+                    if isinstance(csv_item.stop_signal, datetime):
+                        csv_stop_index = trade_days.index(csv_item.stop_signal)
+                except ValueError:
+                    pass
+                if api_stop_index is not None and csv_stop_index is not None:
+                    stop_match = abs(api_stop_index - csv_stop_index) <= 2
+                else:
+                    stop_match = False
+            elif api_item.stop_signal == csv_item.stop_signal:
+                stop_match = True
+            else:
+                stop_match = False
+
+            if buy_match and not exact_buy and stop_match and not except_sell:
+                deviations += 2
+                deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
+                deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
+                unified_algo_data.pop(i)
+                found_match = True
+                break
+
+            if (exact_buy or except_sell):
+                match_count += 1
+
+            if (buy_match and not exact_buy or stop_match and not except_sell):
+                deviations += 1
+                if stop_match and not except_sell:
+                    deviations_data.append(f'Sell: Algo - {csv_item.stop_signal} / API - {api_item.stop_signal};')
+                if buy_match and not exact_buy:
+                    deviations_data.append(f'Buy: Algo - {csv_item.buy_signal} / API - {api_item.buy_signal};')
+            if ((exact_buy and stop_match) or (except_sell and buy_match)):
+                unified_algo_data.pop(i)
+                found_match = True
+                break
+
+            i += 1
+
+        if not found_match:
+            unmatched_api_data.append(f'Buy:{api_item.buy_signal}, Sell:{api_item.stop_signal};')
+
+    return match_count, deviations, deviations_data, unmatched_api_data, unified_algo_data
+
+
+START_FROM = '2019'
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None) if value else None
+
+
+def _to_float_or_zero(value) -> float:
+    try:
+        if value in (None, "", "Open position"):
+            return 0.0
+        return float(value)
+    except Exception:
+        return 0.0
+
+
+def _to_float_or_open(value):
+    try:
+        if value in (None, "", "Open position"):
+            return "Open position"
+        return float(value)
+    except Exception:
+        return "Open position"
+
+
+def load_api_signals(result_data) -> Tuple[List[UnifiedTradeSignal], List[Optional[datetime]]]:
+    """Розбір відповіді verifyData з load_server_data; угода, яку не вдалося зібрати, пропускається."""
+    if not result_data:
+        return [], []
+    trade_days = []
+    response_data = []
+    current_position = None
+
+    for day in result_data:
+        trade_day = day.get("tradeday") or ""
+        trade_days.append(_parse_iso(trade_day))
+        entry_date = day.get("entry_date") or ""
+        date_to_check = trade_day if trade_day else entry_date
+        if not (date_to_check and date_to_check[:4] >= START_FROM):
+            continue
+
+        today_action = day.get("today_open_action")
+        pos_status = day.get("position_status")
+        if today_action == "B" and pos_status == "I":
+            current_position = {
+                "buy_signal": day.get("entry_date"),
+                "entry_price": day.get("entry_price"),
+                "day_before_buy": day.get("prev_tradeday"),
+            }
+        elif today_action == "S" and pos_status == "F":
+            try:
+                response_data.append(UnifiedTradeSignal(
+                    buy_signal=_parse_iso(current_position.get("buy_signal")) if current_position else None,
+                    stop_signal=_parse_iso(day.get("tradeday")) or "Open position",
+                    entry_price=_to_float_or_zero(current_position.get("entry_price")) if current_position else 0.0,
+                    exit_price=_to_float_or_open(day.get("exit_price")),
+                    day_before_buy=_parse_iso(current_position.get("day_before_buy")) if current_position else None,
+                    day_before_sell=_parse_iso(day.get("prev_tradeday")),
+                    gain_lose=None,
+                    source="api",
+                ))
+            except Exception:
+                pass
+            current_position = None
+
+    if current_position:
+        try:
+            response_data.append(UnifiedTradeSignal(
+                buy_signal=_parse_iso(current_position.get("buy_signal")),
+                stop_signal="Open position",
+                entry_price=_to_float_or_zero(current_position.get("entry_price")),
+                exit_price="Open position",
+                day_before_buy=_parse_iso(current_position.get("day_before_buy")),
+                day_before_sell=None,
+                gain_lose=None,
+                source="api",
+            ))
+        except Exception:
+            pass
+
+    return response_data, trade_days
+
+
+def convert_csv_to_unified(csv_row: dict) -> UnifiedTradeSignal:
+    """Рядок CSV алгоритму в UnifiedTradeSignal; помилка піднімається, рядок пропускає викликач."""
+    buy_signal_str = csv_row.get('Buy Signal', '')
+    stop_signal_str = csv_row.get('Stop Signal', '')
+    buy_signal = datetime.strptime(buy_signal_str, '%Y-%m-%d') if buy_signal_str else None
+    if stop_signal_str == "Open position":
+        stop_signal = "Open position"
+    else:
+        try:
+            stop_signal = datetime.strptime(stop_signal_str, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            try:
+                stop_signal = datetime.strptime(stop_signal_str, '%Y-%m-%d')
+            except ValueError:
+                stop_signal = "Open position"
+
+    entry_price = float(csv_row.get('Entry price', '0'))
+    exit_price_str = csv_row.get('Exit price', '0')
+    exit_price = float(exit_price_str) if exit_price_str != "Open position" else "Open position"
+    gain_lose_str = csv_row.get('Gain/Lose', '')
+    gain_lose = float(gain_lose_str) if gain_lose_str else None
+
+    return UnifiedTradeSignal(
+        buy_signal=buy_signal, stop_signal=stop_signal, entry_price=entry_price, exit_price=exit_price,
+        day_before_buy=None, day_before_sell=None, gain_lose=gain_lose, source="csv",
+    )
+
+
+def result_row(stock_code: str, result_data, csv_rows: List[dict]) -> dict:
+    """Рядок results.csv з process_result_task (без timestamp)."""
+    unified_api_data, trade_days = load_api_signals(result_data)
+    unified_algo_data = []
+    for csv_row in csv_rows:
+        try:
+            unified_algo_data.append(convert_csv_to_unified(csv_row))
+        except Exception:
+            pass
+
+    match_count, deviations, deviations_data, unmatched_api_data, unified_algo_data = reconcile(
+        unified_api_data, unified_algo_data, trade_days
+    )
+    total_api_count = len(unified_api_data) * 2
+    total_match_percent = round(((match_count + deviations) / total_api_count * 100), 2) if total_api_count > 0 else 0
+    return {
+        'stock_code': stock_code,
+        'total_api': f'{total_api_count}',
+        'total_algo': f'{len(csv_rows) * 2}',
+        'total_exact': f'{match_count}',
+        'total_unmatched': f'{total_api_count - match_count - deviations}',
+        'with_deviation': f'{deviations}',
+        'deviations_data': ' | '.join(deviations_data) if deviations_data else '',
+        'unmatched_api': f'{len(unmatched_api_data)}',
+        'unmatched_api_data': ' | '.join(unmatched_api_data) if unmatched_api_data else '',
+        'unmatched_algo': f'{len(unified_algo_data)}',
+        'unmatched_algo_data': ' | '.join([f'Buy:{item.buy_signal}, Sell:{item.stop_signal};' for item in unified_algo_data]) if unified_algo_data else '',
+        'match_percent': f'{total_match_percent}',
+    }
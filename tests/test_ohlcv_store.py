@@ -0,0 +1,65 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from app.workers.algo_func import ohlcv_store
+from app.workers.algo_func.ohlcv_store import OHLCVStore
+from benchmarks.synthetic import SyntheticConfig, generate_bars, to_series
+
+
+def _series(length, seed):
+    return to_series(generate_bars(SyntheticConfig(length=length, seed=seed)))
+
+
+def test_interleaved_writers_of_one_code(tmp_path, monkeypatch):
+    store = OHLCVStore(root=str(tmp_path))
+    first, second = _series(300, 0), _series(320, 1)
+    paused, resume = threading.Event(), threading.Event()
+    save = np.save
+
+    def slow_save(path, array):
+        # перший записувач зупиняється посеред колонок, поки стартує другий
+        if threading.current_thread().name == "first" and not paused.is_set():
+            paused.set()
+            resume.wait(5)
+        save(path, array)
+
+    monkeypatch.setattr(ohlcv_store.np, "save", slow_save)
+    errors = []
+
+    def write(series):
+        try:
+            store.write("2800", series, "full")
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=write, args=(first,), name="first"),
+               threading.Thread(target=write, args=(second,), name="second")]
+    writers[0].start()
+    assert paused.wait(5)
+    writers[1].start()
+    time.sleep(0.2)
+    # другий чекає на lock і не чіпає версію, яку ще пише перший
+    assert writers[1].is_alive()
+    resume.set()
+    for writer in writers:
+        writer.join(5)
+
+    assert errors == []
+    meta = store.read_meta("2800")
+    assert meta is not None and meta["rows"] == 320
+    np.testing.assert_array_equal(store.read("2800", meta).close, second.close)
+    assert [entry for entry in os.listdir(tmp_path / "2800") if entry.startswith("v")] == [meta["version"]]
+
+
+def test_touch_of_replaced_version_is_skipped(tmp_path):
+    store = OHLCVStore(root=str(tmp_path))
+    old = store.write("700", _series(200, 0), "full")
+    new = store.write("700", _series(210, 0), "incremental")
+
+    store.touch("700", old)
+
+    assert store.read_meta("700")["version"] == new["version"]
+    assert not (tmp_path / "700" / old["version"]).exists()
@@ -0,0 +1,81 @@
+from rq.job import Job, JobStatus
+
+from app.config.queue_config import (
+    ALGORITHM_WORKER_TIMEOUT, algorithm_calculation_queue, algorithm_priority_queue, ohlcv_prefetch_queue,
+)
+from app.services.queue_service import ALGORITHM_RUN_TTL, QueueService
+
+
+def _dependents(redis_conn, job_id):
+    return {member.decode() for member in redis_conn.smembers(Job.key_for(job_id) + b":dependents")}
+
+
+def test_enqueue_run_defers_jobs_behind_prefetch(redis_conn):
+    run = QueueService.enqueue_run(["700", "5", "1299"], costs={"700": 30.0, "5": 10.0, "1299": 20.0})
+
+    assert ohlcv_prefetch_queue.job_ids == [run["prefetch_task_id"]]
+    assert run["task_ids"] == [f"{run['run_id']}-{n}" for n in range(3)]
+    # нічого не стоїть у черзі алгоритмів, поки prefetch не завершився
+    assert algorithm_calculation_queue.job_ids == []
+    assert _dependents(redis_conn, run["prefetch_task_id"]) == set(run["task_ids"])
+    assert set(algorithm_calculation_queue.deferred_job_registry.get_job_ids()) == set(run["task_ids"])
+
+    for task_id, code, cost in zip(run["task_ids"], ["700", "5", "1299"], [30.0, 10.0, 20.0]):
+        job = Job.fetch(task_id, connection=redis_conn)
+        assert job.get_status() == JobStatus.DEFERRED
+        assert job.args[0]["stock"] == code
+        assert job.meta == {"run_id": run["run_id"], "estimated_cost_ms": cost}
+        assert redis_conn.smembers(job.dependencies_key) == {run["prefetch_task_id"].encode()}
+        assert job.allow_dependency_failures
+
+    run_key = QueueService.run_key(run["run_id"])
+    assert redis_conn.hget(run_key, "jobs") == b"3"
+    assert [i.decode() for i in redis_conn.lrange(f"{run_key}:jobs", 0, -1)] == run["task_ids"]
+    assert 0 < redis_conn.ttl(run_key) <= ALGORITHM_RUN_TTL
+    assert 0 < redis_conn.ttl(f"{run_key}:jobs") <= ALGORITHM_RUN_TTL
+
+
+def test_enqueue_run_batches_and_priority_queue(redis_conn):
+    run = QueueService.enqueue_run(["700", "5", "1299"], batches=[["700"], ["5", "1299"]], priority={"700"})
+
+    first, second = (Job.fetch(task_id, connection=redis_conn) for task_id in run["task_ids"])
+    assert first.origin == algorithm_priority_queue.name
+    assert second.origin == algorithm_calculation_queue.name
+    assert second.args[0]["stocks"] == ["5", "1299"]
+    assert second.timeout == ALGORITHM_WORKER_TIMEOUT * 2
+    assert algorithm_priority_queue.deferred_job_registry.get_job_ids() == [first.id]
+    assert algorithm_calculation_queue.deferred_job_registry.get_job_ids() == [second.id]
+
+
+def test_rq_releases_run_when_prefetch_finishes(redis_conn):
+    run = QueueService.enqueue_run(["700", "5"])
+    prefetch = Job.fetch(run["prefetch_task_id"], connection=redis_conn)
+
+    # те саме робить Worker.handle_job_success для задачі попереднього завантаження
+    ohlcv_prefetch_queue.enqueue_dependents(prefetch)
+
+    assert sorted(algorithm_calculation_queue.job_ids) == sorted(run["task_ids"])
+    assert algorithm_calculation_queue.deferred_job_registry.get_job_ids() == []
+    assert QueueService.get_run_status(run["run_id"])["job_statuses"] == {"queued": 2}
+
+
+def test_release_dependents_by_cost_enqueues_longest_first(redis_conn):
+    costs = {"1": 5.0, "2": 50.0, "3": 20.0, "4": 35.0}
+    run = QueueService.enqueue_run(list(costs), costs=costs)
+
+    released = QueueService.release_dependents_by_cost(run["prefetch_task_id"])
+
+    assert released == 4
+    queued = [Job.fetch(job_id, connection=redis_conn).args[0]["stock"] for job_id in algorithm_calculation_queue.job_ids]
+    assert queued == ["2", "4", "3", "1"]
+    assert _dependents(redis_conn, run["prefetch_task_id"]) == set()
+    assert algorithm_calculation_queue.deferred_job_registry.get_job_ids() == []
+    assert all(Job.fetch(i, connection=redis_conn).get_status() == JobStatus.QUEUED for i in run["task_ids"])
+
+    # RQ, завершуючи prefetch, уже нічого не поставить удруге
+    ohlcv_prefetch_queue.enqueue_dependents(Job.fetch(run["prefetch_task_id"], connection=redis_conn))
+    assert len(algorithm_calculation_queue.job_ids) == 4
+
+
+def test_get_run_status_of_unknown_run(redis_conn):
+    assert QueueService.get_run_status("missing") is None
@@ -0,0 +1,162 @@
+import asyncio
+import copy
+import csv
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from app.services.queue_service import QueueService
+from app.workers import result_worker
+from benchmarks.verify_data_server import generate_rows
+from tests.reference import result_row
+
+
+def _csv_rows(rng, api_rows):
+    """Угоди алгоритму на днях відповіді: обидва формати Stop Signal, відкриті позиції, зіпсовані рядки."""
+    days = [row["tradeday"][:10] for row in api_rows if row["tradeday"]]
+    rows = []
+    for _ in range(rng.randint(0, 30)):
+        i = rng.randrange(len(days))
+        j = min(len(days) - 1, i + rng.randint(1, 40))
+        buy = days[i]
+        stop = rng.choice([f"{days[j]} 00:00:00", days[j], "Open position", f"{days[min(len(days) - 1, j + 1)]} 00:00:00"])
+        if rng.random() < 0.03:
+            buy = rng.choice(["", "2020-1-8", "bad", "2020-02-30"])
+        if rng.random() < 0.03:
+            stop = rng.choice(["", "junk", "2021-13-01"])
+        row = {
+            "Buy Signal": buy, "Stop Signal": stop, "Entry price": str(rng.choice([1.5, "2"])),
+            "Exit price": rng.choice(["1.1", "Open position"]), "Gain/Lose": rng.choice(["", "0.5"]),
+        }
+        if rng.random() < 0.02:
+            row["Entry price"] = ""
+        if rng.random() < 0.02:
+            row["Stop Signal"] = None
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture
+def run_task(monkeypatch):
+    """process_result_task на заданих відповіді verifyData і CSV; повертає рядок results.csv без timestamp."""
+    source = {}
+    written = []
+
+    async def fetch_signals(stock_code):
+        return copy.deepcopy(source["api"])
+
+    async def read_data_from_csv(stock_code):
+        return copy.deepcopy(source["csv"])
+
+    async def release_http_session():
+        pass
+
+    monkeypatch.setattr(result_worker, "fetch_signals", fetch_signals)
+    monkeypatch.setattr(result_worker.file_service, "read_data_from_csv", read_data_from_csv)
+    monkeypatch.setattr(result_worker, "release_http_session", release_http_session)
+    monkeypatch.setattr(QueueService, "add_to_file_write_queue",
+                        staticmethod(lambda stock_code, results, field_names: written.append(results)))
+
+    def run(stock_code, api_rows, csv_rows):
+        source.update(api=api_rows, csv=csv_rows)
+        asyncio.run(result_worker.process_result_task({"stock_code": stock_code, "task_id": "t"}))
+        row = dict(written.pop()[0])
+        row.pop("timestamp")
+        return row
+
+    return run
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_pre_trade_signal_pipeline(run_task, seed):
+    rng = random.Random(seed)
+    for n in range(100):
+        code = str(seed * 100 + n)
+        api_rows = generate_rows(code, rng.randint(50, 2500), trade_rate=0.05)
+        if rng.random() < 0.1:
+            api_rows[-1]["tradeday"] = None
+        csv_rows = _csv_rows(rng, api_rows)
+
+        assert run_task(code, api_rows, csv_rows) == result_row(code, api_rows, csv_rows), code
+
+
+def test_empty_api_response(run_task):
+    csv_rows = [{"Buy Signal": "2024-01-02", "Stop Signal": "Open position", "Entry price": "1", "Exit price": "Open position"}]
+
+    assert run_task("5", [], csv_rows) == result_row("5", [], csv_rows)
+
+
+STAND_IN_RUN = """
+import asyncio, json, os, sys
+from urllib.parse import urlparse
+from aiohttp import web
+from benchmarks.verify_data_server import VerifyDataStub, start
+
+
+class FirstRequestFails(VerifyDataStub):
+    async def verify_data(self, request):
+        if not self.stats["requests"]:
+            self.stats["requests"] += 1
+            self.stats["errors"] += 1
+            return web.Response(status=503, text="stand-in error")
+        return await super().verify_data(request)
+
+
+async def main(code):
+    stub = FirstRequestFails(fixtures=None, journals=None)
+    runner = await start(stub, port=urlparse(os.environ["VERIFY_DATA_BASE_URL"]).port)
+    from app.services.queue_service import QueueService
+    from app.workers.result_worker import process_result_task
+
+    written = []
+    QueueService.add_to_file_write_queue = staticmethod(lambda stock_code, results, field_names: written.append(results))
+    try:
+        await process_result_task({"stock_code": code, "task_id": "t"})
+    finally:
+        await runner.cleanup()
+    print(json.dumps({"row": written[0][0], "stats": stub.stats}))
+
+
+asyncio.run(main(sys.argv[1]))
+"""
+
+
+def test_end_to_end_against_stand_in_server(tmp_path):
+    """
+    Заміна verifyData → VerifyDataClient → load_server_data → process_result_task, з одним 503.
+
+    Окремий процес: налаштування VERIFY_DATA_* читаються під час імпорту модулів.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    api_rows = generate_rows("1299", 2500)
+    csv_rows = [{"Buy Signal": row["entry_date"][:10], "Stop Signal": "Open position", "Entry price": "1",
+                 "Exit price": "Open position", "Gain/Lose": ""}
+                for row in api_rows if row["today_open_action"] == "B" and row["position_status"] == "I"][::2]
+    os.makedirs(tmp_path / "data")
+    with open(tmp_path / "data" / "1299.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(csv_rows[0]))
+        writer.writeheader()
+        writer.writerows(csv_rows)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, PYTHONPATH=root, VERIFY_DATA_BASE_URL=f"http://127.0.0.1:{port}",
+               VERIFY_DATA_CACHE_POLICY="never", VERIFY_DATA_BACKOFF="0.01",
+               VERIFY_DATA_CACHE_DIR=str(tmp_path / "verify_data"))
+    done = subprocess.run([sys.executable, "-c", STAND_IN_RUN, "1299"], cwd=tmp_path, env=env,
+                          capture_output=True, text=True, timeout=60)
+    assert done.returncode == 0, done.stderr
+    output = json.loads(done.stdout.strip().splitlines()[-1])
+
+    assert output["stats"]["requests"] == 2 and output["stats"]["errors"] == 1
+    row = output["row"]
+    row.pop("timestamp")
+    assert row == result_row("1299", api_rows, csv_rows)
+    assert int(row["total_exact"]) > 0
+    assert (tmp_path / "verify_data" / "1299.json").exists()
@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.algorithm_models import UnifiedTradeSignal
+from app.models.trade_signal import OPEN_POSITION, TradeSignal, to_key
+from app.services.signal_reconciliation import reconcile_signals
+from app.workers.algo_func.trade_calendar import TradeCalendar
+from tests.reference import reconcile as _reference_reconcile
+
+
+def _signals(rng, days, count, source, p_missing, p_open):
+    """Угоди на торгових днях; частина дат поза календарем, частина позицій відкрита."""
+    signals = []
+    for _ in range(count):
+        buy = rng.choice(days) if rng.random() > p_missing else rng.choice(days) + timedelta(hours=12)
+        if rng.random() < p_open:
+            stop = OPEN_POSITION
+        else:
+            stop = rng.choice(days) if rng.random() > p_missing else rng.choice(days) + timedelta(hours=6)
+        signals.append(UnifiedTradeSignal(
+            buy_signal=buy, stop_signal=stop, entry_price=1.0, exit_price=1.0, source=source,
+        ))
+    return signals
+
+
+def _check(api, algo, trade_days):
+    expected = _reference_reconcile(api, algo, trade_days)
+    result = reconcile_signals(
+        [TradeSignal.from_model(s) for s in api],
+        [TradeSignal.from_model(s) for s in algo],
+        TradeCalendar([to_key(day) for day in trade_days]),
+    )
+    assert (result.match_count, result.deviations, result.deviations_data, result.unmatched_api_data) == expected[:4]
+    assert [s.to_model() for s in result.unmatched_algo] == expected[4]
+
+    in_calendar = {day for day in trade_days if day is not None}
+    dates = [d for s in api + algo for d in (s.buy_signal, s.stop_signal) if isinstance(d, datetime)]
+    assert result.missing_dates == list(dict.fromkeys(d for d in dates if d not in in_calendar))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_reference_loop_on_random_cases(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        days = [datetime(2020, 1, 1) + timedelta(days=i) for i in range(rng.randint(1, 40))]
+        trade_days = list(days)
+        # повтори й порожні дні в календарі, як у відповіді verifyData
+        if rng.random() < 0.3:
+            trade_days.append(rng.choice(days))
+        if rng.random() < 0.2:
+            trade_days.insert(rng.randrange(len(trade_days) + 1), None)
+        api = _signals(rng, days, rng.randint(0, 12), "api", 0.1, 0.15)
+        algo = _signals(rng, days, rng.randint(0, 12), "csv", 0.1, 0.15)
+        _check(api, algo, trade_days)
+
+
+def test_matches_reference_loop_on_long_history():
+    rng = random.Random(42)
+    days = [datetime(2005, 1, 3) + timedelta(days=i) for i in range(3000)]
+    api = sorted(_signals(rng, days, 300, "api", 0.01, 0.01), key=lambda s: s.buy_signal)
+    algo = sorted(_signals(rng, days, 300, "csv", 0.01, 0.01), key=lambda s: s.buy_signal)
+    _check(api, algo, days)
+
+
+def test_deviation_within_two_trading_days():
+    days = [datetime(2024, 1, 1) + timedelta(days=i) for i in range(10)]
+    api = [UnifiedTradeSignal(buy_signal=days[2], stop_signal=days[6], entry_price=1, exit_price=1, source="api")]
+    algo = [UnifiedTradeSignal(buy_signal=days[4], stop_signal=days[7], entry_price=1, exit_price=1, source="csv")]
+    _check(api, algo, days)
+
+    result = reconcile_signals([TradeSignal.from_model(s) for s in api], [TradeSignal.from_model(s) for s in algo],
+                               TradeCalendar([to_key(day) for day in days]))
+    assert (result.match_count, result.deviations, result.unmatched_algo) == (0, 2, [])
@@ -0,0 +1,199 @@
+import asyncio
+import json
+
+import pytest
+
+from app.services import verify_data_cache
+from app.services.verify_data_cache import VerifyDataCache, fetch_signals
+
+OLD = [{"code": "700", "tradeday": "2024-01-02T00:00:00.000Z"}, {"code": "700", "tradeday": "2024-01-03T00:00:00.000Z"}]
+NEW = OLD + [{"code": "700", "tradeday": "2024-01-04T00:00:00.000Z"}]
+
+
+class Client:
+    def __init__(self, payload=None, error=None):
+        self.payload = payload
+        self.error = error
+        self.calls = 0
+
+    async def fetch_signals(self, stock_code, trade_day=""):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.payload
+
+
+class Store:
+    """Мета індексу 2800 у сховищі OHLCV."""
+
+    def __init__(self, last_date=None):
+        self.last_date = last_date
+
+    def read_meta(self, code):
+        return {"last_date": self.last_date} if self.last_date else None
+
+
+def _cache(tmp_path, policy, last_date="2024-01-03", max_age=7 * 24 * 3600, recheck=3600):
+    return VerifyDataCache(root=str(tmp_path), policy=policy, max_age=max_age, recheck=recheck,
+                           store=Store(last_date))
+
+
+def _cached(cache, payload=OLD, age=0.0):
+    """Відповідь у кеші, завантажена ``age`` секунд тому."""
+    meta = cache.write("700", payload)
+    meta["fetched_at"] -= age
+    cache._write_atomic(cache._path("700", ".meta.json"), json.dumps(meta).encode("utf-8"))
+
+
+def _fetch(cache, client, **kwargs):
+    return asyncio.run(fetch_signals("700", client=client, cache=cache, **kwargs))
+
+
+def test_miss_fetches_and_caches(tmp_path):
+    cache = _cache(tmp_path, "calendar")
+    client = Client(OLD)
+
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 1
+    assert cache.read("700") == OLD
+    assert cache.read_meta("700")["last_tradeday"] == "2024-01-03"
+
+
+def test_calendar_serves_until_index_has_newer_day(tmp_path):
+    cache = _cache(tmp_path, "calendar", last_date="2024-01-03")
+    _cached(cache, age=7200)
+    client = Client(NEW)
+
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 0
+
+    cache.store.last_date = "2024-01-04"
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+    assert cache.read("700") == NEW
+
+
+def test_calendar_recheck_window(tmp_path):
+    cache = _cache(tmp_path, "calendar", last_date="2024-01-04", recheck=3600)
+    client = Client(NEW)
+
+    # API публікує день із запізненням: у межах recheck код не перепитується
+    _cached(cache, age=60)
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 0
+
+    _cached(cache, age=3601)
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+
+
+def test_calendar_without_index_refetches(tmp_path):
+    cache = _cache(tmp_path, "calendar", last_date=None)
+    _cached(cache, age=7200)
+    client = Client(NEW)
+
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+
+
+@pytest.mark.parametrize("policy", ["calendar", "ttl"])
+def test_max_age(tmp_path, policy):
+    cache = _cache(tmp_path, policy, last_date="2024-01-03", max_age=100, recheck=1000)
+    client = Client(NEW)
+
+    _cached(cache, age=50)
+    assert _fetch(cache, client) == OLD
+    _cached(cache, age=150)
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+
+
+def test_ttl_ignores_calendar(tmp_path):
+    cache = _cache(tmp_path, "ttl", last_date="2024-02-01", recheck=0)
+    _cached(cache, age=7200)
+    client = Client(NEW)
+
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 0
+
+
+def test_always_serves_any_cached_response(tmp_path):
+    cache = _cache(tmp_path, "always", last_date="2024-02-01", max_age=100)
+    _cached(cache, age=10 ** 6)
+    client = Client(NEW)
+
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 0
+
+
+def test_never_refetches_but_keeps_cache(tmp_path):
+    cache = _cache(tmp_path, "never")
+    _cached(cache)
+    client = Client(NEW)
+
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+    assert cache.read("700") == NEW
+
+
+def test_refresh_bypasses_fresh_cache(tmp_path):
+    cache = _cache(tmp_path, "always")
+    _cached(cache)
+    client = Client(NEW)
+
+    assert _fetch(cache, client, refresh=True) == NEW
+    assert client.calls == 1
+
+
+def test_hash_mismatch_is_a_miss(tmp_path):
+    cache = _cache(tmp_path, "always")
+    _cached(cache)
+    (tmp_path / "700.json").write_text(json.dumps(NEW))
+    client = Client(NEW)
+
+    assert cache.read("700") is None
+    assert _fetch(cache, client) == NEW
+    assert client.calls == 1
+    assert cache.read("700") == NEW
+
+
+def test_serves_stale_when_api_fails(tmp_path):
+    cache = _cache(tmp_path, "never")
+    _cached(cache)
+    client = Client(error=asyncio.TimeoutError())
+
+    assert _fetch(cache, client) == OLD
+    assert client.calls == 1
+
+
+def test_api_failure_without_cache_raises(tmp_path):
+    cache = _cache(tmp_path, "calendar")
+
+    with pytest.raises(asyncio.TimeoutError):
+        _fetch(cache, Client(error=asyncio.TimeoutError()))
+
+
+def test_no_stale_serving_when_disabled(tmp_path, monkeypatch):
+    monkeypatch.setattr(verify_data_cache, "VERIFY_DATA_CACHE_SERVE_STALE", False)
+    cache = _cache(tmp_path, "never")
+    _cached(cache)
+
+    with pytest.raises(asyncio.TimeoutError):
+        _fetch(cache, Client(error=asyncio.TimeoutError()))
+
+
+def test_stale_response_with_bad_hash_is_not_served(tmp_path):
+    cache = _cache(tmp_path, "never")
+    _cached(cache)
+    (tmp_path / "700.json").write_text("[]")
+
+    with pytest.raises(asyncio.TimeoutError):
+        _fetch(cache, Client(error=asyncio.TimeoutError()))
+
+
+def test_empty_response_is_not_cached(tmp_path):
+    cache = _cache(tmp_path, "calendar")
+    _cached(cache, age=10 ** 6)
+
+    assert _fetch(cache, Client([])) == []
+    assert cache.read("700") == OLD
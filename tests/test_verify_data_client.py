@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.services.verify_data_client import VERIFY_DATA_PATH, VerifyDataClient
+
+PAYLOAD = [{"code": "700", "tradeday": "2024-01-02T00:00:00.000Z"}]
+
+
+class Api:
+    """verifyData з відповідями за сценарієм: статус (або секунди затримки) на кожну спробу."""
+
+    def __init__(self, *steps, headers=None, delay=0.0):
+        self.steps = list(steps)
+        self.headers = headers or {}
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle(self, request):
+        self.calls.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            step = self.steps.pop(0) if self.steps else 200
+            if isinstance(step, float):
+                await asyncio.sleep(step)
+                step = 200
+            elif self.delay:
+                await asyncio.sleep(self.delay)
+            if step != 200:
+                return web.Response(status=step, headers=self.headers)
+            return web.json_response(PAYLOAD)
+        finally:
+            self.in_flight -= 1
+
+
+def _run(api, scenario, **options):
+    async def main():
+        app = web.Application()
+        app.router.add_get(VERIFY_DATA_PATH, api.handle)
+        async with TestServer(app) as server, aiohttp.ClientSession() as session:
+            options.setdefault("backoff", 0.01)
+            options.setdefault("rate", 0)
+            client = VerifyDataClient(str(server.make_url("")), api_key="key", session=session, **options)
+            return await scenario(client)
+
+    return asyncio.run(main())
+
+
+def test_retries_503_then_succeeds():
+    api = Api(503, 503)
+    result = _run(api, lambda client: client.fetch_signals("700"), max_retries=3)
+
+    assert result == PAYLOAD
+    assert len(api.calls) == 3
+
+
+def test_429_waits_for_retry_after():
+    api = Api(429, headers={"Retry-After": "0.3"})
+    result = _run(api, lambda client: client.fetch_signals("700"), backoff=0)
+
+    assert result == PAYLOAD
+    assert len(api.calls) == 2
+    assert api.calls[1] - api.calls[0] >= 0.3
+
+
+def test_404_is_not_retried():
+    api = Api(404)
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        _run(api, lambda client: client.fetch_signals("700"), max_retries=3)
+
+    assert error.value.status == 404
+    assert len(api.calls) == 1
+
+
+def test_503_raises_after_last_retry():
+    api = Api(503, 503, 503)
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        _run(api, lambda client: client.fetch_signals("700"), max_retries=2)
+
+    assert error.value.status == 503
+    assert len(api.calls) == 3
+
+
+def test_timeout_gives_up_after_max_retries_plus_one_attempts():
+    api = Api(1.0, 1.0, 1.0, 1.0)
+    with pytest.raises(asyncio.TimeoutError):
+        _run(api, lambda client: client.fetch_signals("700"), max_retries=2, timeout=0.1)
+
+    assert len(api.calls) == 3
+
+
+def test_concurrency_cap():
+    api = Api(delay=0.05)
+
+    async def scenario(client):
+        return await asyncio.gather(*(client.fetch_signals(str(code)) for code in range(12)))
+
+    results = _run(api, scenario, concurrency=3)
+
+    assert results == [PAYLOAD] * 12
+    assert api.max_in_flight == 3
+
+
+def test_rate_cap():
+    api = Api()
+
+    async def scenario(client):
+        return await asyncio.gather(*(client.fetch_signals(str(code)) for code in range(6)))
+
+    _run(api, scenario, rate=20, burst=2)
+
+    # два запити з запасу одразу, решта чотири — не частіше ніж раз на 1/20 с
+    assert len(api.calls) == 6
+    assert api.calls[-1] - api.calls[0] >= 4 / 20 * 0.9
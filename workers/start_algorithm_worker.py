@@ -10,7 +10,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from rq import Worker, Connection
 from app.config.logging_config import setup_logging
-from app.config.queue_config import redis_conn, algorithm_calculation_queue
+from app.config.queue_config import redis_conn, algorithm_calculation_queue, algorithm_priority_queue, ohlcv_prefetch_queue
 
 def main():
     """
@@ -20,10 +20,11 @@ def main():
     logger = logging.getLogger("app.workers.algorithm_worker")
     logger.info("Starting Algorithm Worker...")
     logger.info(f"Redis connection: {redis_conn}")
-    logger.info("Queue: algorithm_calculation")
+    logger.info("Queues: ohlcv_prefetch, algorithm_calculation_high, algorithm_calculation")
 
     with Connection(redis_conn):
-        worker = Worker([algorithm_calculation_queue])
+        # ohlcv_prefetch має пріоритет: задачі алгоритмів чекають на нього
+        worker = Worker([ohlcv_prefetch_queue, algorithm_priority_queue, algorithm_calculation_queue])
         logger.info("Algorithm worker started. Press Ctrl+C to stop.")
         worker.work()
 
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Скрипт для запуску довгоживучого async-воркера алгоритмів (перша черга)
+
+Один процес і один цикл подій: пул MySQL, aiohttp сесія та кеш історій
+лишаються теплими між задачами, одночасно виконується до
+ALGORITHM_WORKER_CONCURRENCY задач.
+"""
+import sys
+import os
+import asyncio
+import logging
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config.logging_config import setup_logging
+from app.config.queue_config import redis_conn, algorithm_calculation_queue, algorithm_priority_queue, ohlcv_prefetch_queue
+from app.workers.async_runtime import AsyncWorkerRuntime, ALGORITHM_WORKER_CONCURRENCY
+
+def main():
+    """
+    Запускає async-воркера для обробки алгоритмів
+    """
+    setup_logging()
+    logger = logging.getLogger("app.workers.algorithm_worker")
+    logger.info("Starting Async Algorithm Worker...")
+    logger.info(f"Redis connection: {redis_conn}")
+    logger.info("Queues: ohlcv_prefetch, algorithm_calculation_high, algorithm_calculation")
+    logger.info(f"Concurrency: {ALGORITHM_WORKER_CONCURRENCY}")
+
+    runtime = AsyncWorkerRuntime([ohlcv_prefetch_queue, algorithm_priority_queue, algorithm_calculation_queue])
+    asyncio.run(runtime.run())
+
+if __name__ == '__main__':
+    main()